@@ -10,6 +10,14 @@ class BranchAdmin(admin.ModelAdmin):
 class UserBranchRelationAdmin(admin.ModelAdmin):
     list_display = ["user", "branch", "role", "is_logged_in"]
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        UserBranchRelation.utils.invalidate(obj.user)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        UserBranchRelation.utils.invalidate(obj.user)
+
 
 # Register your models here.
 admin.site.register(Branch, BranchAdmin)
@@ -1,13 +1,70 @@
+from uuid import uuid4
+
+from core.cache import get_shared_cache
+from django.db import transaction
 from django.db.models import Manager
 
+# seconds a resolved login is trusted without checking the database again
+LOGGED_IN_BRANCH_TIMEOUT = 60
+
 
 class UserBranchManager(Manager):
+    def get_version_key(self, user):
+        return f"user_branch_version_{user.id}"
+
+    def get_logged_in(self, user):
+        """(branch, role, permissions) of the login of user read from the database"""
+        user_branch = (
+            self.select_related("branch")
+            .filter(user=user, is_logged_in=True, is_active=True)
+            .first()
+        )
+        return (
+            (user_branch.branch, user_branch.role, user_branch.permissions)
+            if user_branch
+            else ()
+        )
+
+    def get_logged_in_branch(self, user, token=None):
+        """
+        (branch, role, permissions) the user is logged in with or None, cached per
+        user and token until the user's branches change. without a cache shared by
+        every worker it is read on every request so a revoked login is refused at once
+        """
+        cache = get_shared_cache()
+        if cache is None:
+            return self.get_logged_in(user) or None
+
+        version = cache.get(self.get_version_key(user))
+        if version is None:
+            version = uuid4().hex
+            cache.add(self.get_version_key(user), version, None)
+            version = cache.get(self.get_version_key(user), version)
+
+        jti = getattr(token, "payload", {}).get("jti", "")
+        key = f"user_branch_{user.id}_{version}_{jti}"
+        logged_in = cache.get(key)
+        if logged_in is None:
+            logged_in = self.get_logged_in(user)
+            cache.set(key, logged_in, LOGGED_IN_BRANCH_TIMEOUT)
+        return logged_in or None
+
+    def invalidate(self, user):
+        """forget the cached logins of user, again once the transaction commits"""
+        cache = get_shared_cache()
+        if cache is None:
+            return
+        key = self.get_version_key(user)
+        cache.set(key, uuid4().hex, None)
+        transaction.on_commit(lambda: cache.set(key, uuid4().hex, None))
+
     def logout_all(self, user):
         user_branches = self.filter(user=user)
 
         for branch in user_branches:
             branch.is_logged_in = False
             branch.save()
+        self.invalidate(user)
 
     def logout_from_other_branches(self, user, branch):
         other_branches = self.filter(user=user).exclude(branch=branch)
@@ -15,3 +72,4 @@ class UserBranchManager(Manager):
         for branch in other_branches:
             branch.is_logged_in = False
             branch.save()
+        self.invalidate(user)
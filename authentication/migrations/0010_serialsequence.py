@@ -0,0 +1,28 @@
+# Generated by Django 3.2.13 on 2026-10-18 18:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_alter_userbranchrelation_permissions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerialSequence',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('document', models.CharField(max_length=64)),
+                ('key', models.CharField(blank=True, default='', max_length=64)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='serialsequence', to='authentication.branch')),
+            ],
+            options={
+                'unique_together': {('branch', 'document', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations
+from django.db.models import F, Max
+
+# document, serial field, lookup to the branch and the field splitting the counter
+SEQUENCES = [
+    ("transactions.transaction", "serial", "branch", "serial_type"),
+    ("transactions.stocktransfer", "serial", "from_warehouse__branch", "from_warehouse"),
+    ("rawtransactions.rawtransaction", "serial", "person__branch", None),
+    (
+        "rawtransactions.rawtransactionlot",
+        "lot_number",
+        "raw_transaction__person__branch",
+        None,
+    ),
+    ("rawtransactions.rawdebit", "serial", "person__branch", "debit_type"),
+    ("dying.dyingissue", "dying_lot_number", "dying_unit__branch", None),
+    ("cheques.externalcheque", "serial", "branch", None),
+    ("cheques.personalcheque", "serial", "branch", None),
+    ("expenses.expensedetail", "serial", "branch", None),
+    ("payments.payment", "serial", "branch", None),
+]
+
+
+def populate_serial_sequence(apps, schema_editor):
+    SerialSequence = apps.get_model("authentication", "SerialSequence")
+
+    sequences = []
+    for document, field, branch, key in SEQUENCES:
+        Model = apps.get_model(document)
+        rows = (
+            Model.objects.filter(**{f"{branch}__isnull": False})
+            .values(sequence_branch=F(branch), **({"sequence_key": F(key)} if key else {}))
+            .order_by()
+            .annotate(value=Max(field))
+        )
+        sequences += [
+            SerialSequence(
+                branch_id=row["sequence_branch"],
+                document=document,
+                key=str(row["sequence_key"]) if key else "",
+                value=row["value"] or 0,
+            )
+            for row in rows
+        ]
+    SerialSequence.objects.bulk_create(sequences, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0010_serialsequence"),
+        ("transactions", "0034_alter_transaction_branch"),
+        ("rawtransactions", "0020_auto_20220620_1621"),
+        ("dying", "0008_dyingissue_time_stamp"),
+        ("cheques", "0020_alter_cheque_branch"),
+        ("payments", "0010_alter_payment_branch"),
+        ("expenses", "0015_alter_expensedetail_branch"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_serial_sequence, migrations.RunPython.noop),
+    ]
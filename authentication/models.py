@@ -2,7 +2,7 @@ from uuid import uuid4
 
 from django.contrib.auth.models import User
 from django.contrib.postgres.fields import ArrayField
-from django.db import models
+from django.db import models, transaction
 
 from .choices import RoleChoices
 from .managers import UserBranchManager
@@ -51,6 +51,54 @@ class BranchAwareModel(models.Model):
         abstract = True
 
 
+class BranchScopedModel(models.Model):
+    """
+    branch of a row that belongs to the branch through branch_source, kept on the row
+    so branch scoped queries do not have to join through it
+    """
+
+    branch = models.ForeignKey(Branch, related_name="%(class)s", on_delete=models.CASCADE)
+
+    branch_source = "person"
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self.branch_id = getattr(self, self.branch_source).branch_id
+        super().save(*args, **kwargs)
+
+
+class SerialSequence(BranchAwareModel):
+    """
+    last serial handed out for a document of a branch, key splits the counter further
+    (e.g. the serial type of a transaction)
+    """
+
+    document = models.CharField(max_length=64)
+    key = models.CharField(max_length=64, blank=True, default="")
+    value = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("branch", "document", "key")
+
+    @classmethod
+    def allocate(cls, branch, document, key="", start=0, count=1):
+        """
+        next value of a counter (the last of count values), the row stays locked till
+        the surrounding transaction ends so concurrent allocations wait for it instead
+        of reading the same value, start (or a callable giving it) is where a new
+        counter begins
+        """
+        with transaction.atomic(savepoint=False):
+            sequence, _ = cls.objects.select_for_update().get_or_create(
+                branch=branch, document=document, key=key, defaults={"value": start}
+            )
+            sequence.value += count
+            sequence.save(update_fields=["value"])
+        return sequence.value
+
+
 class UserAwareModel(models.Model):
     user = models.ForeignKey(
         User, related_name="%(class)s", on_delete=models.PROTECT, null=True, default=None
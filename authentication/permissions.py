@@ -9,15 +9,18 @@ class IsLoggedIn(permissions.BasePermission):
     """This permission class is used to check whether the authenticated user is logged in a branch or not."""
 
     def has_permission(self, request, view):
-        try:
-            user_branch = UserBranchRelation.objects.get(
-                user=request.user, is_logged_in=True, is_active=True
+        # views that call other views share the underlying request, resolve it only once
+        if not hasattr(request._request, "logged_in_branch"):
+            request._request.logged_in_branch = (
+                UserBranchRelation.utils.get_logged_in_branch(request.user, request.auth)
             )
-        except UserBranchRelation.DoesNotExist:
+        if request._request.logged_in_branch is None:
             return False
-        request.branch = user_branch.branch
-        request.role = user_branch.role
-        request.permissions = user_branch.permissions
+        (
+            request.branch,
+            request.role,
+            request.permissions,
+        ) = request._request.logged_in_branch
         return True
 
 
@@ -32,6 +32,7 @@ class LoginSerializer(serializers.Serializer):
 
         user_branch.login()
         UserBranchRelation.utils.logout_from_other_branches(user, branch)
+        UserBranchRelation.utils.invalidate(user)
 
         validated_data["branch_name"] = user_branch.branch.name
         validated_data["role"] = user_branch.role
@@ -102,4 +103,5 @@ class EditUserPermissionsForBranchSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         instance.permissions = validated_data["new_permissions"]
         instance.save()
+        UserBranchRelation.utils.invalidate(instance.user)
         return instance
@@ -1,3 +1,134 @@
-from django.test import TestCase
+import tempfile
+import threading
 
-# Create your tests here.
+import authentication.constants as PERMISSIONS
+from core.tests import ALL_PERMISSIONS, BranchTestMixin
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from transactions.models import Transaction
+
+from .choices import RoleChoices
+from .models import Branch, SerialSequence, UserBranchRelation
+
+
+class SerialSequenceTest(TransactionTestCase):
+    """serials allocated by concurrent requests, every thread commits on its own"""
+
+    def setUp(self):
+        self.branch = Branch.objects.create(name="main")
+        self.results = []
+        self.errors = []
+
+    def start(self, target):
+        def run():
+            try:
+                self.results.append(target())
+            except Exception as e:
+                self.errors.append(e)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def allocate(self, count=2):
+        with transaction.atomic():
+            return Transaction.get_next_serials(self.branch, "INV", count)
+
+    def test_concurrent_allocations_are_unique_and_contiguous(self):
+        for thread in [self.start(self.allocate) for _ in range(8)]:
+            thread.join()
+        self.assertEqual(self.errors, [])
+        serials = sorted(serial for result in self.results for serial in result)
+        self.assertEqual(serials, list(range(1, 17)))
+        for result in self.results:
+            self.assertEqual(result, [result[0], result[0] + 1])
+        # other keys keep their own counter
+        self.assertEqual(Transaction.get_next_serials(self.branch, "SUP"), [1])
+
+    def test_rolled_back_allocation_is_reused(self):
+        self.assertEqual(self.allocate(), [1, 2])
+        allocated = threading.Event()
+        rollback = threading.Event()
+
+        def allocate_and_roll_back():
+            with transaction.atomic():
+                self.results.append(Transaction.get_next_serials(self.branch, "INV"))
+                allocated.set()
+                rollback.wait(5)
+                raise RuntimeError("rolled back")
+
+        rolling_back = self.start(allocate_and_roll_back)
+        self.assertTrue(allocated.wait(5))
+        # the next allocation waits on the locked counter until the rollback
+        waiting = self.start(lambda: self.allocate(1))
+        waiting.join(0.5)
+        self.assertTrue(waiting.is_alive())
+        rollback.set()
+        rolling_back.join()
+        waiting.join()
+        self.assertEqual([str(e) for e in self.errors], ["rolled back"])
+        self.assertEqual(self.results, [[3], [3]])
+        self.assertEqual(
+            SerialSequence.objects.get(branch=self.branch, key="INV").value, 3
+        )
+
+
+class RevokedPermissionTest(BranchTestMixin, TestCase):
+    """a permission taken from a user is refused on the user's next request"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.accountant = User.objects.create_user(username="accountant")
+        cls.accountant_branch = UserBranchRelation.objects.create(
+            user=cls.accountant,
+            branch=cls.branch,
+            role=RoleChoices.ACCOUNTANT,
+            is_logged_in=True,
+            permissions=ALL_PERMISSIONS,
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.accountant_client = APIClient(HTTP_X_FORWARDED_PROTO="https")
+        self.accountant_client.force_authenticate(self.accountant)
+
+    def list_account_types(self):
+        return self.accountant_client.get("/essentials/account-type/list/").status_code
+
+    def test_revoked_in_database_without_shared_cache(self):
+        self.assertEqual(self.list_account_types(), 200)
+        # a change no request of this process saw, like one made by another worker
+        UserBranchRelation.objects.filter(id=self.accountant_branch.id).update(
+            permissions=[
+                p for p in ALL_PERMISSIONS if p != PERMISSIONS.CAN_VIEW_ACCOUNT_TYPES
+            ]
+        )
+        self.assertEqual(self.list_account_types(), 403)
+
+    def test_revoked_by_admin_with_shared_cache(self):
+        with tempfile.TemporaryDirectory() as location:
+            with override_settings(
+                CACHES={
+                    "default": {
+                        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                        "LOCATION": location,
+                    }
+                }
+            ):
+                try:
+                    self.assertEqual(self.list_account_types(), 200)
+                    response = self.client.put(
+                        f"/auth/update-user-permissions/{self.accountant_branch.id}/",
+                        {"new_permissions": [PERMISSIONS.CAN_VIEW_PERSONS]},
+                        format="json",
+                    )
+                    self.assertEqual(response.status_code, 200, response.data)
+                    self.assertEqual(self.list_account_types(), 403)
+                finally:
+                    caches["default"].clear()
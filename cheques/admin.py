@@ -1,9 +1,10 @@
 from django.contrib import admin
+from ledgers.admin import LedgerEntriesAdmin
 
 from .models import *
 
 
-class ExternalChequeAdmin(admin.ModelAdmin):
+class ExternalChequeAdmin(LedgerEntriesAdmin):
     list_display = ["id", "serial"]
 
 
@@ -15,7 +16,7 @@ class ExternalChequeTransferAdmin(admin.ModelAdmin):
     list_display = ["cheque", "person"]
 
 
-class PersonalChequeAdmin(admin.ModelAdmin):
+class PersonalChequeAdmin(LedgerEntriesAdmin):
     list_display = ["id", "serial", "amount"]
 
 
@@ -0,0 +1,54 @@
+# Generated by Django 3.2.13 on 2026-10-18 18:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_alter_userbranchrelation_permissions'),
+        ('cheques', '0017_auto_20230614_0043'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='externalcheque',
+            name='branch',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='externalcheque', to='authentication.branch'),
+        ),
+        migrations.AddField(
+            model_name='externalchequehistory',
+            name='branch',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='externalchequehistory', to='authentication.branch'),
+        ),
+        migrations.AddField(
+            model_name='personalcheque',
+            name='branch',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='personalcheque', to='authentication.branch'),
+        ),
+        migrations.AddIndex(
+            model_name='externalcheque',
+            index=models.Index(fields=['branch', 'date'], name='cheques_ext_branch__63538a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='externalcheque',
+            index=models.Index(fields=['branch', 'status'], name='cheques_ext_branch__803ff8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='externalcheque',
+            index=models.Index(fields=['branch', 'serial'], name='cheques_ext_branch__819854_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='externalchequehistory',
+            index=models.Index(fields=['branch', 'date'], name='cheques_ext_branch__335162_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personalcheque',
+            index=models.Index(fields=['branch', 'date'], name='cheques_per_branch__ddf922_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personalcheque',
+            index=models.Index(fields=['branch', 'serial'], name='cheques_per_branch__2133f8_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate_branch(apps, schema_editor):
+    ExternalCheque = apps.get_model("cheques", "ExternalCheque")
+    ExternalChequeHistory = apps.get_model("cheques", "ExternalChequeHistory")
+    PersonalCheque = apps.get_model("cheques", "PersonalCheque")
+    Person = apps.get_model("essentials", "Person")
+
+    ExternalCheque.objects.update(
+        branch=Subquery(
+            Person.objects.filter(id=OuterRef("person")).values("branch")[:1]
+        )
+    )
+    PersonalCheque.objects.update(
+        branch=Subquery(
+            Person.objects.filter(id=OuterRef("person")).values("branch")[:1]
+        )
+    )
+    ExternalChequeHistory.objects.update(
+        branch=Subquery(
+            ExternalCheque.objects.filter(id=OuterRef("parent_cheque")).values("branch")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cheques", "0018_cheque_branch"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_branch, migrations.RunPython.noop),
+    ]
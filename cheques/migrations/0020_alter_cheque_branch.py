@@ -0,0 +1,30 @@
+# Generated by Django 3.2.13 on 2026-10-18 18:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_alter_userbranchrelation_permissions'),
+        ('cheques', '0019_populate_cheque_branch'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='externalcheque',
+            name='branch',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='externalcheque', to='authentication.branch'),
+        ),
+        migrations.AlterField(
+            model_name='externalchequehistory',
+            name='branch',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='externalchequehistory', to='authentication.branch'),
+        ),
+        migrations.AlterField(
+            model_name='personalcheque',
+            name='branch',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='personalcheque', to='authentication.branch'),
+        ),
+    ]
@@ -1,6 +1,6 @@
 from datetime import date
 
-from authentication.models import UserAwareModel
+from authentication.models import BranchScopedModel, UserAwareModel
 from core.models import ID, DateTimeAwareModel, NextSerial
 from django.core.validators import MinValueValidator
 from django.db import models
@@ -13,7 +13,9 @@ from transactions.choices import TransactionChoices
 from .choices import *
 
 
-class AbstractCheque(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
+class AbstractCheque(
+    ID, BranchScopedModel, UserAwareModel, DateTimeAwareModel, NextSerial
+):
     serial = models.PositiveBigIntegerField()
     cheque_number = models.CharField(max_length=20)
     bank = models.CharField(max_length=20, choices=BankChoices.choices)
@@ -45,6 +47,16 @@ class ExternalCheque(AbstractCheque):
     )
     is_passed_with_history = models.BooleanField(default=False)
 
+    class Meta(AbstractCheque.Meta):
+        indexes = [
+            models.Index(fields=["branch", "date"]),
+            models.Index(fields=["branch", "status"]),
+            models.Index(fields=["branch", "serial"]),
+        ]
+
+    def get_ledger_columns(self, nature):
+        return self.get_ledger_string("external"), f"CHE-{self.serial}"
+
     @classmethod
     def get_amount_recovered(cls, person, branch):
         try:
@@ -56,7 +68,7 @@ class ExternalCheque(AbstractCheque):
 
         external_recovered = (
             ExternalChequeHistory.objects.filter(
-                parent_cheque__person=person, parent_cheque__person__branch=branch
+                parent_cheque__person=person, branch=branch
             )
             .exclude(
                 account_type=cheque_account,
@@ -72,7 +84,7 @@ class ExternalCheque(AbstractCheque):
     @classmethod
     def get_sum_of_transferred_cheques(cls, person, branch):
         amount = ExternalCheque.objects.filter(
-            person__branch=branch, person=person, status=ChequeStatusChoices.TRANSFERRED
+            branch=branch, person=person, status=ChequeStatusChoices.TRANSFERRED
         ).aggregate(amount=Sum("amount"))
         amount = amount.get("amount", 0)
         if amount is not None:
@@ -82,7 +94,7 @@ class ExternalCheque(AbstractCheque):
     @classmethod
     def get_number_of_pending_cheques(cls, person, branch):
         pending_count = ExternalCheque.objects.filter(
-            person__branch=branch, person=person, status=ChequeStatusChoices.PENDING
+            branch=branch, person=person, status=ChequeStatusChoices.PENDING
         ).aggregate(count=Count("id"))
         pending_count = pending_count.get("count", 0)
         if pending_count is not None:
@@ -92,7 +104,7 @@ class ExternalCheque(AbstractCheque):
     @classmethod
     def get_sum_of_cleared_transferred_cheques(cls, person, branch):
         cleared = ExternalCheque.objects.filter(
-            person__branch=branch,
+            branch=branch,
             person=person,
             status=ChequeStatusChoices.COMPLETED_TRANSFER,
         ).aggregate(total=Sum("amount"))
@@ -110,10 +122,19 @@ class PersonalCheque(AbstractCheque):
         default=PersonalChequeStatusChoices.PENDING,
     )
 
+    class Meta(AbstractCheque.Meta):
+        indexes = [
+            models.Index(fields=["branch", "date"]),
+            models.Index(fields=["branch", "serial"]),
+        ]
+
+    def get_ledger_columns(self, nature):
+        return self.get_ledger_string("personal"), f"CHP-{self.serial}"
+
     @classmethod
     def get_pending_cheques(cls, person, branch):
         amount = PersonalCheque.objects.filter(
-            person__branch=branch,
+            branch=branch,
             person=person,
             status=PersonalChequeStatusChoices.PENDING,
         ).aggregate(amount=Sum("amount"))
@@ -123,7 +144,7 @@ class PersonalCheque(AbstractCheque):
         return 0
 
 
-class ExternalChequeHistory(ID, UserAwareModel, DateTimeAwareModel):
+class ExternalChequeHistory(ID, BranchScopedModel, UserAwareModel, DateTimeAwareModel):
     parent_cheque = models.ForeignKey(
         ExternalCheque,
         on_delete=models.CASCADE,
@@ -144,8 +165,11 @@ class ExternalChequeHistory(ID, UserAwareModel, DateTimeAwareModel):
         related_name="return_cheque",
     )
 
+    branch_source = "parent_cheque"
+
     class Meta:
         verbose_name_plural = "External cheque history"
+        indexes = [models.Index(fields=["branch", "date"])]
 
     def get_log_string(self):
         return (
@@ -170,7 +194,7 @@ class ExternalChequeHistory(ID, UserAwareModel, DateTimeAwareModel):
         # amount that has been received against the cheque (hard form)
         recovered_amount = (
             ExternalChequeHistory.objects.values("parent_cheque__id")
-            .filter(parent_cheque__person__branch=branch, **filter)
+            .filter(branch=branch, **filter)
             .exclude(account_type=cheque_account)
             .annotate(amount=Sum("amount"))
         )
@@ -179,7 +203,7 @@ class ExternalChequeHistory(ID, UserAwareModel, DateTimeAwareModel):
             passed_cheque_amount = (
                 ExternalChequeHistory.objects.values("parent_cheque__id")
                 .filter(
-                    parent_cheque__person__branch=branch,
+                    branch=branch,
                     return_cheque__status__in=[
                         ChequeStatusChoices.CLEARED,
                         ChequeStatusChoices.COMPLETED_HISTORY,
@@ -200,7 +224,7 @@ class ExternalChequeHistory(ID, UserAwareModel, DateTimeAwareModel):
     def get_amount_received(cls, parent_cheque, branch):
         """Returns the total amount received regardless if hard cash or not"""
         amount = ExternalChequeHistory.objects.filter(
-            cheque=parent_cheque, parent_cheque__person__branch=branch
+            cheque=parent_cheque, branch=branch
         ).aggregate(total=Sum("amount"))
         amount = amount.get("total", 0)
         amount = amount if amount else 0
@@ -219,7 +243,7 @@ class ExternalChequeTransfer(ID, UserAwareModel):
         transferred = ExternalChequeTransfer.objects.filter(
             person=person,
             cheque__status=ChequeStatusChoices.TRANSFERRED,
-            cheque__person__branch=branch,
+            cheque__branch=branch,
         ).aggregate(total=Sum("cheque__amount"))
         transferred = transferred.get("total", 0)
         if transferred is not None:
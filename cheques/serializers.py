@@ -51,16 +51,16 @@ class ExternalChequeSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "serial", "person", "transferred_to"]
 
     def get_transferred_to(self, obj):
-        transfer = ExternalChequeTransfer.objects.filter(cheque=obj)
-        if transfer.exists():
-            return transfer[0].person.name
-        return None
+        try:
+            return obj.externalchequetransfer.person.name
+        except ExternalChequeTransfer.DoesNotExist:
+            return None
 
 
 class ShortExternalChequeHistorySerializer(serializers.ModelSerializer):
     serial = serializers.IntegerField(source="parent_cheque.serial")
     cheque_number = serializers.CharField(source="parent_cheque.cheque_number")
-    person = serializers.UUIDField(source="parent_cheque.person.id")
+    person = serializers.UUIDField(source="parent_cheque.person_id")
 
     class Meta:
         model = ExternalChequeHistory
@@ -158,7 +158,7 @@ class CreateExternalChequeEntrySerializer(serializers.ModelSerializer):
         user = self.context["request"].user
         data_for_cheque = {
             **validated_data,
-            "serial": ExternalCheque.get_next_serial("serial", person__branch=branch),
+            "serial": ExternalCheque.get_next_serial(branch),
             "user": user,
         }
         external_cheque_obj = ExternalCheque.objects.create(**data_for_cheque)
@@ -209,7 +209,7 @@ class ExternalChequeHistoryWithChequeSerializer(serializers.ModelSerializer):
         cheque_obj = ExternalCheque.objects.create(
             **{
                 **data_for_cheque,
-                "serial": ExternalCheque.get_next_serial("serial", person__branch=branch),
+                "serial": ExternalCheque.get_next_serial(branch),
                 "person": validated_data["cheque"].person,
             }
         )
@@ -254,7 +254,7 @@ class ListExternalChequeHistorySerializer(serializers.ModelSerializer):
     class Meta:
         model = ExternalCheque
         fields = "__all__"
-        read_only_fields = ["id", "serial"]
+        read_only_fields = ["id", "serial", "branch"]
 
     def get_remaining_amount(self, obj):
         branch = self.context["request"].branch
@@ -315,7 +315,7 @@ class CompleteExternalTransferChequeSerializer(serializers.ModelSerializer):
     class Meta:
         model = ExternalCheque
         fields = "__all__"
-        read_only_fields = ["id"]
+        read_only_fields = ["id", "branch"]
 
     def update(self, instance, validated_data):
         if instance.status != ChequeStatusChoices.TRANSFERRED:
@@ -360,7 +360,7 @@ class IssuePersonalChequeSerializer(serializers.ModelSerializer):
         is_not_cheque_account(validated_data["account_type"], branch)
         data_for_cheque = {
             **validated_data,
-            "serial": PersonalCheque.get_next_serial("serial", person__branch=branch),
+            "serial": PersonalCheque.get_next_serial(branch),
             "user": user,
         }
         personal_cheque = PersonalCheque.objects.create(**data_for_cheque)
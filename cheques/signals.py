@@ -1,13 +1,77 @@
-from django.db.models.signals import post_delete
+from core.signals import post_bulk_delete
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from ledgers.models import Ledger, LedgerAndExternalCheque
 
-from .models import ExternalChequeHistory
+from .models import (
+    ExternalCheque,
+    ExternalChequeHistory,
+    ExternalChequeTransfer,
+    PersonalCheque,
+)
+from .utils import invalidate_cheque_summary
 
 
 @receiver(post_delete, sender=ExternalChequeHistory)
 def delete_external_cheques_upon_history_deletion(sender, instance, **kwargs):
-    try:
-        if instance.return_cheque:
-            instance.return_cheque.delete()
-    except:
-        pass
+    if instance.return_cheque_id:
+        Ledger.delete_with_entries(
+            ExternalCheque.objects.filter(id=instance.return_cheque_id)
+        )
+
+
+@receiver(post_save, sender=ExternalCheque)
+@receiver(post_delete, sender=ExternalCheque)
+def invalidate_summary_upon_external_cheque_change(sender, instance, **kwargs):
+    invalidate_cheque_summary(
+        instance.person_id,
+        *ExternalChequeTransfer.objects.filter(cheque=instance).values_list(
+            "person", flat=True
+        ),
+    )
+
+
+@receiver(post_save, sender=PersonalCheque)
+@receiver(post_delete, sender=PersonalCheque)
+def invalidate_summary_upon_personal_cheque_change(sender, instance, **kwargs):
+    invalidate_cheque_summary(instance.person_id)
+
+
+@receiver(post_save, sender=ExternalChequeTransfer)
+@receiver(post_delete, sender=ExternalChequeTransfer)
+def invalidate_summary_upon_transfer_change(sender, instance, **kwargs):
+    invalidate_cheque_summary(
+        instance.person_id,
+        *ExternalCheque.objects.filter(id=instance.cheque_id).values_list(
+            "person", flat=True
+        ),
+    )
+
+
+@receiver(post_save, sender=ExternalChequeHistory)
+@receiver(post_delete, sender=ExternalChequeHistory)
+def invalidate_summary_upon_history_change(sender, instance, **kwargs):
+    invalidate_cheque_summary(
+        *ExternalCheque.objects.filter(id=instance.parent_cheque_id).values_list(
+            "person", flat=True
+        )
+    )
+
+
+@receiver(post_save, sender=LedgerAndExternalCheque)
+@receiver(post_delete, sender=LedgerAndExternalCheque)
+def invalidate_summary_upon_ledger_link_change(sender, instance, **kwargs):
+    invalidate_cheque_summary(
+        *ExternalCheque.objects.filter(id=instance.external_cheque_id).values_list(
+            "person", flat=True
+        )
+    )
+
+
+@receiver(post_bulk_delete, sender=LedgerAndExternalCheque)
+def invalidate_summary_upon_ledger_links_deletion(sender, instances, **kwargs):
+    invalidate_cheque_summary(
+        *ExternalCheque.objects.filter(
+            id__in=[instance.external_cheque_id for instance in instances]
+        ).values_list("person", flat=True)
+    )
@@ -1,3 +1,57 @@
-from django.test import TestCase
+import tempfile
+from datetime import date
 
-# Create your tests here.
+from core.tests import BranchTestMixin
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from .choices import BankChoices
+from .models import PersonalCheque
+from .utils import get_cheque_summary
+
+
+class ChequeSummaryTest(BranchTestMixin, TestCase):
+    """the cheque summary shown with the ledger follows the cheques of the person"""
+
+    def create_cheque(self, serial, amount):
+        return PersonalCheque.objects.create(
+            branch=self.branch,
+            person=self.supplier,
+            serial=serial,
+            cheque_number=str(serial),
+            bank=BankChoices.MEEZAN,
+            due_date=date(2022, 1, 1),
+            amount=amount,
+        )
+
+    def get_personal_pending(self):
+        return get_cheque_summary(self.supplier.id, self.branch)["personal_pending"]
+
+    def test_changed_in_database_without_shared_cache(self):
+        cheque = self.create_cheque(1, 100)
+        self.assertEqual(self.get_personal_pending(), 100)
+        # a change no request of this process saw, like one made by another worker
+        PersonalCheque.objects.filter(id=cheque.id).update(amount=250)
+        self.assertEqual(self.get_personal_pending(), 250)
+
+    def test_written_cheque_with_shared_cache(self):
+        with tempfile.TemporaryDirectory() as location:
+            with override_settings(
+                CACHES={
+                    "default": {
+                        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                        "LOCATION": location,
+                    }
+                }
+            ):
+                try:
+                    cheque = self.create_cheque(1, 100)
+                    self.assertEqual(self.get_personal_pending(), 100)
+                    with self.assertNumQueries(0):
+                        self.assertEqual(self.get_personal_pending(), 100)
+                    cheque.amount = 250
+                    cheque.save()
+                    self.create_cheque(2, 50)
+                    self.assertEqual(self.get_personal_pending(), 300)
+                finally:
+                    caches["default"].clear()
@@ -1,11 +1,31 @@
+from core.cache import get_shared_cache
 from core.utils import convert_date_to_datetime
+from django.db import transaction
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    F,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Sum,
+    When,
+)
+from django.db.models.functions import Coalesce
 from essentials.choices import LinkedAccountChoices
-from essentials.models import LinkedAccount
+from essentials.models import LinkedAccount, Person
 from ledgers.models import Ledger, LedgerAndExternalCheque, LedgerAndPersonalCheque
 from rest_framework import serializers
 
-from .choices import ChequeStatusChoices
-from .models import ExternalChequeHistory
+from .choices import ChequeStatusChoices, PersonalChequeStatusChoices
+from .models import (
+    ExternalCheque,
+    ExternalChequeHistory,
+    ExternalChequeTransfer,
+    PersonalCheque,
+)
 
 CHEQUE_ACCOUNT = LinkedAccountChoices.CHEQUE_ACCOUNT
 
@@ -32,7 +52,7 @@ def get_parent_cheque(validated_data):
     """Returns parent cheque and validates the history entry"""
     previous_history = ExternalChequeHistory.objects.filter(
         return_cheque=validated_data["cheque"],
-        parent_cheque__person__branch=validated_data["branch"],
+        branch=validated_data["branch"],
     )
     parent = None
     if previous_history.exists():
@@ -45,9 +65,7 @@ def get_parent_cheque(validated_data):
 
 def has_history(cheque, branch):
     """check if this cheque has a history"""
-    return ExternalChequeHistory.objects.filter(
-        cheque=cheque, parent_cheque__person__branch=branch
-    ).exists()
+    return ExternalChequeHistory.objects.filter(cheque=cheque, branch=branch).exists()
 
 
 def is_transferred(cheque):
@@ -100,3 +118,144 @@ def create_ledger_entry_for_cheque(
         LedgerAndExternalCheque.objects.create(
             ledger_entry=ledger_entry, external_cheque=cheque_obj
         )
+
+
+def get_cheque_summary_key(person):
+    return f"cheque_summary_{person}"
+
+
+def invalidate_cheque_summary(*persons):
+    """drop the cached cheque summaries of persons, again once the transaction commits"""
+    cache = get_shared_cache()
+    keys = [get_cheque_summary_key(person) for person in persons if person]
+    if cache is not None and keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _person_total(queryset, person_field, total, output_field=FloatField()):
+    """scalar subquery with the total of queryset for the outer person"""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{person_field: OuterRef("id")})
+            .order_by()
+            .values(person_field)
+            .annotate(total=total)
+            .values("total")[:1],
+            output_field=output_field,
+        ),
+        0,
+        output_field=output_field,
+    )
+
+
+def get_cheque_summary(person, branch):
+    """
+    cheque totals of a person shown along with the ledger, computed in a single query
+    and cached until a cheque of the person is written when every worker shares the
+    cache
+    """
+    cache = get_shared_cache()
+    key = get_cheque_summary_key(person)
+    summary = cache.get(key) if cache is not None else None
+    if summary is not None:
+        return summary
+
+    cheque_account = LinkedAccount.objects.filter(
+        name=CHEQUE_ACCOUNT, account__branch=branch
+    ).values("account")
+    external_cheques = LedgerAndExternalCheque.objects.filter(
+        external_cheque__person=F("ledger_entry__person")
+    )
+    totals = (
+        Person.objects.filter(id=person, branch=branch)
+        .annotate(
+            has_cheque_account=Exists(cheque_account),
+            external_balance=_person_total(
+                external_cheques.exclude(
+                    external_cheque__status=ChequeStatusChoices.RETURNED
+                ),
+                "ledger_entry__person",
+                Sum(
+                    Case(
+                        When(ledger_entry__nature="C", then=F("external_cheque__amount")),
+                        default=-F("external_cheque__amount"),
+                        output_field=FloatField(),
+                    )
+                ),
+            ),
+            passed=_person_total(
+                external_cheques.filter(
+                    external_cheque__is_passed_with_history=False,
+                    external_cheque__status=ChequeStatusChoices.CLEARED,
+                ),
+                "ledger_entry__person",
+                Sum("external_cheque__amount"),
+            ),
+            recovered=_person_total(
+                ExternalChequeHistory.objects.exclude(
+                    account_type__in=cheque_account
+                ).exclude(parent_cheque__status=ChequeStatusChoices.CLEARED),
+                "parent_cheque__person",
+                Sum("amount"),
+            ),
+            cleared_transferred=_person_total(
+                ExternalCheque.objects.filter(
+                    status=ChequeStatusChoices.COMPLETED_TRANSFER
+                ),
+                "person",
+                Sum("amount"),
+            ),
+            pending_count=_person_total(
+                ExternalCheque.objects.filter(status=ChequeStatusChoices.PENDING),
+                "person",
+                Count("id"),
+                IntegerField(),
+            ),
+            transferred=_person_total(
+                ExternalCheque.objects.filter(status=ChequeStatusChoices.TRANSFERRED),
+                "person",
+                Sum("amount"),
+            ),
+            transferred_to_this_person=_person_total(
+                ExternalChequeTransfer.objects.filter(
+                    cheque__status=ChequeStatusChoices.TRANSFERRED
+                ),
+                "person",
+                Sum("cheque__amount"),
+            ),
+            personal_pending=_person_total(
+                PersonalCheque.objects.filter(status=PersonalChequeStatusChoices.PENDING),
+                "person",
+                Sum("amount"),
+            ),
+        )
+        .values(
+            "has_cheque_account",
+            "external_balance",
+            "passed",
+            "recovered",
+            "cleared_transferred",
+            "pending_count",
+            "transferred",
+            "transferred_to_this_person",
+            "personal_pending",
+        )
+        .first()
+    )
+    if totals is None:
+        raise serializers.ValidationError("Person does not exist", 400)
+    if not totals["has_cheque_account"]:
+        raise serializers.ValidationError("Please create a cheque account first", 400)
+
+    summary = {
+        "pending_cheques": totals["external_balance"]
+        - (totals["recovered"] + totals["passed"] + totals["cleared_transferred"]),
+        "pending_cheques_count": totals["pending_count"],
+        "transferred_cheques": totals["transferred"],
+        "transferred_to_this_person": totals["transferred_to_this_person"],
+        "personal_pending": totals["personal_pending"],
+    }
+    if cache is not None:
+        cache.set(key, summary)
+    return summary
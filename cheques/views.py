@@ -15,11 +15,17 @@ from rest_framework.views import APIView
 import authentication.constants as PERMISSIONS
 from authentication.mixins import CheckPermissionsMixin
 from essentials.models import AccountType
+from ledgers.models import Ledger
 from logs.choices import ActivityCategory, ActivityTypes
 from logs.models import Log
 
 from .choices import ChequeStatusChoices, PersonalChequeStatusChoices
-from .models import ExternalCheque, ExternalChequeHistory, ExternalChequeTransfer
+from .models import (
+    ExternalCheque,
+    ExternalChequeHistory,
+    ExternalChequeTransfer,
+    PersonalCheque,
+)
 from .queries import (
     ExternalChequeHistoryQuery,
     ExternalChequeQuery,
@@ -443,6 +449,9 @@ class DeleteExternalChequeView(
     permissions = [PERMISSIONS.CAN_DELETE_EXTERNAL_CHEQUE]
     serializer_class = ExternalChequeSerializer
 
+    def perform_destroy(self, instance):
+        Ledger.delete_with_entries(ExternalCheque.objects.filter(id=instance.id))
+
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         log_string = f"CHE-{instance.serial} deleted"
@@ -482,6 +491,9 @@ class DeletePersonalChequeView(
     permissions = [PERMISSIONS.CAN_DELETE_PERSONAL_CHEQUE]
     serializer_class = IssuePersonalChequeSerializer
 
+    def perform_destroy(self, instance):
+        Ledger.delete_with_entries(PersonalCheque.objects.filter(id=instance.id))
+
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         log_string = f"CHP-{instance.serial} deleted"
@@ -0,0 +1,12 @@
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def get_shared_cache():
+    """
+    the default cache when every worker of the app reads the same entries, None
+    for a process local backend where an invalidation made by one worker would
+    leave the entries of the others in place
+    """
+    cache = caches["default"]
+    return None if isinstance(cache, LocMemCache) else cache
@@ -1,9 +1,12 @@
 from datetime import datetime
 from uuid import uuid4
 
-from django.db import models
+from authentication.models import SerialSequence
+from django.db import connection, models
 from django.db.models import Max
 
+from .signals import bulk_create
+
 
 class ID(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
@@ -23,9 +26,115 @@ class DateTimeAwareModel(models.Model):
 
 
 class NextSerial:
+    """
+    serials handed out from a counter per branch, split by the value of serial_key
+    when the model sets it, serial_branch is the lookup from the model to its branch
+    """
+
+    serial_field = "serial"
+    serial_branch = "branch"
+    serial_key = None
+
     @classmethod
-    def get_next_serial(cls, field, **kwargs):
+    def get_max_serial(cls, branch, key=None):
+        filters = {cls.serial_branch: branch}
+        if cls.serial_key:
+            filters[cls.serial_key] = key
         return (
-            cls.objects.filter(**kwargs).aggregate(max_serial=Max(field))["max_serial"]
+            cls.objects.filter(**filters).aggregate(max_serial=Max(cls.serial_field))[
+                "max_serial"
+            ]
             or 0
-        ) + 1
+        )
+
+    @classmethod
+    def get_next_serials(cls, branch, key=None, count=1):
+        last = SerialSequence.allocate(
+            branch,
+            cls._meta.label_lower,
+            str(getattr(key, "pk", key)) if cls.serial_key else "",
+            lambda: cls.get_max_serial(branch, key),
+            count,
+        )
+        return list(range(last - count + 1, last + 1))
+
+    @classmethod
+    def get_next_serial(cls, branch, key=None):
+        return cls.get_next_serials(branch, key)[0]
+
+
+class UnitOfWork:
+    """
+    collects the unsaved rows of a document and writes them with one bulk_create per
+    model, in the order the first row of every model was added. ids are set when the
+    rows are built so rows linking to each other are written together
+    """
+
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, *rows):
+        for row in rows:
+            self.rows.setdefault(type(row), []).append(row)
+        return self
+
+    def flush(self):
+        for model, rows in self.rows.items():
+            bulk_create(model, rows)
+        self.rows = {}
+
+
+def add_to_balances(model, keys, columns, deltas, create=True):
+    """
+    adds deltas keyed by the values of the keys fields to the columns of the rows of
+    model in one statement, deltas hold a tuple of amounts in the order of columns.
+    create=True inserts the missing rows (keys must be unique together), otherwise
+    only the rows that exist are updated. rows are written in key order so
+    concurrent writers lock them in the same order
+    """
+    key_fields = [model._meta.get_field(name) for name in keys]
+    fields = key_fields + [model._meta.get_field(name) for name in columns]
+    rows = {}
+    for key, amounts in deltas.items():
+        # the same key may come as an instance, a uuid or a string
+        key = tuple(
+            field.get_db_prep_value(value, connection)
+            for field, value in zip(key_fields, key)
+        )
+        rows[key] = [
+            sum(pair) for pair in zip(rows.get(key, [0.0] * len(columns)), amounts)
+        ]
+    if not rows:
+        return
+
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    names = [quote(field.column) for field in fields]
+    key_names, column_names = names[: len(keys)], names[len(keys) :]
+    params = []
+    for key, amounts in sorted(rows.items(), key=lambda row: str(row[0])):
+        params += [uuid4()] if create else []
+        params += [*key, *amounts]
+    if create:
+        row = ", ".join(["%s"] * (len(fields) + 1))
+        additions = ", ".join(
+            f"{name} = {table}.{name} + EXCLUDED.{name}" for name in column_names
+        )
+        sql = (
+            f"INSERT INTO {table} ({quote(model._meta.pk.column)}, {', '.join(names)}) "
+            f"VALUES {', '.join([f'({row})'] * len(rows))} "
+            f"ON CONFLICT ({', '.join(key_names)}) DO UPDATE SET {additions}"
+        )
+    else:
+        row = ", ".join(f"CAST(%s AS {field.db_type(connection)})" for field in fields)
+        additions = ", ".join(
+            f"{name} = {table}.{name} + delta.{name}" for name in column_names
+        )
+        matches = " AND ".join(f"{table}.{name} = delta.{name}" for name in key_names)
+        sql = (
+            f"UPDATE {table} SET {additions} "
+            f"FROM (VALUES {', '.join([f'({row})'] * len(rows))}) "
+            f"AS delta ({', '.join(names)}) WHERE {matches}"
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
@@ -1,3 +1,4 @@
+from django.db import connection
 from rest_framework.pagination import PageNumberPagination
 
 
@@ -13,6 +14,32 @@ class SmallPagination(PageNumberPagination):
     page_size = 50
 
 
+class RawQueryRows:
+    """rows of a raw sql query as dicts, counted and sliced in the database by paginators"""
+
+    def __init__(self, sql, params, columns):
+        self.sql = sql
+        self.params = params
+        self.columns = columns
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM ({self.sql}) counted", self.params)
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key : key + 1][0]
+        start = key.start or 0
+        limit = "" if key.stop is None else f" LIMIT {int(key.stop) - int(start)}"
+        with connection.cursor() as cursor:
+            cursor.execute(f"{self.sql}{limit} OFFSET {int(start)}", self.params)
+            return [dict(zip(self.columns, row)) for row in cursor.fetchall()]
+
+
 class PaginationHandlerMixin(object):
     @property
     def paginator(self):
@@ -0,0 +1,49 @@
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError
+from django.db.models import Exists, OuterRef
+from django.dispatch import Signal
+
+# sent with the created instances after a bulk_create, which skips post_save
+post_bulk_create = Signal()
+
+# sent with the deleted instances after a bulk_delete, which skips post_delete
+post_bulk_delete = Signal()
+
+
+def bulk_create(model, instances, **kwargs):
+    """bulk_create that lets the post_bulk_create receivers maintain their figures"""
+    instances = model.objects.bulk_create(instances, **kwargs)
+    if instances:
+        post_bulk_create.send(sender=model, instances=instances)
+    return instances
+
+
+def bulk_delete(queryset, instances=None):
+    """
+    deletes the rows of queryset in one statement. it skips the cascades on purpose,
+    the caller deletes whatever references the rows first and an IntegrityError is
+    raised when a row is still referenced. the post_bulk_delete receivers reverse
+    their figures with the deleted instances
+    """
+    model = queryset.model
+    if instances is None and post_bulk_delete.has_listeners(model):
+        instances = list(queryset)
+        queryset = model.objects.filter(pk__in=[instance.pk for instance in instances])
+    references = [
+        Exists(
+            relation.related_model._base_manager.filter(
+                **{relation.field.name: OuterRef(relation.field.target_field.attname)}
+            )
+        )
+        for relation in model._meta.related_objects
+    ]
+    if references and queryset.filter(reduce(or_, references)).exists():
+        raise IntegrityError(
+            f"{model._meta.label} rows are still referenced and can not be bulk deleted"
+        )
+    deleted = queryset._raw_delete(queryset.db)
+    if instances:
+        post_bulk_delete.send(sender=model, instances=instances)
+    return deleted
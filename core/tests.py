@@ -1,3 +1,142 @@
-from django.test import TestCase
+from datetime import datetime
+from io import StringIO
 
-# Create your tests here.
+import authentication.constants as PERMISSIONS
+from authentication.choices import RoleChoices
+from authentication.models import Branch, UserBranchRelation
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from essentials.choices import LinkedAccountChoices, PersonChoices
+from essentials.models import (
+    AccountType,
+    LinkedAccount,
+    Person,
+    Product,
+    ProductCategory,
+    Stock,
+    Warehouse,
+)
+from ledgers.models import PersonBalance
+from rest_framework.test import APIClient
+
+# every permission a user can be given
+ALL_PERMISSIONS = [
+    value
+    for name, value in vars(PERMISSIONS).items()
+    if name.startswith("CAN_") and isinstance(value, str)
+]
+
+
+class BranchTestMixin:
+    """
+    a branch with a logged in admin, a cash and a cheque account, two warehouses,
+    products with opening stock, customers and a supplier
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.branch = Branch.objects.create(name="main")
+        cls.user = User.objects.create_user(username="admin", password="admin")
+        cls.user_branch = UserBranchRelation.objects.create(
+            user=cls.user,
+            branch=cls.branch,
+            role=RoleChoices.ADMIN,
+            is_logged_in=True,
+            permissions=ALL_PERMISSIONS,
+        )
+        cls.cash = AccountType.objects.create(
+            branch=cls.branch, name="cash", opening_balance=1000
+        )
+        cls.cheque_account = AccountType.objects.create(branch=cls.branch, name="cheque")
+        LinkedAccount.objects.create(
+            name=LinkedAccountChoices.CHEQUE_ACCOUNT, account=cls.cheque_account
+        )
+        cls.category = ProductCategory.objects.create(branch=cls.branch, name="cloth")
+        cls.warehouse = Warehouse.objects.create(branch=cls.branch, name="shop")
+        cls.other_warehouse = Warehouse.objects.create(branch=cls.branch, name="godown")
+        cls.products = [
+            Product.objects.create(name=f"product {i}", category=cls.category)
+            for i in range(3)
+        ]
+        for product in cls.products:
+            Stock.objects.create(
+                product=product,
+                warehouse=cls.warehouse,
+                yards_per_piece=10,
+                opening_stock=1000,
+                opening_stock_rate=5,
+            )
+        cls.customer = Person.objects.create(
+            branch=cls.branch, name="customer", person_type=PersonChoices.CUSTOMER
+        )
+        cls.other_customer = Person.objects.create(
+            branch=cls.branch, name="other customer", person_type=PersonChoices.CUSTOMER
+        )
+        cls.supplier = Person.objects.create(
+            branch=cls.branch, name="supplier", person_type=PersonChoices.SUPPLIER
+        )
+
+    def setUp(self):
+        super().setUp()
+        # requests come through the https proxy like they do in production
+        self.client = APIClient(HTTP_X_FORWARDED_PROTO="https")
+        self.client.force_authenticate(self.user)
+
+    def get_transaction_data(self, person, serial_type, nature, lines, **kwargs):
+        """request body of a transaction with lines of (product, quantity, rate)"""
+        return {
+            "date": datetime(2022, 1, 1).isoformat(),
+            "person": str(person.id),
+            "nature": nature,
+            "type": "credit",
+            "serial_type": serial_type,
+            "discount": 0,
+            "paid": False,
+            "paid_amount": 0,
+            "manual_serial": None,
+            "wasooli_number": None,
+            "detail": None,
+            "builty": None,
+            "is_cancelled": False,
+            "transaction_detail": [
+                {
+                    "product": str(product.id),
+                    "warehouse": str(self.warehouse.id),
+                    "yards_per_piece": 10,
+                    "quantity": quantity,
+                    "rate": rate,
+                }
+                for product, quantity, rate in lines
+            ],
+            **kwargs,
+        }
+
+    def create_transaction(self, person, serial_type, nature, lines, **kwargs):
+        response = self.client.post(
+            "/transaction/create/",
+            self.get_transaction_data(person, serial_type, nature, lines, **kwargs),
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def assertBalancesRebuilt(self):
+        """
+        the kept stock balances, product costs, account balances and person
+        balances equal a rebuild from history
+        """
+        for command, drifted in [
+            ("rebuild_stock_balance", "0 stock balances drifted"),
+            ("rebuild_product_cost", "0 product costs drifted"),
+            ("rebuild_account_balances", "0 account balances drifted"),
+        ]:
+            out = StringIO()
+            call_command(command, self.branch.name, "--check", stdout=out)
+            self.assertIn(drifted, out.getvalue())
+        summed = PersonBalance.get_balances(self.branch, datetime.max)
+        kept = PersonBalance.get_balances(self.branch)
+        self.assertEqual(
+            {p.id: round(p.balance, 3) for p in summed if round(p.balance, 3)},
+            {p.id: round(p.balance, 3) for p in kept if round(p.balance, 3)},
+        )
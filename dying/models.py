@@ -23,16 +23,16 @@ class DyingIssue(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
     dying_unit = models.ForeignKey(DyingUnit, on_delete=models.CASCADE)
     dying_lot_number = models.PositiveBigIntegerField()
 
+    serial_field = "dying_lot_number"
+    serial_branch = "dying_unit__branch"
+
     @classmethod
-    def create_auto_issued_lot(cls, branch, dying_unit, lot_number, **kwargs):
-        instance = DyingIssue.objects.create(
-            dying_unit=DyingUnit.objects.get(id=dying_unit),
-            dying_lot_number=DyingIssue.get_next_serial(
-                "dying_lot_number", dying_unit__branch=branch
-            ),
-            **kwargs
+    def get_auto_issued_rows(cls, dying_unit, dying_lot_number, lot_number, **kwargs):
+        """unsaved dying issue of a lot issued as it is bought, with its lot"""
+        instance = DyingIssue(
+            dying_unit=dying_unit, dying_lot_number=dying_lot_number, **kwargs
         )
-        DyingIssueLot.objects.create(dying_lot=instance, lot_number=lot_number)
+        return [instance, DyingIssueLot(dying_lot=instance, lot_number=lot_number)]
 
 
 class DyingIssueLot(ID):
@@ -1,4 +1,6 @@
-from rawtransactions.models import RawLotDetail
+from collections import defaultdict
+
+from rawtransactions.models import RawLotBalance, RawLotDetail
 from rawtransactions.serializers import StockCheck, UniqueLotNumbers
 from rest_framework import serializers
 
@@ -116,10 +118,9 @@ class IssueForDyingSerializer(UniqueLotNumbers, StockCheck, serializers.ModelSer
         dying_issue_instance = DyingIssue.objects.create(
             **validated_data,
             user=user,
-            dying_lot_number=DyingIssue.get_next_serial(
-                "dying_lot_number", branch=self.branch
-            )
+            dying_lot_number=DyingIssue.get_next_serial(self.branch)
         )
+        stock_deltas = defaultdict(float)
         for lot in data:
             dying_issue_lot_instance = DyingIssueLot.objects.create(
                 dying_lot=dying_issue_instance,
@@ -131,5 +132,7 @@ class IssueForDyingSerializer(UniqueLotNumbers, StockCheck, serializers.ModelSer
                     DyingIssueDetail(dying_lot_number=dying_issue_lot_instance, **detail)
                 )
             DyingIssueDetail.objects.bulk_create(current_details)
+            RawLotBalance.get_deltas(lot["lot_number"], current_details, -1, stock_deltas)
+        RawLotBalance.apply_deltas(stock_deltas)
         validated_data["data"] = data
         return validated_data
@@ -68,6 +68,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "authentication.middlewares.request.RequestMiddleware",
+    "transactions.middlewares.inventory.InventoryMemoMiddleware",
 ]
 
 ROOT_URLCONF = "easyaccounts.urls"
@@ -178,6 +179,22 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=1),
 }
 
+"""Cache settings"""
+
+# logins and cheque summaries are only cached in a backend every worker shares
+# (e.g. CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache or
+# django_redis.cache.RedisCache), with the process local default they are read from
+# the database on every request
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+        "TIMEOUT": int(os.getenv("CACHE_TIMEOUT", "300")),
+    }
+}
+
 """S3 settings"""
 
 S3_ENABLED = os.getenv("S3_ENABLED", "True") == "True"
@@ -1,9 +1,10 @@
 from django.contrib import admin
+from ledgers.admin import LedgerEntriesAdmin
 
 from .models import *
 
 
-class PersonAdmin(admin.ModelAdmin):
+class PersonAdmin(LedgerEntriesAdmin):
     list_display = ["id", "name", "person_type"]
     list_filter = ["branch__name", "name", "person_type"]
     search_fields = ["name", "phone_number"]
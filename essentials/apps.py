@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class EssentialsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "essentials"
+
+    def ready(self):
+        import essentials.signals
@@ -3,6 +3,7 @@ import os
 from datetime import datetime
 
 from authentication.models import Branch
+from core.signals import bulk_create
 from django.core.management.base import BaseCommand, CommandError
 from essentials.models import Area, Person
 from ledgers.models import Ledger, LedgerAndDetail
@@ -66,6 +67,7 @@ class Command(BaseCommand):
                             ledger = Ledger(
                                 amount=abs(balance),
                                 person=person,
+                                branch=branch,
                                 nature="C" if balance > 0.0 else "D",
                                 date=opening_date,
                             )
@@ -78,6 +80,6 @@ class Command(BaseCommand):
         except IOError:
             raise CommandError(f"{file}.csv does not exist")
         Person.objects.bulk_create(persons)
-        Ledger.objects.bulk_create(ledgers)
+        bulk_create(Ledger, ledgers)
         LedgerAndDetail.objects.bulk_create(ledgers_and_details)
         self.stdout.write(self.style.SUCCESS(f"Persons created"))
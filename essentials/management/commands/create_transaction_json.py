@@ -1,9 +1,10 @@
 import json
 import os
 
+from core.signals import bulk_create
 from django.core.management.base import BaseCommand, CommandError
 from essentials.models import Person, Product, Warehouse
-from transactions.models import Transaction, TransactionDetail
+from transactions.models import StockMovement, Transaction, TransactionDetail
 
 
 class Command(BaseCommand):
@@ -30,6 +31,7 @@ class Command(BaseCommand):
                     detail_records.append(
                         TransactionDetail(
                             transaction=transaction,
+                            branch_id=transaction.branch_id,
                             product=product,
                             warehouse=warehouse,
                             yards_per_piece=d["yards_per_piece"],
@@ -37,7 +39,11 @@ class Command(BaseCommand):
                             quantity=d["quantity"],
                         )
                     )
-                TransactionDetail.objects.bulk_create(detail_records)
+                bulk_create(TransactionDetail, detail_records)
+                bulk_create(
+                    StockMovement,
+                    [StockMovement.for_transaction_detail(d) for d in detail_records],
+                )
         except IOError:
             raise CommandError(f"{file}.json does not exist")
         self.stdout.write(
@@ -0,0 +1,67 @@
+import os
+
+from authentication.models import Branch
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.serializers import ValidationError
+from transactions.models import Transaction
+from transactions.utils import get_batches, read_transaction_rows
+
+
+class Command(BaseCommand):
+    help = "Imports transactions from a csv or json file in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("branch", type=str)
+        parser.add_argument("file", type=str, help="csv or json file in the data folder")
+        parser.add_argument(
+            "-u",
+            "--user",
+            type=str,
+            help="Username the transactions are created by",
+        )
+        parser.add_argument(
+            "-s",
+            "--batch-size",
+            type=int,
+            default=500,
+            dest="batch_size",
+            help="Transactions validated and written together",
+        )
+
+    def handle(self, *args, **options):
+        file = options["file"]
+        file_format = os.path.splitext(file)[1][1:].lower()
+        if file_format not in ["csv", "json"]:
+            raise CommandError("Only csv and json files can be imported")
+        path = os.path.dirname(os.path.abspath(__file__)) + f"/data/{file}"
+        try:
+            branch = Branch.objects.get(name=options["branch"])
+        except Branch.DoesNotExist:
+            raise CommandError(f"Branch {options['branch']} does not exist")
+        user = None
+        if options["user"]:
+            try:
+                user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist")
+
+        imported = 0
+        try:
+            with open(path, mode="r", encoding="utf-8-sig") as f:
+                for batch in get_batches(
+                    read_transaction_rows(f, file_format), options["batch_size"]
+                ):
+                    with transaction.atomic():
+                        imported += len(
+                            Transaction.import_transactions(branch, user, batch)
+                        )
+                    self.stdout.write(f"{imported} transactions imported")
+        except IOError:
+            raise CommandError(f"{file} does not exist")
+        except ValidationError as e:
+            raise CommandError(
+                f"{e.detail[0]}, {imported} transactions were imported before it"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{imported} transactions imported"))
@@ -0,0 +1,72 @@
+from collections import defaultdict
+
+from authentication.models import Branch
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from essentials.models import AccountBalance
+from essentials.utils import get_account_movements
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily account balances of a branch from the complete history"
+
+    def add_arguments(self, parser):
+        parser.add_argument("branch", type=str)
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            dest="check",
+            default=False,
+            help="Only report the balances that drifted, do not rebuild",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            branch = Branch.objects.get(name=options["branch"])
+        except Branch.DoesNotExist:
+            raise CommandError(f"Branch {options['branch']} does not exist")
+
+        movements = get_account_movements(branch)
+        expected = defaultdict(dict)
+        for (account_type, day), amounts in movements.items():
+            expected[account_type][day] = amounts
+        current = defaultdict(dict)
+        for b in AccountBalance.objects.filter(account_type__branch=branch).values(
+            "account_type", "date", *AccountBalance.COLUMNS
+        ):
+            current[b["account_type"]][b["date"]] = b
+
+        # stored rows are running totals, the computed ones are movements of a day
+        drifted = 0
+        for account_type in expected.keys() | current.keys():
+            running = defaultdict(float)
+            stored = defaultdict(float)
+            days = expected[account_type].keys() | current[account_type].keys()
+            for day in sorted(days):
+                for column, amount in expected[account_type].get(day, {}).items():
+                    running[column] += amount
+                if day in current[account_type]:
+                    stored = current[account_type][day]
+                if any(
+                    abs(running[column] - stored[column]) > 0.001
+                    for column in AccountBalance.COLUMNS
+                ):
+                    drifted += 1
+                    self.stdout.write(
+                        f"{account_type}|{day}: "
+                        + ", ".join(
+                            f"{column} {stored[column]} != {running[column]}"
+                            for column in AccountBalance.COLUMNS
+                        )
+                    )
+
+        if not options["check"]:
+            with transaction.atomic():
+                AccountBalance.rebuild(branch, movements)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{drifted} account balances drifted"
+                f"{'' if options['check'] else ', account balances rebuilt'}"
+            )
+        )
@@ -0,0 +1,57 @@
+from authentication.models import Branch
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from ledgers.models import RENDERED_LINK_MODELS
+
+
+class Command(BaseCommand):
+    help = (
+        "Renders the stored description and reference of every ledger entry of a branch"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("branch", type=str)
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            dest="check",
+            default=False,
+            help="Only report the entries that are out of date, do not render",
+        )
+        parser.add_argument(
+            "-s",
+            "--batch-size",
+            type=int,
+            default=1000,
+            dest="batch_size",
+            help="Links rendered together",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            branch = Branch.objects.get(name=options["branch"])
+        except Branch.DoesNotExist:
+            raise CommandError(f"Branch {options['branch']} does not exist")
+
+        batch_size = options["batch_size"]
+        drifted = 0
+        for model in RENDERED_LINK_MODELS:
+            ids = list(
+                model.objects.filter(ledger_entry__branch=branch)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+            for start in range(0, len(ids), batch_size):
+                batch = ids[start : start + batch_size]
+                if options["check"]:
+                    drifted += len(model.get_rendered_entries(pk__in=batch))
+                else:
+                    with transaction.atomic():
+                        drifted += len(model.render_entries(pk__in=batch))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{drifted} ledger entries out of date"
+                f"{'' if options['check'] else ', ledger entries rendered'}"
+            )
+        )
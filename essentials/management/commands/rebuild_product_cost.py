@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from authentication.models import Branch
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from essentials.models import ProductCost
+from transactions.models import TransactionDetail
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the average cost inputs of a branch's products from the complete history"
+
+    def add_arguments(self, parser):
+        parser.add_argument("branch", type=str)
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            dest="check",
+            default=False,
+            help="Only report the costs that drifted, do not rebuild",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            branch = Branch.objects.get(name=options["branch"])
+        except Branch.DoesNotExist:
+            raise CommandError(f"Branch {options['branch']} does not exist")
+
+        cutoff = (datetime.max, True)
+        expected = TransactionDetail.get_inventory_valuation(branch, [cutoff])[cutoff]
+        current = {
+            str(c.product_id): c
+            for c in ProductCost.objects.filter(product__category__branch=branch)
+        }
+
+        drifted = 0
+        for product in expected.keys() | current.keys():
+            expected_value = expected[product]["value"] if product in expected else 0.0
+            expected_purchases = (
+                expected[product]["purchases"] if product in expected else 0.0
+            )
+            cost = current.get(product)
+            value, purchases = (cost.value, cost.purchases) if cost else (0.0, 0.0)
+            if (
+                abs(expected_value - value) > 0.001
+                or abs(expected_purchases - purchases) > 0.001
+            ):
+                drifted += 1
+                self.stdout.write(
+                    f"{product}: {value}/{purchases} "
+                    f"!= {expected_value}/{expected_purchases}"
+                )
+
+        if not options["check"]:
+            with transaction.atomic():
+                ProductCost.rebuild(branch, expected)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{drifted} product costs drifted"
+                f"{'' if options['check'] else ', product costs rebuilt'}"
+            )
+        )
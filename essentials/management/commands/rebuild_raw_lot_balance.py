@@ -0,0 +1,53 @@
+from authentication.models import Branch
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rawtransactions.models import RawLotBalance
+from rawtransactions.utils import get_all_raw_stock
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the raw lot balances of a branch from the complete raw stock history"
+
+    def add_arguments(self, parser):
+        parser.add_argument("branch", type=str)
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            dest="check",
+            default=False,
+            help="Only report the balances that drifted, do not rebuild",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            branch = Branch.objects.get(name=options["branch"])
+        except Branch.DoesNotExist:
+            raise CommandError(f"Branch {options['branch']} does not exist")
+
+        expected = get_all_raw_stock(branch)
+        current = {
+            RawLotBalance.get_key(b.lot_id, b): b.quantity
+            for b in RawLotBalance.objects.filter(
+                lot__raw_transaction__person__branch=branch, lot__issued=False
+            )
+        }
+
+        drifted = 0
+        for key in expected.keys() | current.keys():
+            if abs(expected.get(key, 0.0) - current.get(key, 0.0)) > 0.001:
+                drifted += 1
+                self.stdout.write(
+                    f"{'|'.join(map(str, key))}: {current.get(key, 0.0)} "
+                    f"!= {expected.get(key, 0.0)}"
+                )
+
+        if not options["check"]:
+            with transaction.atomic():
+                RawLotBalance.rebuild(branch, expected)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{drifted} raw lot balances drifted"
+                f"{'' if options['check'] else ', raw lot balances rebuilt'}"
+            )
+        )
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from authentication.models import Branch
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from essentials.models import StockBalance
+from transactions.models import Transaction
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the stock balances of a branch from the complete stock history"
+
+    def add_arguments(self, parser):
+        parser.add_argument("branch", type=str)
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            dest="check",
+            default=False,
+            help="Only report the balances that drifted, do not rebuild",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            branch = Branch.objects.get(name=options["branch"])
+        except Branch.DoesNotExist:
+            raise CommandError(f"Branch {options['branch']} does not exist")
+
+        stock = [
+            s
+            for s in Transaction.get_all_stock(branch, datetime.max)
+            if s["warehouse"] != "None"
+        ]
+        expected = {
+            (s["product"], s["warehouse"], s["yards_per_piece"]): s["quantity"]
+            for s in stock
+        }
+        current = {
+            (str(b.product_id), str(b.warehouse_id), b.yards_per_piece): b.quantity
+            for b in StockBalance.objects.filter(warehouse__branch=branch)
+        }
+
+        drifted = 0
+        for key in expected.keys() | current.keys():
+            if abs(expected.get(key, 0.0) - current.get(key, 0.0)) > 0.001:
+                drifted += 1
+                self.stdout.write(
+                    f"{'|'.join(map(str, key))}: {current.get(key, 0.0)} "
+                    f"!= {expected.get(key, 0.0)}"
+                )
+
+        if not options["check"]:
+            with transaction.atomic():
+                StockBalance.rebuild(branch, stock)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{drifted} stock balances drifted"
+                f"{'' if options['check'] else ', stock balances rebuilt'}"
+            )
+        )
@@ -0,0 +1,44 @@
+from datetime import date, datetime, timedelta
+
+from authentication.models import Branch
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from transactions.models import StockSnapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Stores the closing stock of a day, run nightly to keep stock as of a date fast"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-b",
+            "--branch",
+            type=str,
+            help="Branch to snapshot, defaults to every branch",
+        )
+        parser.add_argument(
+            "-d",
+            "--date",
+            type=str,
+            help="Day whose closing stock is stored (YYYY-MM-DD), defaults to yesterday",
+        )
+
+    def handle(self, *args, **options):
+        branches = Branch.objects.all()
+        if options["branch"]:
+            branches = branches.filter(name=options["branch"])
+            if not branches.exists():
+                raise CommandError(f"Branch {options['branch']} does not exist")
+        day = (
+            datetime.strptime(options["date"], "%Y-%m-%d").date()
+            if options["date"]
+            else date.today() - timedelta(days=1)
+        )
+
+        for branch in branches:
+            with transaction.atomic():
+                snapshots = StockSnapshot.take(branch, day)
+            self.stdout.write(f"{branch.name}: {len(snapshots)} stock rows on {day}")
+        self.stdout.write(self.style.SUCCESS("Stock snapshots taken"))
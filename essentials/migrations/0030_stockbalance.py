@@ -0,0 +1,28 @@
+# Generated by Django 3.2.13 on 2026-10-18 17:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('essentials', '0029_auto_20220718_1511'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockBalance',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('yards_per_piece', models.FloatField()),
+                ('quantity', models.FloatField(default=0.0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='essentials.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='essentials.warehouse')),
+            ],
+            options={
+                'unique_together': {('product', 'warehouse', 'yards_per_piece')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.13 on 2026-10-18 17:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('essentials', '0030_stockbalance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCost',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('value', models.FloatField(default=0.0)),
+                ('purchases', models.FloatField(default=0.0)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cost', to='essentials.product')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
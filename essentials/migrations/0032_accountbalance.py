@@ -0,0 +1,29 @@
+# Generated by Django 3.2.13 on 2026-10-18 17:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('essentials', '0031_productcost'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountBalance',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('ledgers', models.FloatField(default=0.0)),
+                ('cheques', models.FloatField(default=0.0)),
+                ('expenses', models.FloatField(default=0.0)),
+                ('account_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances', to='essentials.accounttype')),
+            ],
+            options={
+                'unique_together': {('account_type', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+
+def populate_account_balance(apps, schema_editor):
+    AccountBalance = apps.get_model("essentials", "AccountBalance")
+    Ledger = apps.get_model("ledgers", "Ledger")
+    ExternalChequeHistory = apps.get_model("cheques", "ExternalChequeHistory")
+    PersonalCheque = apps.get_model("cheques", "PersonalCheque")
+    ExpenseDetail = apps.get_model("expenses", "ExpenseDetail")
+
+    movements = defaultdict(lambda: defaultdict(lambda: defaultdict(float)))
+
+    def add(queryset, column, sign=1, nature=False):
+        values = ["account_type", "day", *(["nature"] if nature else [])]
+        for m in (
+            queryset.filter(account_type__isnull=False)
+            .annotate(day=TruncDate("date"))
+            .values(*values)
+            .order_by()
+            .annotate(total=Sum("amount"))
+        ):
+            amount = sign * m["total"]
+            if nature and m["nature"] != "C":
+                amount = -amount
+            movements[m["account_type"]][m["day"]][column] += amount
+
+    add(Ledger.objects.all(), "ledgers", nature=True)
+    add(ExternalChequeHistory.objects.filter(return_cheque__isnull=True), "cheques")
+    add(PersonalCheque.objects.filter(status="cleared"), "cheques", -1)
+    add(ExpenseDetail.objects.all(), "expenses")
+
+    balances = []
+    for account_type, days in movements.items():
+        running = defaultdict(float)
+        for day in sorted(days.keys()):
+            for column, amount in days[day].items():
+                running[column] += amount
+            balances.append(
+                AccountBalance(account_type_id=account_type, date=day, **running)
+            )
+    AccountBalance.objects.bulk_create(balances, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("essentials", "0032_accountbalance"),
+        ("ledgers", "0026_ledgeranddetail"),
+        ("cheques", "0017_auto_20230614_0043"),
+        ("expenses", "0012_alter_expenseaccount_type"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_account_balance, migrations.RunPython.noop),
+    ]
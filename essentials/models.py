@@ -1,12 +1,16 @@
+from collections import defaultdict
 from datetime import datetime
+from functools import reduce
+from operator import or_
 
 from django.core.validators import MinValueValidator, RegexValidator
-from django.db import models
-from django.db.models import F, Sum
+from django.db import models, transaction
+from django.db.models import Exists, F, FilteredRelation, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 
 from authentication.models import BranchAwareModel
 from core.constants import MIN_POSITIVE_VAL_SMALL
-from core.models import ID
+from core.models import ID, add_to_balances
 
 from .choices import LinkedAccountChoices, PersonChoices
 
@@ -113,6 +117,271 @@ class Stock(ID):
         )
 
 
+class StockBalance(ID):
+    """Current stock quantity, maintained incrementally by every stock movement"""
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE)
+    yards_per_piece = models.FloatField()
+    quantity = models.FloatField(default=0.0)
+
+    class Meta:
+        unique_together = ("product", "warehouse", "yards_per_piece")
+
+    @classmethod
+    def get_key_filter(cls, keys, warehouse="warehouse"):
+        """Q object matching any of the (product, warehouse, yards_per_piece) keys"""
+        return reduce(
+            or_,
+            [
+                Q(
+                    **{
+                        "product": key[0],
+                        warehouse: key[1],
+                        "yards_per_piece": key[2],
+                    }
+                )
+                for key in keys
+            ],
+        )
+
+    @classmethod
+    def apply_deltas(cls, deltas, create=True):
+        """
+        add quantity deltas keyed by (product, warehouse, yards_per_piece),
+        create=False only updates the balances that exist
+        """
+        add_to_balances(
+            StockBalance,
+            ["product", "warehouse", "yards_per_piece"],
+            ["quantity"],
+            {key: (quantity,) for key, quantity in deltas.items() if quantity},
+            create,
+        )
+
+    @classmethod
+    def get_negative_balances(cls, keys):
+        """balances of the given keys that are below zero"""
+        if not keys:
+            return StockBalance.objects.none()
+        return StockBalance.objects.select_related("product").filter(
+            StockBalance.get_key_filter(keys),
+            quantity__lt=-MIN_POSITIVE_VAL_SMALL,
+        )
+
+    @classmethod
+    def get_low_stock(
+        cls,
+        branch,
+        threshold,
+        category=None,
+        warehouse=None,
+        ignore_gazaana=False,
+        ignore_warehouse=False,
+    ):
+        """
+        stock at or below threshold of every product of the branch in one grouped
+        query, products without any stock come along as rows of their product alone
+        """
+        products = Product.objects.filter(category__branch=branch)
+        if category:
+            products = products.filter(category=category)
+        condition = Q(stockbalance__warehouse=warehouse) if warehouse else Q()
+        group = {"product": F("id")}
+        if not ignore_warehouse:
+            group["warehouse"] = F("balance__warehouse")
+        if not ignore_gazaana:
+            group["yards_per_piece"] = F("balance__yards_per_piece")
+        rows = (
+            products.annotate(
+                balance=FilteredRelation("stockbalance", condition=condition)
+            )
+            .values(**group)
+            .order_by()
+            .annotate(quantity=Sum("balance__quantity"))
+            .filter(Q(quantity__lte=threshold) | Q(quantity__isnull=True))
+        )
+        return [
+            row if row["quantity"] is not None else {"product": row["product"]}
+            for row in rows
+        ]
+
+    @classmethod
+    def rebuild(cls, branch, stock):
+        """replace balances of the branch with a freshly computed stock list"""
+        StockBalance.objects.filter(warehouse__branch=branch).delete()
+        StockBalance.objects.bulk_create(
+            [
+                StockBalance(
+                    product_id=s["product"],
+                    warehouse_id=s["warehouse"],
+                    yards_per_piece=s["yards_per_piece"],
+                    quantity=s["quantity"],
+                )
+                for s in stock
+            ]
+        )
+
+
+class ProductCost(ID):
+    """Weighted average cost inputs of a product, maintained by every purchase and return"""
+
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name="cost")
+    value = models.FloatField(default=0.0)
+    purchases = models.FloatField(default=0.0)
+
+    @staticmethod
+    def get_empty_deltas():
+        return defaultdict(lambda: [0.0, 0.0])
+
+    @classmethod
+    def apply_deltas(cls, deltas, create=True):
+        """
+        add [value, purchases] deltas keyed by product, create=False only updates
+        the costs that exist
+        """
+        add_to_balances(
+            ProductCost,
+            ["product"],
+            ["value", "purchases"],
+            {(product,): tuple(delta) for product, delta in deltas.items() if any(delta)},
+            create,
+        )
+
+    @classmethod
+    def rebuild(cls, branch, valuation):
+        """replace costs of the branch's products with a freshly computed valuation"""
+        ProductCost.objects.filter(product__category__branch=branch).delete()
+        ProductCost.objects.bulk_create(
+            [
+                ProductCost(
+                    product_id=product,
+                    value=values["value"],
+                    purchases=values["purchases"],
+                )
+                for product, values in valuation.items()
+            ]
+        )
+
+
+class AccountBalance(ID):
+    """
+    Movements of an account from the start till the end of a day, maintained by
+    every posting to the account. The opening balance of the account is not included
+    """
+
+    COLUMNS = ["ledgers", "cheques", "expenses"]
+
+    account_type = models.ForeignKey(
+        AccountType, on_delete=models.CASCADE, related_name="balances"
+    )
+    date = models.DateField()
+    ledgers = models.FloatField(default=0.0)
+    cheques = models.FloatField(default=0.0)
+    expenses = models.FloatField(default=0.0)
+
+    class Meta:
+        unique_together = ("account_type", "date")
+
+    @classmethod
+    def post(cls, postings):
+        """
+        the posting hook for every account movement, adds amounts keyed by
+        (account_type, day, column) to that day and every day after it
+        """
+        days = defaultdict(lambda: defaultdict(float))
+        for (account_type, day, column), amount in postings.items():
+            if account_type and amount:
+                days[(account_type, day)][column] += amount
+
+        for (account_type, day), amounts in sorted(days.items(), key=str):
+            amounts = {column: amount for column, amount in amounts.items() if amount}
+            if not amounts:
+                continue
+            with transaction.atomic(savepoint=False):
+                # postings to an account are serialized so a new day starts from the right balance
+                list(
+                    AccountType.objects.select_for_update()
+                    .filter(id=account_type)
+                    .values("id")
+                )
+                if not AccountBalance.objects.filter(
+                    account_type=account_type, date=day
+                ).exists():
+                    previous = (
+                        AccountBalance.objects.filter(
+                            account_type=account_type, date__lt=day
+                        )
+                        .order_by("-date")
+                        .values(*AccountBalance.COLUMNS)
+                        .first()
+                    )
+                    AccountBalance.objects.create(
+                        account_type_id=account_type, date=day, **(previous or {})
+                    )
+                AccountBalance.objects.filter(
+                    account_type=account_type, date__gte=day
+                ).update(
+                    **{column: F(column) + amount for column, amount in amounts.items()}
+                )
+
+    @classmethod
+    def rebuild(cls, branch, movements):
+        """replace balances of the branch with freshly computed daily movements"""
+        AccountBalance.objects.filter(account_type__branch=branch).delete()
+        balances = []
+        running = defaultdict(lambda: defaultdict(float))
+        for (account_type, day), amounts in sorted(movements.items()):
+            for column, amount in amounts.items():
+                running[account_type][column] += amount
+            balances.append(
+                AccountBalance(
+                    account_type_id=account_type, date=day, **running[account_type]
+                )
+            )
+        AccountBalance.objects.bulk_create(balances, batch_size=1000)
+
+    @classmethod
+    def get_balances(cls, branch, date=None):
+        """accounts of the branch annotated with their movements till the end of date"""
+        date_filter = {"date__lte": date} if date is not None else {}
+        latest = AccountBalance.objects.filter(
+            account_type=OuterRef("id"), **date_filter
+        ).order_by("-date")
+        return AccountType.objects.filter(branch=branch).annotate(
+            **{
+                column: Coalesce(
+                    Subquery(latest.values(column)[:1]),
+                    0.0,
+                    output_field=models.FloatField(),
+                )
+                for column in AccountBalance.COLUMNS
+            },
+            is_cheque_account=Exists(
+                LinkedAccount.objects.filter(
+                    name=LinkedAccountChoices.CHEQUE_ACCOUNT, account=OuterRef("id")
+                )
+            ),
+        )
+
+    @classmethod
+    def get_account_balance(cls, account, date=None):
+        """balance of a single account at the end of date"""
+        return AccountBalance.get_total(
+            AccountBalance.get_balances(account.branch_id, date).get(id=account.id)
+        )
+
+    @staticmethod
+    def get_total(account):
+        """balance of an account annotated by get_balances, without cheque account ledgers"""
+        return (
+            account.opening_balance
+            + (0 if account.is_cheque_account else account.ledgers)
+            + account.cheques
+            - account.expenses
+        )
+
+
 class LinkedAccount(ID):
     name = models.CharField(max_length=15, choices=LinkedAccountChoices.choices)
     account = models.ForeignKey(AccountType, on_delete=models.CASCADE)
@@ -0,0 +1,56 @@
+from collections import defaultdict
+
+from cheques.models import ExternalChequeHistory, PersonalCheque
+from core.signals import post_bulk_create, post_bulk_delete
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from expenses.models import ExpenseDetail
+from ledgers.models import Ledger
+
+from .models import AccountBalance
+from .utils import get_account_postings
+
+POSTING_MODELS = [Ledger, ExternalChequeHistory, PersonalCheque, ExpenseDetail]
+
+
+def remember_previous_postings(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._previous_postings = get_account_postings(
+            sender.objects.filter(pk=instance.pk).first(), -1
+        )
+
+
+def post_to_account_balances(sender, instance, **kwargs):
+    postings = get_account_postings(instance)
+    for key, amount in getattr(instance, "_previous_postings", {}).items():
+        postings[key] = postings.get(key, 0.0) + amount
+    instance._previous_postings = {}
+    AccountBalance.post(postings)
+
+
+def reverse_from_account_balances(sender, instance, **kwargs):
+    AccountBalance.post(get_account_postings(instance, -1))
+
+
+def get_bulk_account_postings(instances, sign=1):
+    postings = defaultdict(float)
+    for instance in instances:
+        for key, amount in get_account_postings(instance, sign).items():
+            postings[key] += amount
+    return postings
+
+
+def post_bulk_to_account_balances(sender, instances, **kwargs):
+    AccountBalance.post(get_bulk_account_postings(instances))
+
+
+def reverse_bulk_from_account_balances(sender, instances, **kwargs):
+    AccountBalance.post(get_bulk_account_postings(instances, -1))
+
+
+for model in POSTING_MODELS:
+    receiver(pre_save, sender=model)(remember_previous_postings)
+    receiver(post_save, sender=model)(post_to_account_balances)
+    receiver(post_delete, sender=model)(reverse_from_account_balances)
+    receiver(post_bulk_create, sender=model)(post_bulk_to_account_balances)
+    receiver(post_bulk_delete, sender=model)(reverse_bulk_from_account_balances)
@@ -1,3 +1,228 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest import mock
+from uuid import uuid4
+
+from cheques.choices import BankChoices
+from cheques.models import (
+    ExternalCheque,
+    ExternalChequeHistory,
+    ExternalChequeTransfer,
+    PersonalCheque,
+)
+from core.tests import BranchTestMixin
+from core.pagination import StandardPagination
 from django.test import TestCase
+from expenses.models import ExpenseAccount, ExpenseDetail
+from ledgers.models import Ledger, LedgerAndDetail
+from payments.models import Payment
+
+from .models import ProductCost, StockBalance
+from .utils import get_daybook
+
+
+class ApplyDeltasTest(BranchTestMixin, TestCase):
+    def get_deltas(self, count):
+        return {
+            (self.products[i % 3].id, self.warehouse.id, float(i + 1)): 2.0
+            for i in range(count)
+        }
+
+    def test_stock_balances_in_one_statement(self):
+        for count in [1, 12]:
+            with self.assertNumQueries(1):
+                StockBalance.apply_deltas(self.get_deltas(count))
+        # the same key given as a string and as a uuid is added once per delta
+        product = self.products[0]
+        with self.assertNumQueries(1):
+            StockBalance.apply_deltas(
+                {
+                    (product.id, self.warehouse.id, 1.0): 1.0,
+                    (str(product.id), str(self.warehouse.id), 1.0): 1.0,
+                }
+            )
+        self.assertEqual(
+            StockBalance.objects.get(
+                product=product, warehouse=self.warehouse, yards_per_piece=1
+            ).quantity,
+            6,
+        )
+
+    def test_only_existing_balances_are_updated(self):
+        product = self.products[1]
+        with self.assertNumQueries(1):
+            StockBalance.apply_deltas(
+                {
+                    (product.id, self.warehouse.id, 10.0): -100.0,
+                    (product.id, self.other_warehouse.id, 10.0): -100.0,
+                },
+                create=False,
+            )
+        self.assertEqual(
+            StockBalance.objects.get(product=product, warehouse=self.warehouse).quantity,
+            900,
+        )
+        self.assertFalse(
+            StockBalance.objects.filter(warehouse=self.other_warehouse).exists()
+        )
+
+    def test_product_costs_in_one_statement(self):
+        with self.assertNumQueries(1):
+            ProductCost.apply_deltas(
+                {product.id: [10.0, 2.0] for product in self.products}
+            )
+        cost = ProductCost.objects.get(product=self.products[2])
+        self.assertEqual((cost.value, cost.purchases), (50010, 10002))
+
+
+class DaybookQueriesTest(BranchTestMixin, TestCase):
+    def make_documents(self, date, count):
+        """count documents of every daybook section on date"""
+        request = SimpleNamespace(user=self.user, branch=self.branch)
+        expense = ExpenseAccount.objects.create(branch=self.branch, name=str(date))
+        for i in range(count):
+            serial = date.day * 100 + i
+            ExpenseDetail.objects.create(
+                branch=self.branch,
+                expense=expense,
+                detail="rent",
+                amount=10,
+                account_type=self.cash,
+                serial=serial,
+                date=date,
+            )
+            self.create_transaction(
+                self.customer,
+                "INV",
+                "D",
+                [(self.products[i % 3], 1, 10)],
+                date=date.isoformat(),
+            )
+            Payment.make_payment(
+                request,
+                {
+                    "person": self.customer,
+                    "account_type": self.cash,
+                    "amount": 10,
+                    "nature": "C",
+                    "date": date,
+                },
+            )
+            LedgerAndDetail.objects.create(
+                ledger_entry=Ledger.objects.create(
+                    branch=self.branch,
+                    person=self.customer,
+                    nature="D",
+                    amount=5,
+                    date=date,
+                ),
+                detail="adjustment",
+            )
+            cheque = ExternalCheque.objects.create(
+                branch=self.branch,
+                person=self.customer,
+                serial=serial,
+                cheque_number=f"E{serial}",
+                bank=BankChoices.MEEZAN,
+                due_date=date.date(),
+                amount=100,
+                date=date,
+            )
+            ExternalChequeTransfer.objects.create(cheque=cheque, person=self.supplier)
+            ExternalChequeHistory.objects.create(
+                branch=self.branch,
+                parent_cheque=cheque,
+                cheque=cheque,
+                account_type=self.cash,
+                amount=50,
+                date=date,
+            )
+            PersonalCheque.objects.create(
+                branch=self.branch,
+                person=self.supplier,
+                serial=serial,
+                cheque_number=f"P{serial}",
+                bank=BankChoices.MEEZAN,
+                due_date=date.date(),
+                amount=100,
+                account_type=self.cash,
+                date=date,
+            )
+
+    def test_queries_do_not_depend_on_documents(self):
+        """a day with 1 or 20 documents in every section costs the same queries"""
+        for day, count in [(1, 1), (2, 20)]:
+            date = datetime(2022, 1, day, 12)
+            self.make_documents(date, count)
+            with self.assertNumQueries(11):
+                daybook = get_daybook(self.branch, date, True)
+                ledger_details = list(daybook["ledger_details"])
+            for section in [
+                "expenses",
+                "payments",
+                "transactions",
+                "external_cheques",
+                "external_cheques_history",
+                "personal_cheques",
+            ]:
+                self.assertEqual(len(daybook[section]), count, section)
+            self.assertEqual(len(ledger_details), count)
+
+
+class AccountHistoryTest(BranchTestMixin, TestCase):
+    def get_history(self, **params):
+        return self.client.get(
+            "/essentials/account-history/", {"account": str(self.cash.id), **params}
+        )
+
+    def make_payments(self):
+        request = SimpleNamespace(user=self.user, branch=self.branch)
+        for i in range(3):
+            Payment.make_payment(
+                request,
+                {
+                    "person": self.customer,
+                    "account_type": self.cash,
+                    "amount": 10 * (i + 1),
+                    "nature": "C",
+                    "date": datetime(2022, 1, 1 + i),
+                },
+            )
+
+    def test_pages(self):
+        self.make_payments()
+        with mock.patch.object(StandardPagination, "page_size", 2):
+            first = self.get_history()
+            self.assertEqual(first.status_code, 200, first.data)
+            second = self.get_history(after=first.data["data"]["next"])
+        self.assertEqual(second.status_code, 200, second.data)
+        self.assertEqual(
+            [row["balance"] for row in first.data["data"]["results"]],
+            [1000, 1010, 1030],
+        )
+        self.assertEqual(second.data["data"]["opening_balance"], 1030)
+        self.assertEqual(
+            [row["balance"] for row in second.data["data"]["results"]], [1060]
+        )
+        self.assertIsNone(second.data["data"]["next"])
+
+    def test_dates(self):
+        self.make_payments()
+        response = self.get_history(date__gte="2022-01-02", date__lte="2022-01-02")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            [row["balance"] for row in response.data["data"]["results"]], [1010, 1030]
+        )
 
-# Create your tests here.
+    def test_invalid_parameters(self):
+        for params in [
+            {"account": str(uuid4())},
+            {"account": "cash"},
+            {"after": "2022-01-01"},
+            {"after": f"yesterday,{uuid4()}"},
+            {"after": "2022-01-01 00:00:00,last"},
+            {"date__gte": "garbage"},
+            {"date__lte": "2022-13-01"},
+        ]:
+            with self.subTest(**params):
+                self.assertEqual(self.get_history(**params).status_code, 400)
@@ -1,47 +1,366 @@
-from cheques.choices import ChequeStatusChoices
+from collections import defaultdict
 
+from cheques.choices import ChequeStatusChoices, PersonalChequeStatusChoices
+from cheques.models import ExternalCheque, ExternalChequeHistory, PersonalCheque
+from cheques.serializers import (
+    ExternalChequeSerializer,
+    IssuePersonalChequeSerializer,
+    ShortExternalChequeHistorySerializer,
+)
+from core.pagination import StandardPagination
+from django.db import connection
+from django.db.models import Case, CharField, Count, F, Sum, Value, When
+from django.db.models.functions import Cast, TruncDate
+from expenses.models import ExpenseDetail
+from expenses.serializers import ExpenseDetailSerializer
+from ledgers.models import Ledger, LedgerAndDetail
+from payments.models import Payment
+from payments.serializers import PaymentAndImageListSerializer
+from rest_framework import serializers
+from transactions.models import Transaction
+from transactions.serializers import TransactionSerializer
 
-def get_account_balances(final_account_balances, array, operation="add"):
-    for value in array:
-        current_amount = final_account_balances[value["account_type__name"]]
-        if operation == "add":
-            current_amount += value["total"]
-        else:
-            current_amount -= value["total"]
-        final_account_balances[value["account_type__name"]] = current_amount
-    return final_account_balances
+from .choices import PersonChoices
+from .models import AccountBalance
 
 
-def format_cheques_as_ledger(cheques, nature, serial_prefix):
-    return list(
-        map(
-            lambda val: {
-                **val,
-                "nature": nature,
-                "serial": f"{serial_prefix}-{val['serial']}",
-            },
-            cheques,
-        )
+HISTORY_COLUMNS = [
+    "row_id",
+    "row_date",
+    "row_amount",
+    "row_nature",
+    "row_serial",
+    "row_prefix",
+    "row_status",
+]
+
+
+def get_history_rows(
+    queryset,
+    prefix,
+    nature,
+    serial="serial",
+    date="date",
+    amount="amount",
+    status=Value(None, output_field=CharField()),
+):
+    """rows of a queryset in the shape of the account history union"""
+    columns = {
+        "row_id": F("id"),
+        "row_date": F(date),
+        "row_amount": F(amount),
+        "row_nature": nature,
+        "row_serial": Cast(serial, CharField()),
+        "row_prefix": Value(prefix, output_field=CharField()),
+        "row_status": status,
+    }
+    return (
+        queryset.order_by()
+        .annotate(**{column: columns[column] for column in HISTORY_COLUMNS})
+        .values(*HISTORY_COLUMNS)
     )
 
 
-def add_type(array, serial_prefix):
-    return list(
-        map(
-            lambda x: {**x, "serial": f"{serial_prefix}-{x['serial']}"},
-            array,
+def get_account_history_union(account, cheque_account, date_filters):
+    """sql of every posting listed in the history of an account as one union all"""
+    ledger_date_filters = {
+        key.replace("date", "ledger_entry__date"): value
+        for key, value in date_filters.items()
+    }
+    branch = account.branch_id
+    parts = [
+        get_history_rows(
+            Payment.objects.filter(account_type=account, branch=branch, **date_filters),
+            "P",
+            F("nature"),
+        ),
+        get_history_rows(
+            ExternalChequeHistory.objects.filter(
+                account_type=account, branch=branch, **date_filters
+            ).exclude(account_type=cheque_account),
+            "CHE-H",
+            Value("C", output_field=CharField()),
+            serial="parent_cheque__serial",
+        ),
+        get_history_rows(
+            PersonalCheque.objects.filter(
+                account_type=account,
+                status=PersonalChequeStatusChoices.CLEARED,
+                branch=branch,
+                **date_filters,
+            ),
+            "CH-P",
+            Value("D", output_field=CharField()),
+        ),
+        get_history_rows(
+            ExpenseDetail.objects.filter(
+                account_type=account, branch=branch, **date_filters
+            ),
+            "E",
+            Value("D", output_field=CharField()),
+        ),
+        get_history_rows(
+            LedgerAndDetail.objects.filter(
+                ledger_entry__account_type=account,
+                ledger_entry__branch=branch,
+                **ledger_date_filters,
+            ),
+            None,
+            F("ledger_entry__nature"),
+            serial="ledger_entry__person__name",
+            date="ledger_entry__date",
+            amount="ledger_entry__amount",
+        ),
+    ]
+    if account == cheque_account:
+        parts.append(
+            get_history_rows(
+                ExternalCheque.objects.filter(branch=branch, **date_filters),
+                "CHE",
+                Case(
+                    When(status=ChequeStatusChoices.TRANSFERRED, then=Value("D")),
+                    default=Value("C"),
+                    output_field=CharField(),
+                ),
+                status=F("status"),
+            )
         )
+    queries = [part.query.sql_with_params() for part in parts]
+    return (
+        " UNION ALL ".join(
+            f"SELECT * FROM ({sql}) part_{i}" for i, (sql, params) in enumerate(queries)
+        ),
+        [param for sql, params in queries for param in params],
     )
 
 
-def format_external_cheques_as_ledger(cheques, serial_prefix):
-    return list(
-        map(
-            lambda x: {
-                **x,
-                "nature": "D" if x["status"] == ChequeStatusChoices.TRANSFERRED else "C",
-                "serial": f"{serial_prefix}-{x['serial']}",
-            },
-            cheques,
+def get_account_history(account, cheque_account, start=None, end=None, after=None):
+    """
+    one page of the history of an account ordered by date with the running balance
+    of every row, after is the (date, id) of the last row of the previous page
+    """
+    date_filters = {}
+    if start:
+        date_filters.update({"date__gte": start})
+    if end:
+        date_filters.update({"date__lte": end})
+    signed_amount = "CASE WHEN row_nature = 'C' THEN row_amount ELSE -row_amount END"
+
+    opening_filter = None
+    if after:
+        opening_filter = ("(row_date, row_id) <= (%s, %s)", list(after))
+    elif start:
+        opening_filter = ("row_date < %s", [start])
+    opening_balance = account.opening_balance
+    if opening_filter:
+        union, params = get_account_history_union(account, cheque_account, {})
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COALESCE(SUM({signed_amount}), 0) FROM ({union}) history "
+                f"WHERE {opening_filter[0]}",
+                [*params, *opening_filter[1]],
+            )
+            opening_balance += cursor.fetchone()[0]
+
+    union, params = get_account_history_union(account, cheque_account, date_filters)
+    page_filter = "(row_date, row_id) > (%s, %s)" if after else "TRUE"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT *, SUM({signed_amount}) OVER (ORDER BY row_date, row_id) "
+            f"FROM ({union}) history WHERE {page_filter} "
+            "ORDER BY row_date, row_id LIMIT %s",
+            [*params, *(after or []), StandardPagination.page_size + 1],
         )
+        rows = cursor.fetchall()
+
+    has_next = len(rows) > StandardPagination.page_size
+    results = []
+    if not after:
+        results.append(
+            {
+                "id": account.id,
+                "date": None,
+                "nature": "C" if opening_balance >= 0 else "D",
+                "amount": opening_balance,
+                "type": "Opening Balance",
+                "balance": opening_balance,
+            }
+        )
+    for id, date, amount, nature, serial, prefix, status, running_balance in rows[
+        : StandardPagination.page_size
+    ]:
+        results.append(
+            {
+                "id": id,
+                "date": date,
+                "amount": amount,
+                "nature": nature,
+                "serial": f"{prefix}-{serial}" if prefix else serial,
+                "status": status,
+                "balance": opening_balance + running_balance,
+            }
+        )
+    return {
+        "results": results,
+        "opening_balance": opening_balance,
+        "closing_balance": results[-1]["balance"] if results else opening_balance,
+        "next": f"{results[-1]['date']},{results[-1]['id']}" if has_next else None,
+    }
+
+
+def get_account_postings(instance, sign=1):
+    """
+    the single posting hook of account balances, amounts a ledger, cheque or
+    expense posts to its account keyed by (account_type, day, column)
+    """
+    if instance is None or not instance.account_type_id:
+        return {}
+    amount = sign * instance.amount
+    if isinstance(instance, Ledger):
+        column = "ledgers"
+        amount = amount if instance.nature == "C" else -amount
+    elif isinstance(instance, ExternalChequeHistory):
+        if instance.return_cheque_id:
+            return {}
+        column = "cheques"
+    elif isinstance(instance, PersonalCheque):
+        if instance.status != PersonalChequeStatusChoices.CLEARED:
+            return {}
+        column = "cheques"
+        amount = -amount
+    else:
+        column = "expenses"
+    return {(instance.account_type_id, instance.date.date(), column): amount}
+
+
+def get_account_movements(branch):
+    """daily movements of every account of the branch computed from the postings"""
+    movements = defaultdict(lambda: defaultdict(float))
+    for queryset, column, sign in [
+        (Ledger.objects.all(), "ledgers", 1),
+        (
+            ExternalChequeHistory.objects.filter(return_cheque__isnull=True),
+            "cheques",
+            1,
+        ),
+        (
+            PersonalCheque.objects.filter(status=PersonalChequeStatusChoices.CLEARED),
+            "cheques",
+            -1,
+        ),
+        (ExpenseDetail.objects.all(), "expenses", 1),
+    ]:
+        values = ["account_type", "day"]
+        if column == "ledgers":
+            values.append("nature")
+        for m in (
+            queryset.filter(account_type__branch=branch)
+            .annotate(day=TruncDate("date"))
+            .values(*values)
+            .order_by()
+            .annotate(total=Sum("amount"))
+        ):
+            amount = sign * m["total"]
+            if m.get("nature") == "D":
+                amount = -amount
+            movements[(m["account_type"], m["day"])][column] += amount
+    return movements
+
+
+def get_daybook_balances(branch, date):
+    """account balances at the end of date from the maintained account balances"""
+    balances = defaultdict(lambda: 0)
+    expenses = defaultdict(lambda: 0)
+    has_cheque_account = False
+    for account in AccountBalance.get_balances(branch, date):
+        has_cheque_account = has_cheque_account or account.is_cheque_account
+        balances[account.name] += AccountBalance.get_total(account)
+        if account.expenses:
+            expenses[account.name] += account.expenses
+    if not has_cheque_account:
+        raise serializers.ValidationError("Please create a cheque account first", 400)
+
+    pending_cheques = ExternalCheque.objects.filter(
+        status=ChequeStatusChoices.PENDING,
+        date__lte=date,
+        branch=branch,
+    ).aggregate(total=Sum("amount"), count=Count("id"))
+    if pending_cheques["total"] is not None:
+        balances.update(
+            {
+                "Cheque Account": pending_cheques["total"],
+                "Pending cheques": pending_cheques["count"],
+            }
+        )
+
+    return balances, [
+        {"account_type__name": name, "total": total} for name, total in expenses.items()
+    ]
+
+
+def get_daybook(branch, date, has_full_access):
+    """
+    every section of the daybook in a fixed number of queries
+    no matter how many documents the day has
+    """
+    date_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
+    date_end = date.replace(hour=23, minute=59, second=59, microsecond=999999)
+    filters = {
+        "date__gte": date_start,
+        "date__lte": date_end,
+    }
+    person_filter = {}
+    ledger_person_filter = {}
+    if not has_full_access:
+        person_filter = {"person__person_type": PersonChoices.CUSTOMER}
+        ledger_person_filter = {
+            "ledger_entry__person__person_type": PersonChoices.CUSTOMER
+        }
+
+    expenses = ExpenseDetail.objects.filter(**filters, branch=branch).order_by("serial")
+    transactions = Transaction.objects.filter(
+        **person_filter, **filters, branch=branch
+    ).prefetch_related("transaction_detail")
+    payments = (
+        Payment.objects.filter(branch=branch, **filters)
+        .prefetch_related("paymentandimage_set__image")
+        .order_by("serial")
     )
+    ledger_details = LedgerAndDetail.objects.values(
+        "detail",
+        "id",
+        amount=F("ledger_entry__amount"),
+        date=F("ledger_entry__date"),
+        person=F("ledger_entry__person"),
+        nature=F("ledger_entry__nature"),
+        account_type=F("ledger_entry__account_type"),
+    ).filter(**filters, **ledger_person_filter, ledger_entry__branch=branch)
+    external_cheques = ExternalCheque.objects.filter(
+        **filters, branch=branch
+    ).select_related("externalchequetransfer__person")
+    external_cheques_history = (
+        ExternalChequeHistory.objects.select_related("parent_cheque")
+        .filter(**filters, branch=branch)
+        .exclude(return_cheque__status=ChequeStatusChoices.RETURNED)
+        .order_by("parent_cheque__serial")
+    )
+    personal_cheques = PersonalCheque.objects.filter(
+        **filters, **person_filter, branch=branch
+    )
+    balance_ledgers, balance_expenses = get_daybook_balances(branch, date_end)
+
+    return {
+        "expenses": ExpenseDetailSerializer(expenses, many=True).data,
+        "payments": PaymentAndImageListSerializer(payments, many=True).data,
+        "transactions": TransactionSerializer(transactions, many=True).data,
+        "balance_ledgers": balance_ledgers,
+        "balance_expenses": balance_expenses,
+        "external_cheques": ExternalChequeSerializer(external_cheques, many=True).data,
+        "external_cheques_history": ShortExternalChequeHistorySerializer(
+            external_cheques_history, many=True
+        ).data,
+        "personal_cheques": IssuePersonalChequeSerializer(
+            personal_cheques, many=True
+        ).data,
+        "ledger_details": ledger_details,
+    }
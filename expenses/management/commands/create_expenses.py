@@ -54,9 +54,7 @@ class Command(BaseCommand):
                         detail="Opening expense",
                         amount=amount,
                         account_type=account_type,
-                        serial=ExpenseDetail.get_next_serial(
-                            "serial", expense__branch=branch
-                        ),
+                        serial=ExpenseDetail.get_next_serial(branch),
                         date=opening_date,
                     )
                     opening_amount += amount
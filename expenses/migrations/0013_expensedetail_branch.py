@@ -0,0 +1,28 @@
+# Generated by Django 3.2.13 on 2026-10-18 18:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_alter_userbranchrelation_permissions'),
+        ('expenses', '0012_alter_expenseaccount_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expensedetail',
+            name='branch',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='expensedetail', to='authentication.branch'),
+        ),
+        migrations.AddIndex(
+            model_name='expensedetail',
+            index=models.Index(fields=['branch', 'date'], name='expenses_ex_branch__d5a5ff_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expensedetail',
+            index=models.Index(fields=['branch', 'serial'], name='expenses_ex_branch__184c4e_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate_branch(apps, schema_editor):
+    ExpenseDetail = apps.get_model("expenses", "ExpenseDetail")
+    ExpenseAccount = apps.get_model("expenses", "ExpenseAccount")
+
+    ExpenseDetail.objects.update(
+        branch=Subquery(
+            ExpenseAccount.objects.filter(id=OuterRef("expense")).values("branch")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("expenses", "0013_expensedetail_branch"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_branch, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.13 on 2026-10-18 18:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_alter_userbranchrelation_permissions'),
+        ('expenses', '0014_populate_expensedetail_branch'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expensedetail',
+            name='branch',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expensedetail', to='authentication.branch'),
+        ),
+    ]
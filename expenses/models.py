@@ -1,7 +1,7 @@
 from django.db import models
 from django.db.models import Sum
 
-from authentication.models import BranchAwareModel, UserAwareModel
+from authentication.models import BranchAwareModel, BranchScopedModel, UserAwareModel
 from core.models import ID, DateTimeAwareModel, NextSerial
 from essentials.models import AccountType
 
@@ -15,15 +15,23 @@ class ExpenseAccount(BranchAwareModel):
     )
 
 
-class ExpenseDetail(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
+class ExpenseDetail(
+    ID, BranchScopedModel, UserAwareModel, DateTimeAwareModel, NextSerial
+):
     expense = models.ForeignKey(ExpenseAccount, on_delete=models.CASCADE)
     detail = models.TextField(max_length=1000)
     amount = models.FloatField()
     account_type = models.ForeignKey(AccountType, on_delete=models.SET_NULL, null=True)
     serial = models.PositiveBigIntegerField()
 
+    branch_source = "expense"
+
     class Meta:
         ordering = ["date"]
+        indexes = [
+            models.Index(fields=["branch", "date"]),
+            models.Index(fields=["branch", "serial"]),
+        ]
 
     @classmethod
     def calculate_total_expenses_with_category(
@@ -37,7 +45,7 @@ class ExpenseDetail(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
             date_filter.update({"date__lte": end_date})
         return (
             ExpenseDetail.objects.values("expense__type")
-            .filter(expense__branch=branch, **date_filter)
+            .filter(branch=branch, **date_filter)
             .annotate(total=Sum("amount"))
             .order_by()
         )
@@ -54,7 +62,7 @@ class ExpenseDetail(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
             date_filter.update({"date__lte": end_date})
         return (
             ExpenseDetail.objects.values("expense")
-            .filter(expense__branch=branch, **date_filter)
+            .filter(branch=branch, **date_filter)
             .annotate(total=Sum("amount"))
             .order_by()
         )
@@ -69,8 +77,8 @@ class ExpenseDetail(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
             date_filter.update({"date__lte": end_date})
 
         return (
-            ExpenseDetail.objects.filter(
-                expense__branch=branch, **date_filter
-            ).aggregate(total=Sum("amount"))["total"]
+            ExpenseDetail.objects.filter(branch=branch, **date_filter).aggregate(
+                total=Sum("amount")
+            )["total"]
             or 0
         )
@@ -8,6 +8,4 @@ class ExpenseAccountQuery:
 
 class ExpenseDetailQuery:
     def get_queryset(self):
-        return ExpenseDetail.objects.filter(expense__branch=self.request.branch).order_by(
-            "serial"
-        )
+        return ExpenseDetail.objects.filter(branch=self.request.branch).order_by("serial")
@@ -51,9 +51,7 @@ class ExpenseDetailSerializer(ValidateAccountType, serializers.ModelSerializer):
     def create(self, validated_data):
         self.request = self.context["request"]
         validated_data["user"] = self.request.user
-        validated_data["serial"] = ExpenseDetail.get_next_serial(
-            "serial", expense__branch=self.request.branch
-        )
+        validated_data["serial"] = ExpenseDetail.get_next_serial(self.request.branch)
         instance = super().create(validated_data)
         Log.create_log(
             ActivityTypes.CREATED,
@@ -2,6 +2,17 @@ from django.contrib import admin
 
 from .models import Ledger, LedgerAndDetail
 
+
+class LedgerEntriesAdmin(admin.ModelAdmin):
+    """deletes the ledger entries of the documents along with them"""
+
+    def delete_model(self, request, obj):
+        Ledger.delete_with_entries(type(obj).objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        Ledger.delete_with_entries(queryset)
+
+
 # Register your models here.
 admin.site.register(Ledger)
 admin.site.register(LedgerAndDetail)
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.13 on 2026-10-18 17:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('essentials', '0033_populate_accountbalance'),
+        ('ledgers', '0026_ledgeranddetail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonBalance',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('balance', models.FloatField(default=0.0)),
+                ('person', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='person_balance', to='essentials.person')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='personbalance',
+            index=models.Index(fields=['balance'], name='ledgers_per_balance_144b4d_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+from django.db.models import Case, F, FloatField, Sum, When
+
+
+def populate_person_balance(apps, schema_editor):
+    Ledger = apps.get_model("ledgers", "Ledger")
+    PersonBalance = apps.get_model("ledgers", "PersonBalance")
+
+    PersonBalance.objects.bulk_create(
+        [
+            PersonBalance(person_id=b["person"], balance=b["balance"])
+            for b in Ledger.objects.values("person")
+            .order_by()
+            .annotate(
+                balance=Sum(
+                    Case(
+                        When(nature="C", then=F("amount")),
+                        default=-F("amount"),
+                        output_field=FloatField(),
+                    )
+                )
+            )
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ledgers", "0027_personbalance"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_person_balance, migrations.RunPython.noop),
+    ]
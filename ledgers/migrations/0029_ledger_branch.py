@@ -0,0 +1,28 @@
+# Generated by Django 3.2.13 on 2026-10-18 18:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_alter_userbranchrelation_permissions'),
+        ('ledgers', '0028_populate_personbalance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ledger',
+            name='branch',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger', to='authentication.branch'),
+        ),
+        migrations.AddIndex(
+            model_name='ledger',
+            index=models.Index(fields=['branch', 'date'], name='ledgers_led_branch__2d37c2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ledger',
+            index=models.Index(fields=['person', 'date', 'time_stamp'], name='ledgers_led_person__94603b_idx'),
+        ),
+    ]
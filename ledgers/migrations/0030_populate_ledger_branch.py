@@ -0,0 +1,24 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate_branch(apps, schema_editor):
+    Ledger = apps.get_model("ledgers", "Ledger")
+    Person = apps.get_model("essentials", "Person")
+
+    Ledger.objects.update(
+        branch=Subquery(
+            Person.objects.filter(id=OuterRef("person")).values("branch")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ledgers", "0029_ledger_branch"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_branch, migrations.RunPython.noop),
+    ]
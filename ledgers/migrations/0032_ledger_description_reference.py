@@ -0,0 +1,23 @@
+# Generated by Django 3.2.13 on 2026-10-18 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledgers', '0031_alter_ledger_branch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ledger',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ledger',
+            name='reference',
+            field=models.CharField(default='---', max_length=255),
+        ),
+    ]
@@ -1,19 +1,18 @@
 from datetime import date
 from functools import reduce
 
-from authentication.models import UserAwareModel
-from cheques.choices import ChequeStatusChoices, PersonalChequeStatusChoices
-from cheques.models import ExternalChequeHistory, PersonalCheque
+from authentication.models import BranchScopedModel, UserAwareModel
+from cheques.choices import ChequeStatusChoices
 from core.constants import MIN_POSITIVE_VAL_SMALL
 from core.models import ID, DateTimeAwareModel
+from core.signals import bulk_delete
 from core.utils import get_cheque_account
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import Sum
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, F, Q, Sum, When
 from django.utils.translation import gettext_lazy as _
 from essentials.choices import PersonChoices
-from essentials.models import AccountType, Person
-from expenses.models import ExpenseDetail
+from essentials.models import AccountBalance, AccountType, Person
 
 
 class TransactionChoices(models.TextChoices):
@@ -21,21 +20,28 @@ class TransactionChoices(models.TextChoices):
     DEBIT = "D", _("Debit")
 
 
-class Ledger(ID, UserAwareModel, DateTimeAwareModel):
+class Ledger(ID, BranchScopedModel, UserAwareModel, DateTimeAwareModel):
     amount = models.FloatField(validators=[MinValueValidator(MIN_POSITIVE_VAL_SMALL)])
     nature = models.CharField(max_length=1, choices=TransactionChoices.choices)
     person = models.ForeignKey(Person, on_delete=models.CASCADE)
     account_type = models.ForeignKey(AccountType, on_delete=models.SET_NULL, null=True)
+    # rendered from the linked document whenever the link or the document is written
+    description = models.TextField(null=True, blank=True)
+    reference = models.CharField(max_length=255, default="---")
 
     class Meta:
         ordering = ["date"]
+        indexes = [
+            models.Index(fields=["branch", "date"]),
+            models.Index(fields=["person", "date", "time_stamp"]),
+        ]
 
     @classmethod
     def get_external_cheque_balance(cls, person, branch):
         all_external_cheques = (
             Ledger.objects.values("nature")
             .filter(
-                person__branch=branch,
+                branch=branch,
                 ledger_external_cheque__isnull=False,
                 person=person,
                 ledger_external_cheque__person=person,
@@ -54,7 +60,7 @@ class Ledger(ID, UserAwareModel, DateTimeAwareModel):
     @classmethod
     def get_passed_cheque_amount(cls, person, branch):
         total = Ledger.objects.filter(
-            person__branch=branch,
+            branch=branch,
             external_cheque__isnull=False,
             person=person,
             external_cheque__is_passed_with_history=False,
@@ -66,31 +72,6 @@ class Ledger(ID, UserAwareModel, DateTimeAwareModel):
             return total
         return 0
 
-    @classmethod
-    def create_ledger_entry_for_transasction(cls, t_data):
-        """creates ledger entries for transaction"""
-        transaction = t_data["transaction"]
-        t_detail = t_data["detail"]
-        amount = reduce(
-            lambda prev, curr: prev
-            + (curr["yards_per_piece"] * curr["quantity"] * curr["rate"]),
-            list(t_detail),
-            0,
-        )
-        amount -= transaction.discount
-        ledger_instance = Ledger.objects.create(
-            **{
-                "amount": amount,
-                "user": transaction.user,
-                "nature": transaction.nature,
-                "person": transaction.person,
-                "date": transaction.date,
-            }
-        )
-        LedgerAndTransaction.objects.create(
-            ledger_entry=ledger_instance, transaction=transaction
-        )
-
     @classmethod
     def get_account_payable_receivable(cls, branch, date=None):
         """calculate total payable and receivable"""
@@ -98,7 +79,7 @@ class Ledger(ID, UserAwareModel, DateTimeAwareModel):
         balances = (
             Ledger.objects.values("nature", "person__name")
             .order_by("nature")
-            .filter(person__branch=branch, **date_filter)
+            .filter(branch=branch, **date_filter)
             .exclude(person__person_type=PersonChoices.EQUITY)
             .annotate(balance=Sum("amount"))
         )
@@ -127,67 +108,19 @@ class Ledger(ID, UserAwareModel, DateTimeAwareModel):
 
     @classmethod
     def get_total_account_balance(cls, branch, date=None, exclude_cheque=False):
-        """calculates total balances in account types"""
-        date_filter = {"date__lte": date} if date is not None else {}
-        exclude_filter = {}
-        if exclude_cheque:
-            cheque_account = get_cheque_account(branch).account
-            exclude_filter.update({"account_type": cheque_account})
-        balances = (
-            Ledger.objects.values("nature")
-            .order_by("nature")
-            .filter(account_type__isnull=False, person__branch=branch, **date_filter)
-            .exclude(**exclude_filter)
-            .annotate(total=Sum("amount"))
-        )
-        personal_cheques = (
-            PersonalCheque.objects.filter(
-                status=PersonalChequeStatusChoices.CLEARED,
-                person__branch=branch,
-                **date_filter,
-            ).aggregate(total=Sum("amount"))["total"]
-            or 0
-        )
-        cheques_history = (
-            ExternalChequeHistory.objects.filter(
-                return_cheque__isnull=True,
-                parent_cheque__person__branch=branch,
-                **date_filter,
-            ).aggregate(total=Sum("amount"))["total"]
-            or 0
-        )
-        if exclude_cheque:
-            account_balances = (
-                AccountType.objects.filter(branch=branch)
-                .exclude(id=cheque_account.id)
-                .aggregate(total=Sum("opening_balance"))["total"]
-                or 0
-            )
-        else:
-            account_balances = (
-                AccountType.objects.filter(branch=branch).aggregate(
-                    total=Sum("opening_balance")
-                )["total"]
-                or 0
-            )
-
-        expenses = reduce(
-            lambda prev, curr: prev + curr["total"],
-            ExpenseDetail.calculate_total_expenses_with_category(branch, None, date),
-            0,
-        )
-
-        credits = list(filter(lambda x: x["nature"] == "C", balances))
-        debits = list(filter(lambda x: x["nature"] == "D", balances))
-
-        return {
-            "credit": (credits[0]["total"] if len(credits) else 0)
-            + account_balances
-            + cheques_history,
-            "debit": (debits[0]["total"] if len(debits) else 0)
-            + personal_cheques
-            + expenses,
-        }
+        """calculates total balances in account types from the maintained balances"""
+        credit = 0
+        debit = 0
+        has_cheque_account = False
+        for account in AccountBalance.get_balances(branch, date):
+            has_cheque_account = has_cheque_account or account.is_cheque_account
+            if not (exclude_cheque and account.is_cheque_account):
+                credit += account.opening_balance + account.ledgers
+            credit += account.cheques
+            debit += account.expenses
+        if exclude_cheque and not has_cheque_account:
+            get_cheque_account(branch)
+        return {"credit": credit, "debit": debit}
 
     @classmethod
     def get_total_owners_equity(cls, branch, date=None):
@@ -198,7 +131,7 @@ class Ledger(ID, UserAwareModel, DateTimeAwareModel):
             .order_by("nature")
             .filter(
                 person__person_type=PersonChoices.EQUITY,
-                person__branch=branch,
+                branch=branch,
                 **date_filter,
             )
             .annotate(total=Sum("amount"))
@@ -210,8 +143,86 @@ class Ledger(ID, UserAwareModel, DateTimeAwareModel):
 
         return credits - debits
 
+    @classmethod
+    def delete_entries(cls, ledgers):
+        """deletes ledger entries and their links with one statement per table"""
+        entries = list(ledgers)
+        ids = [entry.id for entry in entries]
+        if not ids:
+            return entries
+        for link in LEDGER_LINK_MODELS:
+            bulk_delete(link.objects.filter(ledger_entry__in=ids))
+        bulk_delete(cls.objects.filter(id__in=ids), entries)
+        return entries
+
+    @classmethod
+    def delete_with_entries(cls, documents):
+        """
+        deletes the documents of a queryset together with the ledger entries made for
+        them, the entries are removed set based before the documents cascade
+        """
+        model = documents.model
+        filters = [
+            Q(**{f"{field.name}__in": documents})
+            for field in cls._meta.fields
+            if field.related_model is model
+            and field.remote_field.on_delete is models.CASCADE
+        ]
+        for link in LEDGER_LINK_MODELS:
+            filters += [
+                Q(
+                    id__in=link.objects.filter(**{f"{field.name}__in": documents}).values(
+                        "ledger_entry"
+                    )
+                )
+                for field in link._meta.fields
+                if field.related_model is model
+            ]
+        if filters:
+            cls.delete_entries(
+                cls.objects.filter(reduce(lambda prev, curr: prev | curr, filters))
+            )
+        return documents.delete()
+
 
-class LedgerAndTransaction(ID):
+class RenderedLink(ID):
+    """link whose document renders the description and reference of its ledger entry"""
+
+    source = None
+    source_related = []
+    source_prefetch = []
+
+    class Meta:
+        abstract = True
+
+    def get_ledger_columns(self):
+        return getattr(self, self.source).get_ledger_columns(self.ledger_entry.nature)
+
+    @classmethod
+    def get_rendered_entries(cls, **filters):
+        """ledger entries of the filtered links whose stored columns are out of date"""
+        entries = []
+        for link in (
+            cls.objects.filter(**filters)
+            .select_related("ledger_entry", *cls.source_related)
+            .prefetch_related(*cls.source_prefetch)
+        ):
+            entry = link.ledger_entry
+            columns = link.get_ledger_columns()
+            if (entry.description, entry.reference) != columns:
+                entry.description, entry.reference = columns
+                entries.append(entry)
+        return entries
+
+    @classmethod
+    def render_entries(cls, **filters):
+        """stores the rendered columns on the ledger entries of the filtered links"""
+        entries = cls.get_rendered_entries(**filters)
+        Ledger.objects.bulk_update(entries, ["description", "reference"], batch_size=1000)
+        return entries
+
+
+class LedgerAndTransaction(RenderedLink):
     """Ledger and Transaction link"""
 
     ledger_entry = models.ForeignKey(
@@ -222,8 +233,12 @@ class LedgerAndTransaction(ID):
         on_delete=models.CASCADE,
     )
 
+    source = "transaction"
+    source_related = ["transaction__account_type"]
+    source_prefetch = ["transaction__transaction_detail__product"]
 
-class LedgerAndExternalCheque(ID):
+
+class LedgerAndExternalCheque(RenderedLink):
     """Ledger and External Cheque link"""
 
     ledger_entry = models.ForeignKey(
@@ -234,12 +249,15 @@ class LedgerAndExternalCheque(ID):
         on_delete=models.CASCADE,
     )
 
+    source = "external_cheque"
+    source_related = ["external_cheque"]
+
     @classmethod
     def get_external_cheque_balance(cls, person, branch):
         all_external_cheques = (
             LedgerAndExternalCheque.objects.values("ledger_entry__nature")
             .filter(
-                ledger_entry__person__branch=branch,
+                ledger_entry__branch=branch,
                 external_cheque__isnull=False,
                 ledger_entry__person=person,
                 external_cheque__person=person,
@@ -262,7 +280,7 @@ class LedgerAndExternalCheque(ID):
     @classmethod
     def get_passed_cheque_amount(cls, person, branch):
         total = LedgerAndExternalCheque.objects.filter(
-            ledger_entry__person__branch=branch,
+            ledger_entry__branch=branch,
             external_cheque__isnull=False,
             ledger_entry__person=person,
             external_cheque__is_passed_with_history=False,
@@ -275,7 +293,7 @@ class LedgerAndExternalCheque(ID):
         return 0
 
 
-class LedgerAndPersonalCheque(ID):
+class LedgerAndPersonalCheque(RenderedLink):
     """Ledger and Personal Cheque link"""
 
     ledger_entry = models.ForeignKey(
@@ -286,6 +304,9 @@ class LedgerAndPersonalCheque(ID):
         on_delete=models.CASCADE,
     )
 
+    source = "personal_cheque"
+    source_related = ["personal_cheque"]
+
 
 class LedgerAndRawTransaction(ID):
     ledger_entry = models.ForeignKey(
@@ -297,17 +318,16 @@ class LedgerAndRawTransaction(ID):
     )
 
     @classmethod
-    def create_ledger_entry(cls, raw_transaction, amount):
-        ledger_instance = Ledger.objects.create(
+    def get_rows(cls, raw_transaction, amount):
+        """unsaved ledger entry of a raw transaction with the link to it"""
+        ledger = Ledger(
+            branch_id=raw_transaction.person.branch_id,
             nature="C",
             person=raw_transaction.person,
             date=raw_transaction.date,
             amount=amount,
         )
-        LedgerAndRawTransaction.objects.create(
-            ledger_entry=ledger_instance, raw_transaction=raw_transaction
-        )
-        pass
+        return [ledger, cls(ledger_entry=ledger, raw_transaction=raw_transaction)]
 
 
 class LedgerAndRawDebit(ID):
@@ -317,7 +337,7 @@ class LedgerAndRawDebit(ID):
     raw_debit = models.ForeignKey("rawtransactions.RawDebit", on_delete=models.CASCADE)
 
 
-class LedgerAndPayment(ID):
+class LedgerAndPayment(RenderedLink):
     ledger_entry = models.ForeignKey(
         Ledger, on_delete=models.CASCADE, related_name="ledger_payment"
     )
@@ -325,6 +345,9 @@ class LedgerAndPayment(ID):
         "payments.Payment", on_delete=models.CASCADE, related_name="payment_ledger"
     )
 
+    source = "payment"
+    source_related = ["payment__account_type"]
+
     @classmethod
     def create_ledger_entry(cls, payment):
         ledger_instance = Ledger.objects.create(
@@ -337,8 +360,86 @@ class LedgerAndPayment(ID):
         LedgerAndPayment.objects.create(ledger_entry=ledger_instance, payment=payment)
 
 
-class LedgerAndDetail(ID):
+class LedgerAndDetail(RenderedLink):
     ledger_entry = models.ForeignKey(
         Ledger, on_delete=models.CASCADE, related_name="ledger_detail"
     )
     detail = models.CharField(max_length=1000)
+
+    def get_ledger_columns(self):
+        return self.detail, "---"
+
+
+# every model linking a ledger entry to the document it was made for
+LEDGER_LINK_MODELS = [
+    LedgerAndTransaction,
+    LedgerAndExternalCheque,
+    LedgerAndPersonalCheque,
+    LedgerAndRawTransaction,
+    LedgerAndRawDebit,
+    LedgerAndPayment,
+    LedgerAndDetail,
+]
+
+# links rendering the stored columns of their ledger entries
+RENDERED_LINK_MODELS = [
+    model for model in LEDGER_LINK_MODELS if issubclass(model, RenderedLink)
+]
+
+
+class PersonBalance(ID):
+    """current balance of a person, maintained by every ledger entry of the person"""
+
+    person = models.OneToOneField(
+        Person, on_delete=models.CASCADE, related_name="person_balance"
+    )
+    balance = models.FloatField(default=0.0)
+
+    class Meta:
+        indexes = [models.Index(fields=["balance"])]
+
+    @classmethod
+    def post(cls, postings, create=True):
+        """
+        adds amounts keyed by person to the balance of every person, create=False
+        only updates the balances that exist (used when the person may be gone)
+        """
+        for person, amount in sorted(postings.items(), key=str):
+            if not amount:
+                continue
+            if (
+                PersonBalance.objects.filter(person_id=person).update(
+                    balance=F("balance") + amount
+                )
+                or not create
+            ):
+                continue
+            try:
+                with transaction.atomic():
+                    PersonBalance.objects.create(person_id=person, balance=amount)
+            except IntegrityError:
+                PersonBalance.objects.filter(person_id=person).update(
+                    balance=F("balance") + amount
+                )
+
+    @classmethod
+    def get_balances(cls, branch, date=None, **filters):
+        """
+        persons of the branch annotated with their balance, read from the maintained
+        balances or summed from the ledger when a past date is asked for
+        """
+        persons = Person.objects.filter(branch=branch, **filters)
+        if date is None:
+            return persons.filter(person_balance__isnull=False).annotate(
+                balance=F("person_balance__balance")
+            )
+        return persons.annotate(
+            balance=Sum(
+                Case(
+                    When(ledger__nature="C", then=F("ledger__amount")),
+                    default=-F("ledger__amount"),
+                    output_field=models.FloatField(),
+                ),
+                filter=Q(ledger__date__lte=date),
+            )
+        ).filter(balance__isnull=False)
@@ -1,19 +1,17 @@
 from .models import Ledger, LedgerAndDetail
 
+# the detail and serial of a row are stored on the ledger, only the id of a
+# manual entry's detail is read from its link
+LEDGER_SOURCE_PREFETCH = ["ledger_detail"]
+
 
 class LedgerQuery:
     def get_queryset(self):
-        return Ledger.objects.filter(person__branch=self.request.branch).prefetch_related(
-            "ledger_transaction",
-            "ledger_external_cheque",
-            "ledger_personal_cheque",
-            "ledger_raw_transaction",
-            "ledger_raw_debit",
+        return Ledger.objects.filter(branch=self.request.branch).prefetch_related(
+            *LEDGER_SOURCE_PREFETCH
         )
 
 
 class LedgerAndDetailQuery:
     def get_queryset(self):
-        return LedgerAndDetail.objects.filter(
-            ledger_entry__person__branch=self.request.branch
-        )
+        return LedgerAndDetail.objects.filter(ledger_entry__branch=self.request.branch)
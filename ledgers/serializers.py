@@ -9,8 +9,8 @@ from .models import Ledger, LedgerAndDetail
 
 class LedgerSerializer(serializers.ModelSerializer):
 
-    detail = serializers.SerializerMethodField(read_only=True)
-    serial = serializers.SerializerMethodField(read_only=True)
+    detail = serializers.CharField(source="description", read_only=True)
+    serial = serializers.CharField(source="reference", read_only=True)
     ledger_detail_id = serializers.SerializerMethodField(read_only=True)
     instance_type = None
 
@@ -46,45 +46,27 @@ class LedgerSerializer(serializers.ModelSerializer):
         )
         return instance
 
-    def get_detail(self, obj):
-        """create ledger detail"""
-        nature = obj.nature
-        if obj.ledger_transaction.exists():
-            return obj.ledger_transaction.first().transaction.get_transaction_string(
-                nature
-            )
-        elif obj.ledger_external_cheque.exists():
-            return obj.ledger_external_cheque.first().external_cheque.get_ledger_string(
-                "external"
-            )
-        elif obj.ledger_personal_cheque.exists():
-            return obj.ledger_personal_cheque.first().personal_cheque.get_ledger_string(
-                "personal"
-            )
-        elif obj.ledger_payment.exists():
-            return obj.ledger_payment.first().payment.get_ledger_string()
-        elif obj.ledger_detail.exists():
-            return obj.ledger_detail.first().detail
-
-    def get_serial(self, obj):
-        """serial number"""
-        if obj.ledger_transaction.exists():
-            return f"{obj.ledger_transaction.first().transaction.get_computer_and_bill_serial()} "
-        elif obj.ledger_external_cheque.exists():
-            return f"CHE-{obj.ledger_external_cheque.first().external_cheque.serial}"
-        elif obj.ledger_personal_cheque.exists():
-            return f"CHP-{obj.ledger_personal_cheque.first().personal_cheque.serial}"
-        elif obj.ledger_payment.exists():
-            return f"P-{obj.ledger_payment.first().payment.serial} {obj.ledger_payment.first().payment.detail}"
-        else:
-            return "---"
+    def get_source(self, obj, relation):
+        """first linked record of the relation, read from the prefetch cache when present"""
+        links = getattr(obj, relation).all()
+        return links[0] if len(links) else None
 
     def get_ledger_detail_id(self, obj):
-        if obj.ledger_detail.exists():
-            return obj.ledger_detail.first().id
+        link = self.get_source(obj, "ledger_detail")
+        if link:
+            return link.id
         return None
 
 
+class LedgerWithBalanceSerializer(LedgerSerializer):
+    """ledger row along with the running balance after it"""
+
+    balance = serializers.FloatField(read_only=True)
+
+    class Meta(LedgerSerializer.Meta):
+        fields = [*LedgerSerializer.Meta.fields, "balance"]
+
+
 class LedgerSerializerForCreation(serializers.ModelSerializer):
     class Meta:
         model = Ledger
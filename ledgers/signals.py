@@ -1,65 +1,86 @@
-from django.db.models.signals import post_delete
+from collections import defaultdict
+
+from core.signals import post_bulk_create, post_bulk_delete
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from .models import (
-    LedgerAndExternalCheque,
-    LedgerAndPayment,
-    LedgerAndPersonalCheque,
-    LedgerAndRawDebit,
-    LedgerAndRawTransaction,
-    LedgerAndTransaction,
-)
-
-
-@receiver(post_delete, sender=LedgerAndTransaction)
-def delete_ledger_entry_for_transaction(sender, instance, **kwargs):
-    try:
-        if instance.ledger_entry:
-            instance.ledger_entry.delete()
-    except:
-        pass
-
-
-@receiver(post_delete, sender=LedgerAndExternalCheque)
-def delete_ledger_entry_for_external_cheque(sender, instance, **kwargs):
-    try:
-        if instance.ledger_entry:
-            instance.ledger_entry.delete()
-    except:
-        pass
-
-
-@receiver(post_delete, sender=LedgerAndPersonalCheque)
-def delete_ledger_entry_for_personal_cheque(sender, instance, **kwargs):
-    try:
-        if instance.ledger_entry:
-            instance.ledger_entry.delete()
-    except:
-        pass
-
-
-@receiver(post_delete, sender=LedgerAndRawTransaction)
-def delete_ledger_entry_for_raw_transaction(sender, instance, **kwargs):
-    try:
-        if instance.ledger_entry:
-            instance.ledger_entry.delete()
-    except:
-        pass
-
-
-@receiver(post_delete, sender=LedgerAndRawDebit)
-def delete_ledger_entry_for_raw_debit(sender, instance, **kwargs):
-    try:
-        if instance.ledger_entry:
-            instance.ledger_entry.delete()
-    except:
-        pass
-
-
-@receiver(post_delete, sender=LedgerAndPayment)
-def delete_ledger_entry_for_payment(sender, instance, **kwargs):
-    try:
-        if instance.ledger_entry:
-            instance.ledger_entry.delete()
-    except:
-        pass
+from .models import RENDERED_LINK_MODELS, Ledger, LedgerAndTransaction, PersonBalance
+
+
+def get_person_postings(instance, sign=1):
+    """amount a ledger entry posts to the balance of its person"""
+    if instance is None:
+        return {}
+    amount = sign * instance.amount
+    return {instance.person_id: amount if instance.nature == "C" else -amount}
+
+
+@receiver(pre_save, sender=Ledger)
+def remember_previous_person_postings(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._previous_person_postings = get_person_postings(
+            Ledger.objects.filter(pk=instance.pk).first(), -1
+        )
+
+
+@receiver(post_save, sender=Ledger)
+def post_to_person_balances(sender, instance, **kwargs):
+    postings = get_person_postings(instance)
+    for person, amount in getattr(instance, "_previous_person_postings", {}).items():
+        postings[person] = postings.get(person, 0.0) + amount
+    instance._previous_person_postings = {}
+    PersonBalance.post(postings)
+
+
+@receiver(post_delete, sender=Ledger)
+def reverse_from_person_balances(sender, instance, **kwargs):
+    PersonBalance.post(get_person_postings(instance, -1), create=False)
+
+
+def get_bulk_person_postings(instances, sign=1):
+    postings = defaultdict(float)
+    for instance in instances:
+        for person, amount in get_person_postings(instance, sign).items():
+            postings[person] += amount
+    return postings
+
+
+@receiver(post_bulk_create, sender=Ledger)
+def post_bulk_to_person_balances(sender, instances, **kwargs):
+    PersonBalance.post(get_bulk_person_postings(instances))
+
+
+@receiver(post_bulk_delete, sender=Ledger)
+def reverse_bulk_from_person_balances(sender, instances, **kwargs):
+    PersonBalance.post(get_bulk_person_postings(instances, -1), create=False)
+
+
+# documents whose edits render the entries of their links again, transactions do it
+# themselves once their details are written, see Transaction.edit
+RENDERED_SOURCES = {
+    model._meta.get_field(model.source).related_model: model
+    for model in RENDERED_LINK_MODELS
+    if model.source and model is not LedgerAndTransaction
+}
+
+
+def render_linked_entry(sender, instance, **kwargs):
+    sender.render_entries(pk=instance.pk)
+
+
+def render_linked_entries_in_bulk(sender, instances, **kwargs):
+    sender.render_entries(pk__in=[instance.pk for instance in instances])
+
+
+def render_source_entries(sender, instance, created, **kwargs):
+    if not created:
+        link = RENDERED_SOURCES[sender]
+        link.render_entries(**{link.source: instance})
+
+
+for model in RENDERED_LINK_MODELS:
+    receiver(post_save, sender=model)(render_linked_entry)
+    receiver(post_bulk_create, sender=model)(render_linked_entries_in_bulk)
+
+for model in RENDERED_SOURCES:
+    receiver(post_save, sender=model)(render_source_entries)
@@ -1,3 +1,165 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest import mock
+from uuid import uuid4
+
+from core.pagination import LargePagination
+from core.signals import bulk_delete
+from core.tests import BranchTestMixin
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from essentials.models import Person
+from payments.models import Payment
+
+from .models import LEDGER_LINK_MODELS, Ledger, LedgerAndDetail, PersonBalance
+from .views import ListLedgerWithBalance
+
+
+class PersonBalanceTest(BranchTestMixin, TestCase):
+    def test_deleting_person_drops_balance(self):
+        """entries cascading with their person do not post a balance back for it"""
+        for amount in [100, 40]:
+            Ledger.objects.create(
+                branch=self.branch, person=self.customer, nature="D", amount=amount
+            )
+        self.assertEqual(PersonBalance.objects.get(person=self.customer).balance, -140)
+        Person.objects.get(id=self.customer.id).delete()
+        self.assertFalse(PersonBalance.objects.filter(person=self.customer.id).exists())
+        connection.check_constraints()
+
+
+class DeleteWithEntriesTest(BranchTestMixin, TestCase):
+    def make_payments(self, count):
+        request = SimpleNamespace(user=self.user, branch=self.branch)
+        return [
+            Payment.make_payment(
+                request,
+                {
+                    "person": [self.customer, self.other_customer][i % 2],
+                    "account_type": self.cash,
+                    "amount": 10 * (i + 1),
+                    "nature": "C",
+                    "date": datetime(2022, 1, 1) + timedelta(days=i % 2),
+                },
+            ).id
+            for i in range(count)
+        ]
+
+    def assertEntriesDeleted(self, payments):
+        self.assertFalse(Payment.objects.filter(id__in=payments).exists())
+        self.assertFalse(Ledger.objects.filter(branch=self.branch).exists())
+        for link in LEDGER_LINK_MODELS:
+            self.assertFalse(link.objects.exists(), link.__name__)
+        self.assertBalancesRebuilt()
+
+    def test_queries_do_not_depend_on_documents(self):
+        """
+        deleting 2 or 20 payments of the same persons and days costs the same
+        queries, balances are posted once per person and per account and day
+        """
+        for count in [2, 20]:
+            payments = self.make_payments(count)
+            with self.assertNumQueries(23):
+                Ledger.delete_with_entries(Payment.objects.filter(id__in=payments))
+            self.assertEntriesDeleted(payments)
+
+    def test_bulk_delete_refuses_referenced_rows(self):
+        payments = self.make_payments(1)
+        with self.assertRaises(IntegrityError):
+            bulk_delete(Ledger.objects.filter(branch=self.branch))
+        self.assertTrue(
+            Ledger.objects.filter(ledger_payment__payment__in=payments).exists()
+        )
+
+
+class ListLedgerQueriesTest(BranchTestMixin, TestCase):
+    def test_queries_do_not_depend_on_page_size(self):
+        """a page of 2 or 9 entries from transactions, payments and details costs the same"""
+        request = SimpleNamespace(user=self.user, branch=self.branch)
+        for i in range(3):
+            self.create_transaction(
+                self.customer, "INV", "D", [(self.products[i], 1, 10)]
+            )
+            Payment.make_payment(
+                request,
+                {
+                    "person": self.customer,
+                    "account_type": self.cash,
+                    "amount": 10,
+                    "nature": "C",
+                    "date": datetime(2022, 1, 2),
+                },
+            )
+            LedgerAndDetail.objects.create(
+                ledger_entry=Ledger.objects.create(
+                    branch=self.branch,
+                    person=self.customer,
+                    nature="D",
+                    amount=5,
+                    date=datetime(2022, 1, 3),
+                ),
+                detail="adjustment",
+            )
+        for page_size in [2, 9]:
+            with mock.patch.object(LargePagination, "page_size", page_size):
+                with self.assertNumQueries(10):
+                    response = self.client.get(
+                        "/ledger/", {"person": str(self.customer.id)}
+                    )
+            self.assertEqual(len(response.data["results"]), page_size)
+
+
+class ListLedgerWithBalanceTest(BranchTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for day, nature, amount in [
+            (1, "C", 100),
+            (2, "D", 30),
+            (3, "C", 50),
+            (4, "D", 20),
+            (5, "C", 10),
+        ]:
+            Ledger.objects.create(
+                branch=cls.branch,
+                person=cls.customer,
+                nature=nature,
+                amount=amount,
+                date=datetime(2022, 1, day),
+            )
+        cls.other_entry = Ledger.objects.create(
+            branch=cls.branch, person=cls.other_customer, nature="C", amount=5
+        )
+
+    def get_page(self, **params):
+        with mock.patch.object(ListLedgerWithBalance, "page_size", 2):
+            return self.client.get(
+                "/ledger/running-balance/", {"person": str(self.customer.id), **params}
+            )
+
+    def assertPage(self, response, opening_balance, balances, has_next):
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["opening_balance"], opening_balance)
+        self.assertEqual([row["balance"] for row in response.data["results"]], balances)
+        self.assertEqual(response.data["closing_balance"], balances[-1])
+        self.assertEqual(response.data["next"] is not None, has_next)
+
+    def test_pages_carry_the_balance(self):
+        first = self.get_page()
+        self.assertPage(first, 0, [100, 70], True)
+        second = self.get_page(after=first.data["next"])
+        self.assertPage(second, 70, [120, 100], True)
+        self.assertPage(self.get_page(after=second.data["next"]), 100, [110], False)
+
+    def test_start(self):
+        self.assertPage(self.get_page(start="2022-01-03 00:00:00"), 70, [120, 100], True)
 
-# Create your tests here.
+    def test_invalid_parameters(self):
+        for params in [
+            {"after": "abc"},
+            {"after": str(uuid4())},
+            {"after": str(self.other_entry.id)},
+            {"start": "yesterday"},
+        ]:
+            with self.subTest(**params):
+                self.assertEqual(self.get_page(**params).status_code, 400)
@@ -6,11 +6,13 @@ from .views import (
     GetAllBalances,
     LedgerAndDetailEntry,
     ListLedger,
+    ListLedgerWithBalance,
     UpdateLedgerAndDetailEntry,
 )
 
 urlpatterns = [
     path("", ListLedger.as_view()),
+    path("running-balance/", ListLedgerWithBalance.as_view()),
     path("ledger-entry/create/", LedgerAndDetailEntry.as_view()),
     path("ledger-entry/edit/<uuid:pk>/", UpdateLedgerAndDetailEntry.as_view()),
     path("ledger-entry/delete/<uuid:pk>/", DeleteLedgerDetail.as_view()),
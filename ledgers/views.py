@@ -1,24 +1,29 @@
 from datetime import datetime
 from functools import reduce
+from uuid import UUID
 
-from django.db.models import F, Max, Min, Sum
+from django.db.models import Case, F, FloatField, Max, Min, Q, Sum, When, Window
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, status
 from rest_framework.response import Response
+from rest_framework.serializers import ValidationError
 from rest_framework.views import APIView
 
 import authentication.constants as PERMISSIONS
 from authentication.mixins import CheckPermissionsMixin
-from cheques.choices import ChequeStatusChoices
-from cheques.models import ExternalCheque, ExternalChequeTransfer, PersonalCheque
-from core.pagination import LargePagination
+from cheques.utils import get_cheque_summary
+from core.pagination import LargePagination, PaginationHandlerMixin, StandardPagination
 from core.utils import check_permission, convert_date_to_datetime
-from ledgers.models import Ledger, LedgerAndExternalCheque
-from ledgers.serializers import LedgerAndDetailSerializer, LedgerSerializer
+from ledgers.models import Ledger, PersonBalance
+from ledgers.serializers import (
+    LedgerAndDetailSerializer,
+    LedgerSerializer,
+    LedgerWithBalanceSerializer,
+)
 from logs.choices import ActivityCategory, ActivityTypes
 from logs.models import Log
 
-from .queries import LedgerAndDetailQuery, LedgerQuery
+from .queries import LEDGER_SOURCE_PREFETCH, LedgerAndDetailQuery, LedgerQuery
 
 
 class ListLedger(LedgerQuery, CheckPermissionsMixin, generics.ListAPIView):
@@ -45,14 +50,18 @@ class ListLedger(LedgerQuery, CheckPermissionsMixin, generics.ListAPIView):
         filter = {}
         if not check_permission(self.request, PERMISSIONS.CAN_VIEW_FULL_LEDGERS):
             filter.update({"person__person_type": "C"})
-        return Ledger.objects.select_related(
-            "person",
-            "account_type",
-        ).filter(
-            person__branch=self.request.branch,
-            person=person,
-            date__lte=endDate,
-            **filter,
+        return (
+            Ledger.objects.select_related(
+                "person",
+                "account_type",
+            )
+            .prefetch_related(*LEDGER_SOURCE_PREFETCH)
+            .filter(
+                branch=self.request.branch,
+                person=person,
+                date__lte=endDate,
+                **filter,
+            )
         )
 
     def list(self, request, *args, **kwargs):
@@ -71,44 +80,7 @@ class ListLedger(LedgerQuery, CheckPermissionsMixin, generics.ListAPIView):
 
         branch = request.branch
 
-        balance_external_cheques = LedgerAndExternalCheque.get_external_cheque_balance(
-            person, branch
-        )
-        recovered_external_cheque_amount = ExternalCheque.get_amount_recovered(
-            person, branch
-        )
-        cleared_cheques = LedgerAndExternalCheque.get_passed_cheque_amount(person, branch)
-
-        cleared_transferred_cheques = (
-            ExternalCheque.get_sum_of_cleared_transferred_cheques(person, branch)
-        )
-
-        PENDING_CHEQUES = balance_external_cheques - (
-            recovered_external_cheque_amount
-            + cleared_cheques
-            + cleared_transferred_cheques
-        )
-        NUM_OF_PENDING = ExternalCheque.get_number_of_pending_cheques(person, branch)
-
-        persons_transferred_cheques = ExternalCheque.get_sum_of_transferred_cheques(
-            person, branch
-        )
-
-        # sum of cheques that have been transferred to this person
-        balance_cheques = list(
-            LedgerAndExternalCheque.objects.values("ledger_entry__nature")
-            .order_by("ledger_entry__nature")
-            .filter(external_cheque__status=ChequeStatusChoices.TRANSFERRED)
-            .annotate(amount=Sum("external_cheque__amount"))
-        )
-        sum_of_transferred_to_this_person = reduce(
-            lambda prev, curr: prev + curr["amount"], balance_cheques, 0
-        )
-        sum_of_transferred_to_this_person = ExternalChequeTransfer.sum_of_transferred(
-            person, branch
-        )
-
-        personal_cheque_balance = PersonalCheque.get_pending_cheques(person, branch)
+        cheque_summary = get_cheque_summary(person, branch)
 
         opening_balance = reduce(
             lambda prev, curr: prev
@@ -129,15 +101,104 @@ class ListLedger(LedgerQuery, CheckPermissionsMixin, generics.ListAPIView):
         ).data
         page = self.get_paginated_response(ledger_data)
         page.data["opening_balance"] = opening_balance
-        page.data["pending_cheques"] = PENDING_CHEQUES
-        page.data["pending_cheques_count"] = NUM_OF_PENDING
-        page.data["transferred_cheques"] = persons_transferred_cheques
-        page.data["transferred_to_this_person"] = sum_of_transferred_to_this_person
-        page.data["personal_pending"] = personal_cheque_balance
+        page.data.update(cheque_summary)
 
         return Response(page.data, status=status.HTTP_200_OK)
 
 
+class ListLedgerWithBalance(ListLedger):
+    """
+    get ledger of a person with the running balance of every row computed by the database
+    accepts start, end and after (id of the last row of the previous page) for keyset pagination
+    """
+
+    serializer_class = LedgerWithBalanceSerializer
+    pagination_class = None
+    page_size = LargePagination.page_size
+
+    def list(self, request, *args, **kwargs):
+        qp = self.request.query_params
+        queryset = self.filter_queryset()
+        page_filter = Q()
+        opening_filter = Q()
+
+        if qp.get("after"):
+            try:
+                last = (
+                    queryset.prefetch_related(None)
+                    .filter(id=UUID(str(qp.get("after"))))
+                    .first()
+                )
+            except ValueError:
+                last = None
+            if last is None:
+                raise ValidationError(
+                    "after should be the next id of a previous page of this ledger", 400
+                )
+            page_filter = (
+                Q(date__gt=last.date)
+                | Q(date=last.date, time_stamp__gt=last.time_stamp)
+                | Q(date=last.date, time_stamp=last.time_stamp, id__gt=last.id)
+            )
+            opening_filter = ~page_filter
+        elif qp.get("start"):
+            try:
+                start = convert_date_to_datetime(qp.get("start"))
+            except ValueError:
+                raise ValidationError(
+                    "start should be in the format YYYY-MM-DD HH:MM:SS", 400
+                )
+            page_filter = Q(date__gte=start)
+            opening_filter = Q(date__lt=start)
+
+        opening_balance = 0
+        if qp.get("after") or qp.get("start"):
+            opening_balance = (
+                queryset.filter(opening_filter).aggregate(
+                    balance=Sum(
+                        Case(
+                            When(nature="C", then=F("amount")),
+                            default=-F("amount"),
+                            output_field=FloatField(),
+                        )
+                    )
+                )["balance"]
+                or 0
+            )
+
+        ordering = [F("date").asc(), F("time_stamp").asc(), F("id").asc()]
+        rows = list(
+            queryset.filter(page_filter)
+            .annotate(
+                running_balance=Window(
+                    expression=Sum(
+                        Case(
+                            When(nature="C", then=F("amount")),
+                            default=-F("amount"),
+                            output_field=FloatField(),
+                        )
+                    ),
+                    order_by=ordering,
+                )
+            )
+            .order_by(*ordering)[: self.page_size + 1]
+        )
+        has_next = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        for row in rows:
+            row.balance = opening_balance + row.running_balance
+
+        return Response(
+            {
+                "results": LedgerWithBalanceSerializer(rows, many=True).data,
+                "opening_balance": opening_balance,
+                "closing_balance": rows[-1].balance if rows else opening_balance,
+                "next": rows[-1].id if has_next else None,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
 class DeleteLedgerDetail(LedgerQuery, CheckPermissionsMixin, generics.DestroyAPIView):
     """
     Delete a ledger record
@@ -156,62 +217,41 @@ class DeleteLedgerDetail(LedgerQuery, CheckPermissionsMixin, generics.DestroyAPI
         )
 
 
-class GetAllBalances(CheckPermissionsMixin, APIView):
+class GetAllBalances(CheckPermissionsMixin, APIView, PaginationHandlerMixin):
     """
     Get all balances
     Expects a query parameter person (S or C)
-    Optional qp balance for balances gte or lte
+    Optional qp balance for balances gte or lte and ordering (balance or -balance)
     """
 
     permissions = {
         "or": [PERMISSIONS.CAN_VIEW_PARTIAL_BALANCES, PERMISSIONS.CAN_VIEW_FULL_BALANCES]
     }
+    pagination_class = StandardPagination
 
     def get(self, request):
-        filters = {"person__branch": request.branch}
+        qp = request.query_params
+        filters = {}
 
         if not check_permission(request, PERMISSIONS.CAN_VIEW_FULL_BALANCES):
-            filters.update({"person__person_type": "C"})
-
-        if request.query_params.get("person"):
-            filters.update({"person__person_type": request.query_params.get("person")})
-        if request.query_params.get("person_id"):
-            filters.update({"person": request.query_params.get("person_id")})
-
-        balances = (
-            Ledger.objects.filter(**filters)
-            .values("nature", "person")
-            .order_by("nature")
-            .annotate(balance=Sum("amount"))
-        )
-
-        data = {}
-        for b in balances:
-            name = str(b["person"])
-            amount = b["balance"]
-            nature = b["nature"]
-            if not name in data:
-                data[name] = amount if nature == "C" else -amount
-            else:
-                data[name] += amount if nature == "C" else -amount
-
-        balance_gte = request.query_params.get("balance__gte")
-        balance_lte = request.query_params.get("balance__lte")
-
-        if balance_gte or balance_lte:
-            final_balances = {}
-            if balance_gte:
-                for person, balance in data.items():
-                    if balance >= float(balance_gte):
-                        final_balances[person] = balance
-            if balance_lte:
-                for person, balance in data.items():
-                    if balance <= float(balance_lte):
-                        final_balances[person] = balance
-
-            return Response(final_balances, status=status.HTTP_200_OK)
-
-        return Response(data, status=status.HTTP_200_OK)
+            filters.update({"person_type": "C"})
+
+        if qp.get("person"):
+            filters.update({"person_type": qp.get("person")})
+        if qp.get("person_id"):
+            filters.update({"id": qp.get("person_id")})
+
+        balances = PersonBalance.get_balances(request.branch, **filters)
+        if qp.get("balance__gte"):
+            balances = balances.filter(balance__gte=float(qp.get("balance__gte")))
+        if qp.get("balance__lte"):
+            balances = balances.filter(balance__lte=float(qp.get("balance__lte")))
+
+        balances = balances.order_by(
+            "-balance" if qp.get("ordering") == "-balance" else "balance", "id"
+        ).values("balance", person=F("id"))
+        page = self.paginate_queryset(balances)
+        return self.get_paginated_response(page)
 
 
 class FilterLedger(LedgerQuery, generics.ListAPIView):
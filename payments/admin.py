@@ -1,9 +1,10 @@
 from django.contrib import admin
+from ledgers.admin import LedgerEntriesAdmin
 
 from .models import Payment, PaymentImage
 
 
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(LedgerEntriesAdmin):
     list_display = ["id", "date", "serial", "account_type"]
     list_filter = ["person__branch__name"]
 
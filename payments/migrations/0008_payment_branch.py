@@ -0,0 +1,28 @@
+# Generated by Django 3.2.13 on 2026-10-18 18:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_alter_userbranchrelation_permissions'),
+        ('payments', '0007_payment_detail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='branch',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payment', to='authentication.branch'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['branch', 'date'], name='payments_pa_branch__3b930e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['branch', 'serial'], name='payments_pa_branch__82013e_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate_branch(apps, schema_editor):
+    Payment = apps.get_model("payments", "Payment")
+    Person = apps.get_model("essentials", "Person")
+
+    Payment.objects.update(
+        branch=Subquery(
+            Person.objects.filter(id=OuterRef("person")).values("branch")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0008_payment_branch"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_branch, migrations.RunPython.noop),
+    ]
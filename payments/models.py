@@ -1,4 +1,4 @@
-from authentication.models import UserAwareModel
+from authentication.models import BranchScopedModel, UserAwareModel
 from core.models import ID, DateTimeAwareModel, NextSerial
 from django.core.validators import MinValueValidator
 from django.db import models
@@ -10,7 +10,7 @@ from transactions.choices import TransactionChoices
 from .utils import get_image_upload_path
 
 
-class Payment(ID, DateTimeAwareModel, UserAwareModel, NextSerial):
+class Payment(ID, BranchScopedModel, DateTimeAwareModel, UserAwareModel, NextSerial):
     person = models.ForeignKey(Person, on_delete=models.PROTECT)
     account_type = models.ForeignKey(
         AccountType, on_delete=models.PROTECT, null=True, default=None
@@ -20,6 +20,12 @@ class Payment(ID, DateTimeAwareModel, UserAwareModel, NextSerial):
     serial = models.PositiveBigIntegerField()
     detail = models.CharField(max_length=1000, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["branch", "date"]),
+            models.Index(fields=["branch", "serial"]),
+        ]
+
     def get_ledger_string(self):
         """Return string for ledger. Instances here are LedgerAndPayment records"""
         string = ""
@@ -28,9 +34,12 @@ class Payment(ID, DateTimeAwareModel, UserAwareModel, NextSerial):
         string += f"Payment{account_type}{detail}"
         return string
 
+    def get_ledger_columns(self, nature):
+        return self.get_ledger_string(), f"P-{self.serial} {self.detail}"
+
     @classmethod
     def _create_payment(cls, request, validated_data):
-        serial = Payment.get_next_serial("serial", person__branch=request.branch)
+        serial = Payment.get_next_serial(request.branch)
         payment_instance = Payment.objects.create(
             user=request.user, serial=serial, **validated_data
         )
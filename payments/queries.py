@@ -3,7 +3,7 @@ from .models import Payment, PaymentAndImage, PaymentImage
 
 class PaymentAndImageQuery:
     def get_queryset(self):
-        return PaymentAndImage.objects.filter(payment__person__branch=self.request.branch)
+        return PaymentAndImage.objects.filter(payment__branch=self.request.branch)
 
 
 class PaymentImageQuery:
@@ -13,6 +13,4 @@ class PaymentImageQuery:
 
 class PaymentQuery:
     def get_queryset(self):
-        return Payment.objects.filter(person__branch=self.request.branch).order_by(
-            "serial"
-        )
+        return Payment.objects.filter(branch=self.request.branch).order_by("serial")
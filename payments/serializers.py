@@ -1,7 +1,7 @@
 from rest_framework import serializers, status
 
 from cheques.utils import get_cheque_account
-from ledgers.models import LedgerAndPayment
+from ledgers.models import Ledger, LedgerAndPayment
 from logs.choices import ActivityCategory, ActivityTypes
 from logs.models import Log
 
@@ -163,7 +163,7 @@ class PaymentSerializer(
         images = validated_data.pop("images")
         self.link_images(images, instance)
         # delete the older instance in the ledger
-        LedgerAndPayment.objects.get(payment=instance).delete()
+        Ledger.delete_entries(Ledger.objects.filter(ledger_payment__payment=instance))
 
         log_string = (
             f"""P-{instance.serial}"""
@@ -213,5 +213,7 @@ class PaymentAndImageListSerializer(serializers.ModelSerializer):
         ]
 
     def get_image_urls(self, obj):
-        images = PaymentImage.objects.filter(payment_image__payment=obj)
-        return map(lambda x: {"id": x.id, "url": x.image.url}, images)
+        return map(
+            lambda x: {"id": x.image_id, "url": x.image.image.url},
+            obj.paymentandimage_set.all(),
+        )
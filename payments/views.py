@@ -11,9 +11,11 @@ from rest_framework.response import Response
 import authentication.constants as PERMISSIONS
 from authentication.mixins import CheckPermissionsMixin
 from core.pagination import StandardPagination
+from ledgers.models import Ledger
 from logs.choices import ActivityCategory, ActivityTypes
 from logs.models import Log
 
+from .models import Payment
 from .queries import PaymentImageQuery, PaymentQuery
 from .serializers import (
     PaymentAndImageListSerializer,
@@ -40,6 +42,9 @@ class ListPaymentView(PaymentQuery, CheckPermissionsMixin, ListAPIView):
         "nature": ["exact"],
     }
 
+    def get_queryset(self):
+        return super().get_queryset().prefetch_related("paymentandimage_set__image")
+
 
 class CreatePaymentView(
     PaymentQuery, CheckPermissionsMixin, CreateAPIView, UpdateAPIView
@@ -62,6 +67,9 @@ class DeletePaymentView(PaymentQuery, CheckPermissionsMixin, DestroyAPIView):
 
     permissions = [PERMISSIONS.CAN_DELETE_PAYMENT]
 
+    def perform_destroy(self, instance):
+        Ledger.delete_with_entries(Payment.objects.filter(id=instance.id))
+
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         log_string = (
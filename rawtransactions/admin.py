@@ -1,4 +1,5 @@
 from django.contrib import admin
+from ledgers.admin import LedgerEntriesAdmin
 
 from .models import (
     Formula,
@@ -23,9 +24,9 @@ class RawLotDetailAdmin(admin.ModelAdmin):
 # Register your models here.
 admin.site.register(Formula)
 admin.site.register(RawProduct)
-admin.site.register(RawTransaction)
+admin.site.register(RawTransaction, LedgerEntriesAdmin)
 admin.site.register(RawTransactionLot, RawTransactionLotAdmin)
 admin.site.register(RawLotDetail, RawLotDetailAdmin)
-admin.site.register(RawDebit)
+admin.site.register(RawDebit, LedgerEntriesAdmin)
 admin.site.register(RawDebitLot)
 admin.site.register(RawDebitLotDetail)
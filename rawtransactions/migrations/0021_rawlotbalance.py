@@ -0,0 +1,31 @@
+# Generated by Django 3.2.13 on 2026-10-18 18:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('essentials', '0033_populate_accountbalance'),
+        ('rawtransactions', '0020_auto_20220620_1621'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RawLotBalance',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('actual_gazaana', models.FloatField()),
+                ('expected_gazaana', models.FloatField()),
+                ('quantity', models.FloatField(default=0.0)),
+                ('formula', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rawtransactions.formula')),
+                ('lot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances', to='rawtransactions.rawtransactionlot')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='essentials.warehouse')),
+            ],
+            options={
+                'unique_together': {('lot', 'actual_gazaana', 'expected_gazaana', 'formula', 'warehouse')},
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import CharField, F, Sum, Value
+
+
+def populate_raw_lot_balance(apps, schema_editor):
+    RawLotBalance = apps.get_model("rawtransactions", "RawLotBalance")
+    RawLotDetail = apps.get_model("rawtransactions", "RawLotDetail")
+    RawDebitLotDetail = apps.get_model("rawtransactions", "RawDebitLotDetail")
+    DyingIssueDetail = apps.get_model("dying", "DyingIssueDetail")
+
+    key = ["actual_gazaana", "expected_gazaana", "formula", "warehouse"]
+    balances = defaultdict(float)
+    for queryset, lot, nature in [
+        (
+            RawLotDetail.objects.filter(lot_number__issued=False),
+            "lot_number",
+            Value("C", output_field=CharField()),
+        ),
+        (
+            RawDebitLotDetail.objects.filter(return_lot__lot_number__issued=False),
+            "return_lot__lot_number",
+            F("nature"),
+        ),
+        (
+            DyingIssueDetail.objects.filter(dying_lot_number__lot_number__issued=False),
+            "dying_lot_number__lot_number",
+            Value("D", output_field=CharField()),
+        ),
+    ]:
+        for row in (
+            queryset.values(*key, lot=F(lot), row_nature=nature)
+            .order_by()
+            .annotate(quantity=Sum("quantity"))
+        ):
+            if row["warehouse"] is None:
+                continue
+            balances[
+                (
+                    row["lot"],
+                    row["actual_gazaana"],
+                    row["expected_gazaana"],
+                    row["formula"],
+                    row["warehouse"],
+                )
+            ] += (row["quantity"] if row["row_nature"] == "C" else -row["quantity"])
+
+    RawLotBalance.objects.bulk_create(
+        [
+            RawLotBalance(
+                lot_id=lot,
+                actual_gazaana=actual_gazaana,
+                expected_gazaana=expected_gazaana,
+                formula_id=formula,
+                warehouse_id=warehouse,
+                quantity=quantity,
+            )
+            for (
+                lot,
+                actual_gazaana,
+                expected_gazaana,
+                formula,
+                warehouse,
+            ), quantity in balances.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rawtransactions", "0021_rawlotbalance"),
+        ("dying", "0008_dyingissue_time_stamp"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_raw_lot_balance, migrations.RunPython.noop),
+    ]
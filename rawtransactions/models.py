@@ -1,11 +1,14 @@
+from collections import defaultdict
 from datetime import date
+from functools import reduce
+from operator import or_
 
 from authentication.models import BranchAwareModel, UserAwareModel
 from core.constants import MIN_POSITIVE_VAL_SMALL
-from core.models import ID, DateTimeAwareModel, NextSerial
+from core.models import ID, DateTimeAwareModel, NextSerial, add_to_balances
 from django.core.validators import MinValueValidator
 from django.db import models
-from django.db.models import Max
+from django.db.models import Max, Q
 from essentials.models import Person, Warehouse
 from transactions.choices import TransactionChoices
 
@@ -58,6 +61,8 @@ class RawTransaction(ID, UserAwareModel, NextSerial, DateTimeAwareModel):
     # manual_invoice_serial = models.PositiveBigIntegerField()
     serial = models.PositiveBigIntegerField()
 
+    serial_branch = "person__branch"
+
     def __str__(self):
         return f"{self.serial} - {self.person}"
 
@@ -72,6 +77,9 @@ class RawTransactionLot(ID, NextSerial):
     lot_number = models.PositiveBigIntegerField()
     issued = models.BooleanField(default=False)
 
+    serial_field = "lot_number"
+    serial_branch = "raw_transaction__person__branch"
+
     def __str__(self):
         return f"{self.raw_transaction} - {self.lot_number}"
 
@@ -92,6 +100,9 @@ class RawDebit(ID, UserAwareModel, NextSerial, DateTimeAwareModel):
     serial = models.PositiveBigIntegerField()
     debit_type = models.CharField(max_length=10, choices=RawDebitTypes.choices)
 
+    serial_branch = "person__branch"
+    serial_key = "debit_type"
+
     @classmethod
     def is_serial_unique(cls, **kwargs):
         return not RawDebit.objects.filter(**kwargs).exists()
@@ -111,3 +122,129 @@ class RawDebitLotDetail(AbstractRawLotDetail):
     nature = models.CharField(
         max_length=1, choices=TransactionChoices.choices, default=TransactionChoices.DEBIT
     )
+
+
+class RawLotBalance(ID):
+    """Current quantity of a lot in a warehouse, maintained by every raw stock movement"""
+
+    lot = models.ForeignKey(
+        RawTransactionLot, on_delete=models.CASCADE, related_name="balances"
+    )
+    actual_gazaana = models.FloatField()
+    expected_gazaana = models.FloatField()
+    formula = models.ForeignKey(Formula, on_delete=models.CASCADE)
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE)
+    quantity = models.FloatField(default=0.0)
+
+    class Meta:
+        unique_together = (
+            "lot",
+            "actual_gazaana",
+            "expected_gazaana",
+            "formula",
+            "warehouse",
+        )
+
+    @classmethod
+    def get_key(cls, lot, detail):
+        """(lot, actual_gazaana, expected_gazaana, formula, warehouse) of a detail"""
+        if not isinstance(detail, dict):
+            detail = {
+                "actual_gazaana": detail.actual_gazaana,
+                "expected_gazaana": detail.expected_gazaana,
+                "formula": detail.formula_id,
+                "warehouse": detail.warehouse_id,
+            }
+        return (
+            getattr(lot, "id", lot),
+            float(detail["actual_gazaana"]),
+            float(detail["expected_gazaana"]),
+            getattr(detail["formula"], "id", detail["formula"]),
+            getattr(detail["warehouse"], "id", detail["warehouse"]),
+        )
+
+    @classmethod
+    def get_key_filter(cls, keys):
+        """Q object matching any of the keys"""
+        return reduce(
+            or_,
+            [
+                Q(
+                    lot=key[0],
+                    actual_gazaana=key[1],
+                    expected_gazaana=key[2],
+                    formula=key[3],
+                    warehouse=key[4],
+                )
+                for key in keys
+            ],
+        )
+
+    @classmethod
+    def get_deltas(cls, lot, details, sign=1, deltas=None):
+        """
+        quantity change of every key for detail rows of a lot, debit natured rows
+        take quantity out, sign=-1 reverses the details (used when they are removed)
+        """
+        deltas = defaultdict(float) if deltas is None else deltas
+        for d in details:
+            if d.warehouse_id is None:
+                continue
+            nature = getattr(d, "nature", TransactionChoices.CREDIT)
+            quantity = d.quantity if nature == TransactionChoices.CREDIT else -d.quantity
+            deltas[cls.get_key(lot, d)] += sign * quantity
+        return deltas
+
+    @classmethod
+    def apply_deltas(cls, deltas, create=True):
+        """
+        add quantity deltas keyed like get_key, create=False only updates the
+        balances that exist (used when the lot itself may be gone)
+        """
+        add_to_balances(
+            RawLotBalance,
+            ["lot", "actual_gazaana", "expected_gazaana", "formula", "warehouse"],
+            ["quantity"],
+            {key: (quantity,) for key, quantity in deltas.items() if quantity},
+            create,
+        )
+
+    @classmethod
+    def get_quantities(cls, keys):
+        """current quantity of every given key, missing keys have none"""
+        if not keys:
+            return {}
+        return {
+            (
+                b.lot_id,
+                b.actual_gazaana,
+                b.expected_gazaana,
+                b.formula_id,
+                b.warehouse_id,
+            ): b.quantity
+            for b in RawLotBalance.objects.filter(cls.get_key_filter(keys))
+        }
+
+    @classmethod
+    def rebuild(cls, branch, stock):
+        """replace balances of the branch with freshly computed quantities by key"""
+        RawLotBalance.objects.filter(lot__raw_transaction__person__branch=branch).delete()
+        RawLotBalance.objects.bulk_create(
+            [
+                RawLotBalance(
+                    lot_id=lot,
+                    actual_gazaana=actual_gazaana,
+                    expected_gazaana=expected_gazaana,
+                    formula_id=formula,
+                    warehouse_id=warehouse,
+                    quantity=quantity,
+                )
+                for (
+                    lot,
+                    actual_gazaana,
+                    expected_gazaana,
+                    formula,
+                    warehouse,
+                ), quantity in stock.items()
+            ]
+        )
@@ -1,4 +1,11 @@
-from .models import Formula, RawDebit, RawProduct, RawTransaction, RawTransactionLot
+from .models import (
+    Formula,
+    RawDebit,
+    RawLotBalance,
+    RawProduct,
+    RawTransaction,
+    RawTransactionLot,
+)
 
 
 class RawProductQuery:
@@ -26,3 +33,10 @@ class RawTransactionLotQuery:
 class RawDebitQuery:
     def get_queryset(self):
         return RawDebit.objects.filter(person__branch=self.request.branch)
+
+
+class RawLotBalanceQuery:
+    def get_queryset(self):
+        return RawLotBalance.objects.filter(
+            lot__raw_transaction__person__branch=self.request.branch, lot__issued=False
+        )
@@ -1,6 +1,7 @@
-from functools import reduce
+from collections import defaultdict
 
-from dying.models import DyingIssue
+from core.models import UnitOfWork
+from dying.models import DyingIssue, DyingUnit
 from essentials.choices import PersonChoices
 from essentials.models import Warehouse
 from ledgers.models import Ledger, LedgerAndRawTransaction
@@ -14,12 +15,13 @@ from .models import (
     RawDebit,
     RawDebitLot,
     RawDebitLotDetail,
+    RawLotBalance,
     RawLotDetail,
     RawProduct,
     RawTransaction,
     RawTransactionLot,
 )
-from .utils import calculate_amount, get_all_raw_stock, is_array_unique
+from .utils import calculate_amount, is_array_unique
 
 
 class FormulaSerializer(serializers.ModelSerializer):
@@ -140,75 +142,81 @@ class CreateRawTransactionSerializer(serializers.ModelSerializer):
     #     return data
 
     def create(self, validated_data):
+        """
+        writes the transaction with all its lots in one batch: the lot numbers (and
+        dying lot numbers of the issued lots) are allocated as ranges and every model
+        is inserted with one bulk_create
+        """
         lots = validated_data.pop("lots")
         branch = self.context["request"].branch
         user = self.context["request"].user
-        transaction = RawTransaction.objects.create(
+
+        # ensure that warehouse is added if lot is not for issue
+        issued = [lot for lot in lots if lot.get("issued", False)]
+        for lot in lots:
+            for lot_detail in lot["lot_detail"]:
+                if not lot.get("issued", False) and not lot_detail["warehouse"]:
+                    raise serializers.ValidationError(
+                        "Add warehouse for the non-issue lot",
+                        status.HTTP_400_BAD_REQUEST,
+                    )
+        dying_units = DyingUnit.objects.filter(branch=branch).in_bulk(
+            [lot["dying_unit"] for lot in issued if lot.get("dying_unit")]
+        )
+        if any(lot.get("dying_unit") not in dying_units for lot in issued):
+            raise serializers.ValidationError("Please enter dying unit for issued lot")
+
+        transaction = RawTransaction(
             **validated_data,
-            serial=RawTransaction.get_next_serial("serial", person__branch=branch),
+            serial=RawTransaction.get_next_serial(branch),
             user=user,
         )
-
-        amount = 0
+        rows = UnitOfWork().add(transaction)
+        lot_numbers = iter(RawTransactionLot.get_next_serials(branch, count=len(lots)))
+        dying_lot_numbers = iter(
+            DyingIssue.get_next_serials(branch, count=len(issued)) if issued else []
+        )
+        details = []
+        stock_deltas = defaultdict(float)
         for lot in lots:
-            current_lot = RawTransactionLot.objects.create(
+            current_lot = RawTransactionLot(
                 raw_transaction=transaction,
-                issued=lot["issued"],
+                issued=lot.get("issued", False),
                 raw_product=lot["raw_product"],
-                lot_number=RawTransactionLot.get_next_serial(
-                    "lot_number", raw_transaction__person__branch=branch
-                ),
+                lot_number=next(lot_numbers),
             )
+            rows.add(current_lot)
             if current_lot.issued:
-                try:
-                    DyingIssue.create_auto_issued_lot(
-                        branch=branch,
-                        dying_unit=lot["dying_unit"],
-                        lot_number=current_lot,
+                rows.add(
+                    *DyingIssue.get_auto_issued_rows(
+                        dying_units[lot["dying_unit"]],
+                        next(dying_lot_numbers),
+                        current_lot,
                         date=transaction.date,
                     )
-                except:
-                    raise serializers.ValidationError(
-                        "Please enter dying unit for issued lot"
-                    )
-
-            # ensure that warehouse is added if lot is not for issue
-            # also ensure that the product belongs to the person
-            for lot_detail in lot["lot_detail"]:
-                if not current_lot.issued and not lot_detail["warehouse"]:
-                    raise serializers.ValidationError(
-                        "Add warehouse for the non-issue lot",
-                        status.HTTP_400_BAD_REQUEST,
-                    )
-                if transaction.person != transaction.person:
-                    raise serializers.ValidationError(
-                        "The product does not belong to the supplier",
-                        status.HTTP_400_BAD_REQUEST,
-                    )
-
-            current_lot_detail = map(
-                lambda l: {
-                    **l,
-                    "warehouse": None if current_lot.issued else l["warehouse"],
-                },
-                lot["lot_detail"],
-            )
-
-            for detail in current_lot_detail:
-                current_detail = RawLotDetail.objects.create(
-                    **detail, lot_number=current_lot
                 )
-                amount += (
-                    current_detail.quantity
-                    * current_detail.rate
-                    * current_detail.actual_gazaana
-                    * (
-                        current_detail.formula.numerator
-                        / current_detail.formula.denominator
-                    )
+
+            current_lot_detail = [
+                RawLotDetail(
+                    **{
+                        **detail,
+                        "warehouse": None if current_lot.issued else detail["warehouse"],
+                    },
+                    lot_number=current_lot,
                 )
+                for detail in lot["lot_detail"]
+            ]
+            rows.add(*current_lot_detail)
+            RawLotBalance.get_deltas(current_lot, current_lot_detail, deltas=stock_deltas)
+            details += lot["lot_detail"]
+
+        # formulas come resolved from validation so the amount needs no queries
         if transaction.person:
-            LedgerAndRawTransaction.create_ledger_entry(transaction, amount)
+            rows.add(
+                *LedgerAndRawTransaction.get_rows(transaction, calculate_amount(details))
+            )
+        rows.flush()
+        RawLotBalance.apply_deltas(stock_deltas)
 
         return {
             "id": transaction.id,
@@ -238,7 +246,8 @@ class StockCheck:
 
     def check_stock(self, array, check_person=False, person=None):
         self.branch = self.context["request"].branch
-        stock = get_all_raw_stock(self.branch)
+        requested = defaultdict(float)
+        lots = {}
         for data in array:
             lot = data["lot_number"]
             if check_person and lot.raw_transaction.person != person:
@@ -247,31 +256,18 @@ class StockCheck:
                 )
 
             for detail in data["detail"]:
-                lot_stock = list(
-                    filter(
-                        lambda val: val["lot_number"] == lot.id
-                        and val["actual_gazaana"] == detail["actual_gazaana"]
-                        and val["expected_gazaana"] == detail["expected_gazaana"]
-                        and val["formula"] == detail["formula"].id
-                        and val["warehouse"] == detail["warehouse"].id,
-                        stock,
-                    )
-                )
-                quantity = reduce(
-                    lambda prev, curr: prev
-                    + (
-                        curr["quantity"]
-                        if curr["nature"] == TransactionChoices.CREDIT
-                        else -curr["quantity"]
-                    ),
-                    lot_stock,
-                    0,
+                key = RawLotBalance.get_key(lot, detail)
+                requested[key] += detail["quantity"]
+                lots[key] = lot
+
+        # only the balances of the keys asked for are read
+        stock = RawLotBalance.get_quantities(requested.keys())
+        for key, quantity in requested.items():
+            if stock.get(key, 0.0) < quantity:
+                raise ValidationError(
+                    f"Stock for lot # {lots[key].lot_number} is low",
+                    status.HTTP_400_BAD_REQUEST,
                 )
-                if quantity < detail["quantity"]:
-                    raise ValidationError(
-                        f"Stock for lot # {lot.lot_number} is low",
-                        status.HTTP_400_BAD_REQUEST,
-                    )
 
 
 class RawDebitSerializer(UniqueLotNumbers, StockCheck, serializers.ModelSerializer):
@@ -323,13 +319,12 @@ class RawDebitSerializer(UniqueLotNumbers, StockCheck, serializers.ModelSerializ
             **validated_data,
             user=user,
             bill_number=RawDebit.get_next_serial(
-                "serial",
-                debit_type=validated_data["debit_type"],
-                person__branch=self.branch,
+                self.branch, validated_data["debit_type"]
             ),
         )
 
         ledger_amount = 0
+        stock_deltas = defaultdict(float)
         for lot in data:
             ledger_amount += calculate_amount(lot["detail"])
             raw_debit_lot_instance = RawDebitLot.objects.create(
@@ -347,6 +342,10 @@ class RawDebitSerializer(UniqueLotNumbers, StockCheck, serializers.ModelSerializ
                 )
 
             RawDebitLotDetail.objects.bulk_create(current_return_details)
+            RawLotBalance.get_deltas(
+                lot["lot_number"], current_return_details, deltas=stock_deltas
+            )
+        RawLotBalance.apply_deltas(stock_deltas)
 
         Ledger.objects.create(
             # raw_debit=debit_instance,
@@ -476,12 +475,11 @@ class RawStockTransferSerializer(
             **validated_data,
             branch=self.branch,
             bill_number=RawDebit.get_next_serial(
-                "serial",
-                debit_type=validated_data["debit_type"],
-                person__branch=self.branch,
+                self.branch, validated_data["debit_type"]
             ),
         )
 
+        stock_deltas = defaultdict(float)
         for lot in data:
             raw_debit_lot_instance = RawDebitLot.objects.create(
                 lot_number=lot["lot_number"],
@@ -522,5 +520,9 @@ class RawStockTransferSerializer(
                 )
 
             RawDebitLotDetail.objects.bulk_create(current_return_details)
+            RawLotBalance.get_deltas(
+                lot["lot_number"], current_return_details, deltas=stock_deltas
+            )
+        RawLotBalance.apply_deltas(stock_deltas)
         validated_data["data"] = data
         return validated_data
@@ -1,13 +1,46 @@
 from django.db.models.signals import post_delete
 from django.dispatch import receiver
+from dying.models import DyingIssueDetail, DyingIssueLot
+from ledgers.models import Ledger
 
-from .models import RawDebitLot
+from .models import RawDebit, RawDebitLot, RawDebitLotDetail, RawLotBalance, RawLotDetail
 
 
 @receiver(post_delete, sender=RawDebitLot)
 def delete_raw_debit(sender, instance, **kwargs):
-    try:
-        if instance.bill_number:
-            instance.bill_number.delete()
-    except:
-        pass
+    if instance.bill_number_id:
+        Ledger.delete_with_entries(RawDebit.objects.filter(id=instance.bill_number_id))
+
+
+def reverse_raw_lot_balance(lot, instance, sign=-1):
+    RawLotBalance.apply_deltas(
+        RawLotBalance.get_deltas(lot, [instance], sign), create=False
+    )
+
+
+@receiver(post_delete, sender=RawLotDetail)
+def reverse_raw_lot_detail(sender, instance, **kwargs):
+    reverse_raw_lot_balance(instance.lot_number_id, instance)
+
+
+@receiver(post_delete, sender=RawDebitLotDetail)
+def reverse_raw_debit_lot_detail(sender, instance, **kwargs):
+    lot = (
+        RawDebitLot.objects.filter(id=instance.return_lot_id)
+        .values_list("lot_number", flat=True)
+        .first()
+    )
+    if lot is not None:
+        reverse_raw_lot_balance(lot, instance)
+
+
+@receiver(post_delete, sender=DyingIssueDetail)
+def reverse_dying_issue_detail(sender, instance, **kwargs):
+    lot = (
+        DyingIssueLot.objects.filter(id=instance.dying_lot_number_id)
+        .values_list("lot_number", flat=True)
+        .first()
+    )
+    if lot is not None:
+        # dying issue details take stock out, removing them puts it back
+        reverse_raw_lot_balance(lot, instance, 1)
@@ -0,0 +1,57 @@
+from core.tests import BranchTestMixin
+from django.test import TestCase
+
+from .choices import RawProductTypes
+from .models import (
+    Formula,
+    RawLotBalance,
+    RawProduct,
+    RawTransaction,
+    RawTransactionLot,
+)
+
+
+class ApplyDeltasTest(BranchTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.formula = Formula.objects.create(
+            branch=cls.branch, numerator=1, denominator=1
+        )
+        cls.lot = RawTransactionLot.objects.create(
+            raw_transaction=RawTransaction.objects.create(person=cls.supplier, serial=1),
+            raw_product=RawProduct.objects.create(
+                name="grey", person=cls.supplier, type=RawProductTypes.STANDARD
+            ),
+            lot_number=1,
+        )
+
+    def get_key(self, actual_gazaana, warehouse=None):
+        return (
+            self.lot.id,
+            actual_gazaana,
+            actual_gazaana,
+            self.formula.id,
+            (warehouse or self.warehouse).id,
+        )
+
+    def test_balances_in_one_statement(self):
+        for count in [1, 12]:
+            with self.assertNumQueries(1):
+                RawLotBalance.apply_deltas(
+                    {self.get_key(float(i + 1)): 2.0 for i in range(count)}
+                )
+        self.assertEqual(RawLotBalance.objects.get(actual_gazaana=1).quantity, 4)
+        self.assertEqual(RawLotBalance.objects.count(), 12)
+
+    def test_only_existing_balances_are_updated(self):
+        RawLotBalance.apply_deltas({self.get_key(10.0): 5.0})
+        with self.assertNumQueries(1):
+            RawLotBalance.apply_deltas(
+                {
+                    self.get_key(10.0): -3.0,
+                    self.get_key(10.0, self.other_warehouse): -3.0,
+                },
+                create=False,
+            )
+        self.assertEqual(RawLotBalance.objects.get().quantity, 2)
@@ -1,9 +1,10 @@
 from collections import defaultdict
 
-from django.db.models import Sum
+from django.db.models import CharField, F, Sum, Value
 from dying.models import DyingIssueDetail
+from transactions.choices import TransactionChoices
 
-from .models import RawDebitLotDetail, RawLotDetail
+from .models import RawDebitLotDetail, RawLotBalance, RawLotDetail
 
 
 def is_array_unique(array, key):
@@ -30,84 +31,49 @@ def calculate_amount(lot_details):
 
 
 def get_all_raw_stock(branch):
-    balance_lots = list(
+    """
+    quantity of every (lot, actual_gazaana, expected_gazaana, formula, warehouse) of
+    the lots not issued, from the complete raw stock history
+    """
+    key = ["actual_gazaana", "expected_gazaana", "formula", "warehouse"]
+    movements = [
         (
-            RawLotDetail.objects.values(
-                "lot_number",
-                "actual_gazaana",
-                "expected_gazaana",
-                "lot_number__raw_product",
-                "warehouse",
-                "formula",
-            )
-            .filter(lot_number__raw_transaction__branch=branch, lot_number__issued=False)
-            .annotate(quantity=Sum("quantity"))
-        )
-    )
-    balance_lots = list(
-        map(
-            lambda obj: {
-                **obj,
-                "nature": "C",
-                "raw_product": obj["lot_number__raw_product"],
-            },
-            balance_lots,
-        )
-    )
-    balance_returns = list(
+            RawLotDetail.objects.filter(
+                lot_number__raw_transaction__person__branch=branch,
+                lot_number__issued=False,
+            ),
+            "lot_number",
+            Value(TransactionChoices.CREDIT, output_field=CharField()),
+        ),
         (
-            RawDebitLotDetail.objects.values(
-                "return_lot__lot_number",
-                "actual_gazaana",
-                "expected_gazaana",
-                "return_lot__lot_number__raw_product",
-                "warehouse",
-                "formula",
-                "nature",
-            )
-            .filter(
-                return_lot__bill_number__branch=branch,
+            RawDebitLotDetail.objects.filter(
+                return_lot__bill_number__person__branch=branch,
                 return_lot__lot_number__issued=False,
-            )
-            .annotate(quantity=Sum("quantity"))
-        )
-    )
-    balance_returns = list(
-        map(
-            lambda obj: {
-                **obj,
-                "lot_number": obj["return_lot__lot_number"],
-                "raw_product": obj["return_lot__lot_number__raw_product"],
-            },
-            balance_returns,
-        )
-    )
-    balance_dyings = list(
+            ),
+            "return_lot__lot_number",
+            F("nature"),
+        ),
         (
-            DyingIssueDetail.objects.values(
-                "dying_lot_number__lot_number__raw_product",
-                "dying_lot_number__lot_number",
-                "actual_gazaana",
-                "expected_gazaana",
-                "formula",
-                "warehouse",
-            )
-            .filter(
+            DyingIssueDetail.objects.filter(
                 dying_lot_number__dying_lot__dying_unit__branch=branch,
                 dying_lot_number__lot_number__issued=False,
-            )
+            ),
+            "dying_lot_number__lot_number",
+            Value(TransactionChoices.DEBIT, output_field=CharField()),
+        ),
+    ]
+    stock = defaultdict(float)
+    for queryset, lot, nature in movements:
+        for row in (
+            queryset.values(*key, lot=F(lot), row_nature=nature)
+            .order_by()
             .annotate(quantity=Sum("quantity"))
-        )
-    )
-    balance_dyings = list(
-        map(
-            lambda obj: {
-                **obj,
-                "nature": "D",
-                "raw_product": obj["dying_lot_number__lot_number__raw_product"],
-                "lot_number": obj["dying_lot_number__lot_number"],
-            },
-            balance_dyings,
-        )
-    )
-    return [*balance_lots, *balance_returns, *balance_dyings]
+        ):
+            if row["warehouse"] is None:
+                continue
+            stock[RawLotBalance.get_key(row["lot"], row)] += (
+                row["quantity"]
+                if row["row_nature"] == TransactionChoices.CREDIT
+                else -row["quantity"]
+            )
+    return stock
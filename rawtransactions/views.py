@@ -1,14 +1,12 @@
-from collections import defaultdict
-from operator import itemgetter
-
 from core.pagination import StandardPagination
+from django.db.models import F, Sum
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics
-from transactions.choices import TransactionChoices
 
 from .queries import (
     FormulaQuery,
     RawDebitQuery,
+    RawLotBalanceQuery,
     RawProductQuery,
     RawTransactionLotQuery,
     RawTransactionQuery,
@@ -23,7 +21,6 @@ from .serializers import (
     RawStockTransferSerializer,
     ViewAllStockSerializer,
 )
-from .utils import get_all_raw_stock
 
 
 class CreateRawProduct(RawProductQuery, generics.CreateAPIView):
@@ -101,32 +98,24 @@ class ListRawTransactions(RawTransactionQuery, generics.ListAPIView):
         return super().get_queryset()
 
 
-class ViewAllStock(generics.ListAPIView):
+class ViewAllStock(RawLotBalanceQuery, generics.ListAPIView):
 
     serializer_class = ViewAllStockSerializer
 
     def get_queryset(self):
-        stock_array = get_all_raw_stock(self.request.branch)
-        d = defaultdict(lambda: defaultdict(int))
-
-        group_keys = [
-            "actual_gazaana",
-            "expected_gazaana",
-            "raw_product",
-            "warehouse",
-            "formula",
-        ]
-        sum_keys = ["quantity"]
-
-        for item in stock_array:
-            for key in sum_keys:
-                if item["nature"] == TransactionChoices.CREDIT:
-                    d[itemgetter(*group_keys)(item)][key] += item[key]
-                else:
-                    d[itemgetter(*group_keys)(item)][key] -= item[key]
-
-        stock = [{**dict(zip(group_keys, k)), **v} for k, v in d.items()]
-        return stock
+        return (
+            super()
+            .get_queryset()
+            .values(
+                "actual_gazaana",
+                "expected_gazaana",
+                "warehouse",
+                "formula",
+                raw_product=F("lot__raw_product"),
+            )
+            .order_by()
+            .annotate(quantity=Sum("quantity"))
+        )
 
 
 class TransferRawStockView(RawDebitQuery, generics.CreateAPIView):
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from authentication.models import Branch
+from cheques.utils import get_cheque_account
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from reports.models import BalanceSheetCheckpoint
+
+
+class Command(BaseCommand):
+    help = "Closes every month that ended before a date with a balance sheet checkpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument("branch", type=str)
+        parser.add_argument(
+            "-u",
+            "--until",
+            type=str,
+            help="Close the months that ended before this date (YYYY-MM-DD), defaults to today",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            branch = Branch.objects.get(name=options["branch"])
+        except Branch.DoesNotExist:
+            raise CommandError(f"Branch {options['branch']} does not exist")
+
+        until = (
+            datetime.strptime(options["until"], "%Y-%m-%d")
+            if options["until"]
+            else datetime.now()
+        )
+        with transaction.atomic():
+            checkpoints = BalanceSheetCheckpoint.close_periods(
+                branch, get_cheque_account(branch).account, until
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"{len(checkpoints)} periods closed for {branch.name}")
+        )
@@ -0,0 +1,111 @@
+from datetime import datetime
+
+from authentication.models import Branch
+from cheques.choices import ChequeStatusChoices
+from cheques.models import ExternalCheque
+from cheques.utils import get_cheque_account
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from essentials.models import AccountType, Person
+from essentials.utils import get_account_history_union
+from expenses.models import ExpenseDetail
+from ledgers.models import Ledger, LedgerAndDetail
+from payments.models import Payment
+from transactions.choices import TransactionSerialTypes
+from transactions.models import Transaction, TransactionDetail
+
+
+class Command(BaseCommand):
+    help = "Prints the EXPLAIN plans of the main report queries of a branch"
+
+    def add_arguments(self, parser):
+        parser.add_argument("branch", type=str)
+        parser.add_argument(
+            "-d",
+            "--date",
+            type=str,
+            help="Day the report queries are run for (YYYY-MM-DD), defaults to today",
+        )
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            dest="analyze",
+            default=False,
+            help="Run the queries and report the actual timings as well",
+        )
+
+    def get_queries(self, branch, start, end):
+        person = Person.objects.filter(branch=branch).first()
+        return {
+            "balance sheet ledgers": Ledger.objects.filter(branch=branch, date__lte=end)
+            .values("person", "nature")
+            .order_by()
+            .annotate(total=Sum("amount")),
+            "balance sheet inventory": TransactionDetail.objects.filter(
+                branch=branch, transaction__date__lte=end
+            )
+            .values("product", "transaction__serial_type")
+            .order_by()
+            .annotate(quantity=Sum("quantity")),
+            "person ledger": Ledger.objects.filter(
+                person=person, date__gte=start, date__lte=end
+            ).order_by("date", "time_stamp", "id"),
+            "daybook transactions": Transaction.objects.filter(
+                branch=branch, date__gte=start, date__lte=end
+            ),
+            "daybook payments": Payment.objects.filter(
+                branch=branch, date__gte=start, date__lte=end
+            ),
+            "daybook expenses": ExpenseDetail.objects.filter(
+                branch=branch, date__gte=start, date__lte=end
+            ),
+            "daybook ledger details": LedgerAndDetail.objects.filter(
+                ledger_entry__branch=branch,
+                ledger_entry__date__gte=start,
+                ledger_entry__date__lte=end,
+            ),
+            "pending cheques": ExternalCheque.objects.filter(
+                branch=branch, status=ChequeStatusChoices.PENDING, date__lte=end
+            )
+            .values("status")
+            .order_by()
+            .annotate(total=Sum("amount")),
+            "next invoice serial": Transaction.objects.filter(
+                branch=branch, serial_type=TransactionSerialTypes.INV
+            )
+            .order_by("-serial")
+            .values("serial")[:1],
+        }
+
+    def handle(self, *args, **options):
+        try:
+            branch = Branch.objects.get(name=options["branch"])
+        except Branch.DoesNotExist:
+            raise CommandError(f"Branch {options['branch']} does not exist")
+
+        date = (
+            datetime.strptime(options["date"], "%Y-%m-%d")
+            if options["date"]
+            else datetime.now()
+        )
+        start = date.replace(hour=0, minute=0, second=0, microsecond=0)
+        end = date.replace(hour=23, minute=59, second=59, microsecond=999999)
+        explain_options = {"analyze": True} if options["analyze"] else {}
+
+        for name, queryset in self.get_queries(branch, start, end).items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(queryset.explain(**explain_options))
+
+        account = AccountType.objects.filter(branch=branch).first()
+        if account is not None:
+            sql, params = get_account_history_union(
+                account, get_cheque_account(branch).account, {"date__lte": end}
+            )
+            self.stdout.write(self.style.MIGRATE_HEADING("account history"))
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"{connection.ops.explain_query_prefix(**explain_options)} {sql}",
+                    params,
+                )
+                self.stdout.write("\n".join(str(row[-1]) for row in cursor.fetchall()))
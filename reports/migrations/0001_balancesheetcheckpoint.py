@@ -0,0 +1,31 @@
+# Generated by Django 3.2.13 on 2026-10-18 17:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('authentication', '0009_alter_userbranchrelation_permissions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSheetCheckpoint',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateTimeField()),
+                ('cheque_account', models.UUIDField()),
+                ('figures', models.JSONField()),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balancesheetcheckpoint', to='authentication.branch')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('branch', 'date')},
+            },
+        ),
+    ]
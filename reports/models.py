@@ -1,3 +1,327 @@
+from calendar import monthrange
+from collections import defaultdict
+from datetime import timedelta
+
+from assets.models import Asset
+from authentication.models import BranchAwareModel
+from cheques.choices import PersonalChequeStatusChoices
+from cheques.models import ExternalChequeHistory, PersonalCheque
 from django.db import models
+from django.db.models import F, Q, Sum
+from essentials.choices import PersonChoices
+from essentials.models import AccountType, OpeningSaleData, Person
+from expenses.models import ExpenseDetail
+from ledgers.models import Ledger
+from transactions.choices import TransactionSerialTypes
+from transactions.models import Transaction, TransactionDetail
+
+
+class BalanceSheetCheckpoint(BranchAwareModel):
+    """
+    balance sheet figures of a branch accumulated till the end of a closed month
+    only the figures that add up over time are stored, the rest is read live
+    """
+
+    date = models.DateTimeField()
+    cheque_account = models.UUIDField()
+    figures = models.JSONField()
+
+    class Meta:
+        unique_together = ("branch", "date")
+        ordering = ["-date"]
+
+    @staticmethod
+    def get_empty_figures():
+        return {
+            "persons": {},
+            "products": {},
+            "equity": 0.0,
+            "cash_credit": 0.0,
+            "cash_debit": 0.0,
+            "expenses": 0.0,
+            "revenue": 0.0,
+            "purchases": 0.0,
+        }
+
+    @staticmethod
+    def get_month_end(date):
+        return date.replace(
+            day=monthrange(date.year, date.month)[1],
+            hour=23,
+            minute=59,
+            second=59,
+            microsecond=999999,
+        )
+
+    @classmethod
+    def get_period_figures(cls, branch, cheque_account, start=None, end=None):
+        """figures of entries dated after start and till end"""
+
+        def period(key):
+            date_filter = {}
+            if start:
+                date_filter.update({f"{key}__gt": start})
+            if end:
+                date_filter.update({f"{key}__lte": end})
+            return date_filter
+
+        figures = cls.get_empty_figures()
+
+        ledger = (
+            Ledger.objects.filter(branch=branch, **period("date"))
+            .values("person", "nature", person_type=F("person__person_type"))
+            .order_by()
+            .annotate(
+                total=Sum("amount"),
+                cash=Sum(
+                    "amount",
+                    filter=Q(account_type__isnull=False)
+                    & ~Q(account_type=cheque_account),
+                ),
+            )
+        )
+        for l in ledger:
+            amount = l["total"] if l["nature"] == "C" else -l["total"]
+            if l["person_type"] == PersonChoices.EQUITY:
+                figures["equity"] += amount
+            else:
+                person = str(l["person"])
+                figures["persons"][person] = figures["persons"].get(person, 0.0) + amount
+            if l["cash"]:
+                figures["cash_credit" if l["nature"] == "C" else "cash_debit"] += l[
+                    "cash"
+                ]
+
+        figures["cash_credit"] += (
+            ExternalChequeHistory.objects.filter(
+                return_cheque__isnull=True,
+                branch=branch,
+                **period("date"),
+            ).aggregate(total=Sum("amount"))["total"]
+            or 0
+        )
+        figures["cash_debit"] += (
+            PersonalCheque.objects.filter(
+                status=PersonalChequeStatusChoices.CLEARED,
+                branch=branch,
+                **period("date"),
+            ).aggregate(total=Sum("amount"))["total"]
+            or 0
+        )
+        figures["expenses"] = (
+            ExpenseDetail.objects.filter(branch=branch, **period("date")).aggregate(
+                total=Sum("amount")
+            )["total"]
+            or 0
+        )
+
+        details = (
+            TransactionDetail.objects.values(
+                "product", serial_type=F("transaction__serial_type")
+            )
+            .filter(branch=branch, **period("transaction__date"))
+            .order_by()
+            .annotate(
+                value=Sum(F("rate") * F("yards_per_piece") * F("quantity")),
+                gazaana=Sum(F("yards_per_piece") * F("quantity")),
+            )
+        )
+        for d in details:
+            product = figures["products"].setdefault(
+                str(d["product"]), {"value": 0.0, "gazaana": 0.0, "purchases": 0.0}
+            )
+            if d["serial_type"] == TransactionSerialTypes.SUP:
+                figures["purchases"] += d["value"]
+                product["value"] += d["value"]
+                product["gazaana"] += d["gazaana"]
+                product["purchases"] += d["gazaana"]
+            elif d["serial_type"] == TransactionSerialTypes.MWS:
+                figures["purchases"] -= d["value"]
+                product["value"] -= d["value"]
+                product["gazaana"] -= d["gazaana"]
+                product["purchases"] -= d["gazaana"]
+            elif d["serial_type"] == TransactionSerialTypes.INV:
+                figures["revenue"] += d["value"]
+                product["gazaana"] -= d["gazaana"]
+            elif d["serial_type"] == TransactionSerialTypes.MWC:
+                figures["revenue"] -= d["value"]
+                product["value"] += d["value"]
+                product["gazaana"] += d["gazaana"]
+                product["purchases"] += d["gazaana"]
+
+        discounts = (
+            Transaction.objects.filter(
+                branch=branch,
+                serial_type__in=[TransactionSerialTypes.INV, TransactionSerialTypes.MWC],
+                **period("date"),
+            )
+            .values("serial_type")
+            .order_by()
+            .annotate(total=Sum("discount"))
+        )
+        for d in discounts:
+            if d["serial_type"] == TransactionSerialTypes.INV:
+                figures["revenue"] -= d["total"] or 0
+            else:
+                figures["revenue"] += d["total"] or 0
+
+        return figures
+
+    @classmethod
+    def add_figures(cls, figures, delta):
+        """adds delta figures to figures in place"""
+        for key in [
+            "equity",
+            "cash_credit",
+            "cash_debit",
+            "expenses",
+            "revenue",
+            "purchases",
+        ]:
+            figures[key] += delta[key]
+        for person, amount in delta["persons"].items():
+            figures["persons"][person] = figures["persons"].get(person, 0.0) + amount
+        for product, values in delta["products"].items():
+            current = figures["products"].setdefault(
+                product, {"value": 0.0, "gazaana": 0.0, "purchases": 0.0}
+            )
+            for key, value in values.items():
+                current[key] += value
+        return figures
+
+    @classmethod
+    def get_figures(cls, branch, cheque_account, date):
+        """figures till date from the nearest checkpoint and the entries after it"""
+        checkpoint = cls.objects.filter(
+            branch=branch, cheque_account=cheque_account.id, date__lte=date
+        ).first()
+        if checkpoint is None:
+            return cls.get_period_figures(branch, cheque_account, None, date)
+        return cls.add_figures(
+            checkpoint.figures,
+            cls.get_period_figures(branch, cheque_account, checkpoint.date, date),
+        )
+
+    @classmethod
+    def close_periods(cls, branch, cheque_account, until):
+        """creates a checkpoint at the end of every month that ended before until"""
+        cls.objects.filter(branch=branch).exclude(
+            cheque_account=cheque_account.id
+        ).delete()
+        last = cls.objects.filter(branch=branch).first()
+        if last is not None:
+            start = last.date
+            figures = last.figures
+        else:
+            first_date = min(
+                [
+                    d
+                    for d in [
+                        Ledger.objects.filter(branch=branch).aggregate(
+                            date=models.Min("date")
+                        )["date"],
+                        Transaction.objects.filter(branch=branch).aggregate(
+                            date=models.Min("date")
+                        )["date"],
+                        ExpenseDetail.objects.filter(branch=branch).aggregate(
+                            date=models.Min("date")
+                        )["date"],
+                    ]
+                    if d is not None
+                ],
+                default=None,
+            )
+            if first_date is None:
+                return []
+            start = None
+            figures = cls.get_empty_figures()
+
+        checkpoints = []
+        month_end = cls.get_month_end(
+            (start + timedelta(microseconds=1)) if start else first_date
+        )
+        while month_end < until:
+            figures = cls.add_figures(
+                figures,
+                cls.get_period_figures(branch, cheque_account, start, month_end),
+            )
+            checkpoints.append(
+                cls.objects.create(
+                    branch=branch,
+                    date=month_end,
+                    cheque_account=cheque_account.id,
+                    figures=figures,
+                )
+            )
+            start = month_end
+            month_end = cls.get_month_end(month_end + timedelta(microseconds=1))
+        return checkpoints
+
+    @classmethod
+    def invalidate(cls, branch_id, date):
+        """entries dated into a closed month drop every checkpoint from that month on"""
+        if branch_id and date:
+            cls.objects.filter(branch_id=branch_id, date__gte=date).delete()
+
+    @classmethod
+    def get_balance_sheet(cls, branch, cheque_account, date):
+        figures = cls.get_figures(branch, cheque_account, date)
+
+        names = {
+            str(id): name
+            for id, name in Person.objects.filter(branch=branch).values_list("id", "name")
+        }
+        balances = defaultdict(float)
+        for person, amount in figures["persons"].items():
+            balances[names.get(person)] += amount
+        payable = 0
+        receivable = 0
+        for value in balances.values():
+            if value <= 0.0:
+                receivable += abs(value)
+            else:
+                payable += abs(value)
+
+        # opening stock alone, copied since valuations are shared through the memo
+        opening = (None, False)
+        products = defaultdict(lambda: {"value": 0.0, "gazaana": 0.0, "purchases": 0.0})
+        for product, values in TransactionDetail.get_inventory_valuation(
+            branch, [opening]
+        )[opening].items():
+            products[product] = {**values}
+
+        beginning_inventory = TransactionDetail.get_inventory_value(products)
+        for product, values in figures["products"].items():
+            for key, value in values.items():
+                products[product][key] += value
+        inventory = TransactionDetail.get_inventory_value(products)
+
+        account_balances = (
+            AccountType.objects.filter(branch=branch)
+            .exclude(id=cheque_account.id)
+            .aggregate(total=Sum("opening_balance"))["total"]
+            or 0
+        )
+        cogs = beginning_inventory + figures["purchases"] - inventory
+        gross_profit = figures["revenue"] - cogs
 
-# Create your models here.
+        return {
+            "assets": {
+                "receivable": receivable,
+                "inventory": inventory,
+                "cash_and_equivalent": (figures["cash_credit"] + account_balances)
+                - (figures["cash_debit"] + figures["expenses"]),
+                "assets": Asset.get_total_assets(branch, date),
+            },
+            "liabilities": {
+                "payable": payable,
+            },
+            "equity": {
+                "equity": figures["equity"]
+                + gross_profit
+                + Asset.get_total_asset_profit(branch, date)
+                + OpeningSaleData.get_opening_profit(branch, date)
+                - figures["expenses"],
+            },
+            "date": date,
+        }
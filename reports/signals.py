@@ -0,0 +1,43 @@
+from cheques.models import ExternalChequeHistory, PersonalCheque
+from core.signals import post_bulk_create, post_bulk_delete
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from expenses.models import ExpenseDetail
+from ledgers.models import Ledger
+from transactions.models import Transaction
+
+from .models import BalanceSheetCheckpoint
+
+DATED_MODELS = [Ledger, Transaction, PersonalCheque, ExternalChequeHistory, ExpenseDetail]
+
+
+def remember_previous_date(sender, instance, **kwargs):
+    """an entry moved out of a closed month changes that month as well"""
+    if not instance._state.adding:
+        instance._previous_date = (
+            sender.objects.filter(pk=instance.pk).values_list("date", flat=True).first()
+        )
+
+
+def invalidate_balance_sheet_checkpoints(sender, instance, **kwargs):
+    dates = [instance.date, getattr(instance, "_previous_date", None)]
+    BalanceSheetCheckpoint.invalidate(
+        instance.branch_id, min(d for d in dates if d is not None)
+    )
+
+
+def invalidate_balance_sheet_checkpoints_in_bulk(sender, instances, **kwargs):
+    dates = {}
+    for instance in instances:
+        if instance.branch_id not in dates or instance.date < dates[instance.branch_id]:
+            dates[instance.branch_id] = instance.date
+    for branch_id, date in dates.items():
+        BalanceSheetCheckpoint.invalidate(branch_id, date)
+
+
+for model in DATED_MODELS:
+    receiver(pre_save, sender=model)(remember_previous_date)
+    receiver(post_save, sender=model)(invalidate_balance_sheet_checkpoints)
+    receiver(post_delete, sender=model)(invalidate_balance_sheet_checkpoints)
+    receiver(post_bulk_create, sender=model)(invalidate_balance_sheet_checkpoints_in_bulk)
+    receiver(post_bulk_delete, sender=model)(invalidate_balance_sheet_checkpoints_in_bulk)
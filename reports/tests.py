@@ -1,3 +1,128 @@
+from authentication.models import Branch
+from core.tests import BranchTestMixin
 from django.test import TestCase
+from essentials.models import Product, ProductCategory, StockBalance, Warehouse
 
-# Create your tests here.
+
+class GetLowStockTest(BranchTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        p0, p1, _ = cls.products
+        StockBalance.apply_deltas(
+            {
+                (p0.id, cls.other_warehouse.id, 10.0): 3,
+                (p0.id, cls.warehouse.id, 5.0): 4,
+                (p1.id, cls.warehouse.id, 10.0): -998,
+            }
+        )
+        cls.stockless = Product.objects.create(name="stockless", category=cls.category)
+        other_branch = Branch.objects.create(name="other")
+        other_product = Product.objects.create(
+            name="other",
+            category=ProductCategory.objects.create(branch=other_branch, name="cloth"),
+        )
+        StockBalance.apply_deltas(
+            {
+                (
+                    other_product.id,
+                    Warehouse.objects.create(branch=other_branch, name="shop").id,
+                    10.0,
+                ): 1
+            }
+        )
+
+    def get_low_stock(self, **params):
+        response = self.client.get("/reports/get-low-stock/", {"treshold": 10, **params})
+        self.assertEqual(response.status_code, 200)
+        return sorted(
+            tuple((key, str(value)) for key, value in sorted(row.items()))
+            for row in response.data
+        )
+
+    def rows(self, *rows):
+        return sorted(
+            tuple(
+                (key, str(getattr(value, "id", value)))
+                for key, value in sorted(row.items())
+            )
+            for row in rows
+        )
+
+    def test_groupings(self):
+        p0, p1, _ = self.products
+        shop, godown = self.warehouse, self.other_warehouse
+        stockless = {"product": self.stockless}
+        for params, expected in [
+            (
+                {},
+                [
+                    {
+                        "product": p0,
+                        "warehouse": godown,
+                        "yards_per_piece": 10.0,
+                        "quantity": 3.0,
+                    },
+                    {
+                        "product": p0,
+                        "warehouse": shop,
+                        "yards_per_piece": 5.0,
+                        "quantity": 4.0,
+                    },
+                    {
+                        "product": p1,
+                        "warehouse": shop,
+                        "yards_per_piece": 10.0,
+                        "quantity": 2.0,
+                    },
+                    stockless,
+                ],
+            ),
+            (
+                {"ignoreGazaana": "true"},
+                [
+                    {"product": p0, "warehouse": godown, "quantity": 3.0},
+                    {"product": p1, "warehouse": shop, "quantity": 2.0},
+                    stockless,
+                ],
+            ),
+            (
+                {"ignoreWarehouse": "true"},
+                [
+                    {"product": p0, "yards_per_piece": 5.0, "quantity": 4.0},
+                    {"product": p1, "yards_per_piece": 10.0, "quantity": 2.0},
+                    stockless,
+                ],
+            ),
+            (
+                {"ignoreGazaana": "true", "ignoreWarehouse": "true"},
+                [{"product": p1, "quantity": 2.0}, stockless],
+            ),
+        ]:
+            with self.subTest(**params):
+                self.assertEqual(self.get_low_stock(**params), self.rows(*expected))
+
+    def test_warehouse(self):
+        """products without stock in the warehouse come along as rows of their own"""
+        p0, p1, p2 = self.products
+        self.assertEqual(
+            self.get_low_stock(warehouse=self.other_warehouse.id),
+            self.rows(
+                {
+                    "product": p0,
+                    "warehouse": self.other_warehouse,
+                    "yards_per_piece": 10.0,
+                    "quantity": 3.0,
+                },
+                {"product": p1},
+                {"product": p2},
+                {"product": self.stockless},
+            ),
+        )
+
+    def test_other_branches_are_left_out(self):
+        other = Product.objects.get(name="other")
+        self.assertNotIn(
+            str(other.id),
+            {value for row in self.get_low_stock() for key, value in row},
+        )
@@ -1,6 +1,6 @@
 from collections import defaultdict
 
-from django.db.models import Avg, Count, Max, Min, Sum
+from django.db.models import Avg, Count, F, Max, Min, Sum
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -8,13 +8,17 @@ from rest_framework.views import APIView
 import authentication.constants as PERMISSIONS
 from assets.models import Asset
 from authentication.mixins import CheckPermissionsMixin
+from cheques.utils import get_cheque_account
+from core.pagination import PaginationHandlerMixin, StandardPagination
 from core.utils import check_permission, convert_date_to_datetime, convert_qp_dict_to_qp
-from essentials.models import OpeningSaleData, Product
+from essentials.models import OpeningSaleData, StockBalance
 from expenses.models import ExpenseDetail
-from ledgers.models import Ledger
+from ledgers.models import PersonBalance
 from transactions.choices import TransactionSerialTypes
 from transactions.models import Transaction, TransactionDetail
 
+from .models import BalanceSheetCheckpoint
+
 
 class BalanceSheet(CheckPermissionsMixin, APIView):
     """Balance sheet with date"""
@@ -25,35 +29,10 @@ class BalanceSheet(CheckPermissionsMixin, APIView):
         branch = request.branch
         date = convert_date_to_datetime(request.query_params.get("date"))
         date = date.replace(hour=23, minute=59, second=59, microsecond=999999)
-        pay_recv = Ledger.get_account_payable_receivable(branch, date)
-        account_balances = Ledger.get_total_account_balance(branch, date, True)
-
-        revenue = TransactionDetail.calculate_total_revenue(branch, None, date)
-        cogs = TransactionDetail.calculate_cogs(branch, None, date)
-        inventory = TransactionDetail.calculate_previous_inventory(branch, date, True)
-        gross_profit = revenue - cogs
-
         return Response(
-            {
-                "assets": {
-                    "receivable": pay_recv["receivable"],
-                    "inventory": inventory,
-                    "cash_and_equivalent": account_balances["credit"]
-                    - account_balances["debit"],
-                    "assets": Asset.get_total_assets(branch, date),
-                },
-                "liabilities": {
-                    "payable": pay_recv["payable"],
-                },
-                "equity": {
-                    "equity": Ledger.get_total_owners_equity(branch, date)
-                    + gross_profit
-                    + Asset.get_total_asset_profit(branch, date)
-                    + OpeningSaleData.get_opening_profit(branch, date)
-                    - ExpenseDetail.calculate_total_expenses(branch, None, date),
-                },
-                "date": date,
-            },
+            BalanceSheetCheckpoint.get_balance_sheet(
+                branch, get_cheque_account(branch).account, date
+            ),
             200,
         )
 
@@ -103,9 +82,9 @@ class IncomeStatement(CheckPermissionsMixin, APIView):
         return Response(final_data, status=status.HTTP_200_OK)
 
 
-class GetAllBalances(CheckPermissionsMixin, APIView):
+class GetAllBalances(CheckPermissionsMixin, APIView, PaginationHandlerMixin):
     """
-    Get balances with filters
+    Get balances of persons filtered, sorted and paginated by the database
     """
 
     permissions = {
@@ -114,75 +93,51 @@ class GetAllBalances(CheckPermissionsMixin, APIView):
             PERMISSIONS.CAN_VIEW_FULL_BALANCES,
         ]
     }
+    pagination_class = StandardPagination
 
     def get(self, request):
-        filters = {"person__branch": request.branch}
+        qp = request.query_params
+        filters = {}
 
-        if request.query_params.get("person_type"):
-            filters.update(
-                {"person__person_type": request.query_params.get("person_type")}
-            )
-        if request.query_params.get("person_id"):
-            filters.update({"person": request.query_params.get("person_id")})
-        if request.query_params.get("date__lte"):
-            filters.update({"date__lte": request.query_params.get("date__lte")})
+        if qp.get("person_type"):
+            filters.update({"person_type": qp.get("person_type")})
+        if qp.get("person_id"):
+            filters.update({"id": qp.get("person_id")})
         if not check_permission(request, PERMISSIONS.CAN_VIEW_FULL_BALANCES):
-            filters.update({"person__person_type": "C"})
+            filters.update({"person_type": "C"})
 
-        balances = (
-            Ledger.objects.filter(**filters)
-            .values("nature", "person")
-            .order_by("nature")
-            .annotate(balance=Sum("amount"))
+        balances = PersonBalance.get_balances(
+            request.branch, qp.get("date__lte"), **filters
         )
 
-        data = defaultdict(float)
-        for b in balances:
-            name = str(b["person"])
-            amount = b["balance"]
-            nature = b["nature"]
-            if nature == "C":
-                data[name] = data[name] + amount
-            else:
-                data[name] = data[name] - amount
-
-        balance_gte = request.query_params.get("balance__gte")
-        balance_lte = request.query_params.get("balance__lte")
-        balance_nature = request.query_params.get("balance_nature")
-
-        if balance_gte or balance_lte:
-            if not balance_nature:
-                return Response(
-                    {"error": "Please choose a balance nature"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            final_balances = {}
-            if balance_gte:
-                target_balance = float(balance_gte)
-                for person, balance in data.items():
-                    curr_balance = abs(balance) if balance_nature == "D" else balance
-                    if curr_balance >= target_balance:
-                        final_balances[person] = balance
-            if balance_lte:
-                target_balance = float(balance_lte)
-                for person, balance in data.items():
-                    curr_balance = abs(balance) if balance_nature == "D" else balance
-                    if curr_balance <= target_balance:
-                        final_balances[person] = balance
-
-            return Response(final_balances, status=status.HTTP_200_OK)
+        balance_gte = qp.get("balance__gte")
+        balance_lte = qp.get("balance__lte")
+        balance_nature = qp.get("balance_nature")
+
+        if (balance_gte or balance_lte) and not balance_nature:
+            return Response(
+                {"error": "Please choose a balance nature"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if balance_nature == "C":
+            balances = balances.filter(balance__gte=0.0)
         elif balance_nature:
-            final_balances = {}
-            for person, balance in data.items():
-                if balance_nature == "C":
-                    if balance >= 0.0:
-                        final_balances[person] = balance
-                else:
-                    if balance < 0.0:
-                        final_balances[person] = balance
-            return Response(final_balances, status=status.HTTP_200_OK)
+            # debit balances are negative and compared by their size
+            balances = balances.filter(balance__lt=0.0)
+            balance_gte, balance_lte = (
+                balance_lte and -float(balance_lte),
+                balance_gte and -float(balance_gte),
+            )
+        if balance_gte:
+            balances = balances.filter(balance__gte=float(balance_gte))
+        if balance_lte:
+            balances = balances.filter(balance__lte=float(balance_lte))
 
-        return Response(data, status=status.HTTP_200_OK)
+        balances = balances.order_by(
+            "-balance" if qp.get("ordering") == "-balance" else "balance", "id"
+        ).values("balance", person=F("id"))
+        page = self.paginate_queryset(balances)
+        return self.get_paginated_response(page)
 
 
 class GetLowStock(CheckPermissionsMixin, APIView):
@@ -191,95 +146,16 @@ class GetLowStock(CheckPermissionsMixin, APIView):
     permissions = [PERMISSIONS.CAN_VIEW_LOW_STOCK]
 
     def get(self, request, *args, **kwargs):
-        branch = request.branch
-        category_filter = {}
-        is_gazaana_ignored = False
-        treshold = request.query_params.get("treshold", 0)
-        if request.query_params.get("category"):
-            category_filter = {"category": request.query_params.get("category")}
-
-        products = Product.objects.filter(**category_filter)
-        all_stock = Transaction.get_all_stock(branch, None)
-        # all_stock = list(filter(lambda x: x["quantity"] <= float(treshold), all_stock))
-        if request.query_params.get("warehouse"):
-            all_stock = list(
-                filter(
-                    lambda x: str(x["warehouse"])
-                    == str(request.query_params.get("warehouse")),
-                    all_stock,
-                )
-            )
-
-        filtered_all_stock = (
-            []
-        )  # only those products' stock that are in Product queryset
-        for p in products:
-            stock_prod = list(
-                filter(lambda x: str(x["product"]) == str(p.id), all_stock)
-            )
-            if len(stock_prod):
-                filtered_all_stock.extend(stock_prod)
-
-        additional_stock = []
-        for p in products:
-            if not any(s["product"] == str(p.id) for s in all_stock):
-                additional_stock.append({"product": p.id})
-
-        if request.query_params.get("ignoreGazaana"):
-            is_gazaana_ignored = True
-            combined_gazaana_stock = defaultdict(float)
-            for f in filtered_all_stock:
-                key = f["product"] + "|" + f["warehouse"]
-                combined_gazaana_stock[key] = (
-                    combined_gazaana_stock[key] + f["quantity"]
-                )
-
-            new_combined_stock = []
-            for key, value in combined_gazaana_stock.items():
-                [product, warehouse] = key.split("|")
-                new_combined_stock.append(
-                    {"product": product, "warehouse": warehouse, "quantity": value}
-                )
-
-            filtered_all_stock = new_combined_stock
-
-        if request.query_params.get("ignoreWarehouse"):
-            combined_warehouse_stock = defaultdict(float)
-            if not is_gazaana_ignored:
-                for f in filtered_all_stock:
-                    key = f"{f['product']}|{f['yards_per_piece']}"
-                    combined_warehouse_stock[key] = (
-                        combined_warehouse_stock[key] + f["quantity"]
-                    )
-                new_combined_stock = []
-                for key, value in combined_warehouse_stock.items():
-                    [product, yards_per_piece] = key.split("|")
-                    new_combined_stock.append(
-                        {
-                            "product": product,
-                            "yards_per_piece": yards_per_piece,
-                            "quantity": value,
-                        }
-                    )
-            else:
-                for f in filtered_all_stock:
-                    key = f["product"]
-                    combined_warehouse_stock[key] = (
-                        combined_warehouse_stock[key] + f["quantity"]
-                    )
-
-                new_combined_stock = []
-                for key, value in combined_warehouse_stock.items():
-                    new_combined_stock.append({"product": key, "quantity": value})
-
-            filtered_all_stock = new_combined_stock
-
-        # now check the treshold of the filtered products
-        all_stock = list(
-            filter(lambda x: x["quantity"] <= float(treshold), filtered_all_stock)
+        qp = request.query_params
+        low_stock = StockBalance.get_low_stock(
+            request.branch,
+            float(qp.get("treshold", 0)),
+            category=qp.get("category"),
+            warehouse=qp.get("warehouse"),
+            ignore_gazaana=bool(qp.get("ignoreGazaana")),
+            ignore_warehouse=bool(qp.get("ignoreWarehouse")),
         )
-
-        return Response([*all_stock, *additional_stock], status=status.HTTP_200_OK)
+        return Response(low_stock, status=status.HTTP_200_OK)
 
 
 class ProductPerformanceHistory(CheckPermissionsMixin, APIView):
@@ -292,7 +168,7 @@ class ProductPerformanceHistory(CheckPermissionsMixin, APIView):
 
     def get(self, request):
         filters = {
-            "transaction__person__branch": request.branch,
+            "branch": request.branch,
             # "transaction__serial_type": TransactionSerialTypes.INV,
         }
         values = ["product__name", "transaction__serial_type", "yards_per_piece"]
@@ -1,9 +1,10 @@
 from django.contrib import admin
+from ledgers.admin import LedgerEntriesAdmin
 
 from .models import StockTransfer, StockTransferDetail, Transaction, TransactionDetail
 
 
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(LedgerEntriesAdmin):
     list_display = ["id", "date", "serial_type", "serial"]
     list_filter = ["person__branch__name"]
 
@@ -18,3 +18,13 @@ class TransactionSerialTypes(models.TextChoices):
     SUP = "SUP", "Purchase"
     MWS = "MWS", "Maal Wapsi Supplier"
     MWC = "MWC", "Maal Wapsi Customer"
+
+
+class StockMovementTypes(models.TextChoices):
+    OPENING = "O", "Opening Stock"
+    INV = "INV", "Sale Invoice"
+    SUP = "SUP", "Purchase"
+    MWS = "MWS", "Maal Wapsi Supplier"
+    MWC = "MWC", "Maal Wapsi Customer"
+    TRANSFER_IN = "TI", "Transfer In"
+    TRANSFER_OUT = "TO", "Transfer Out"
@@ -0,0 +1,13 @@
+from transactions.utils import inventory_memo_scope
+
+
+class InventoryMemoMiddleware:
+    """Memoizing inventory valuations for the duration of a request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with inventory_memo_scope():
+            response = self.get_response(request)
+        return response
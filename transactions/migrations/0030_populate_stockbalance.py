@@ -0,0 +1,66 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import F, Sum
+
+
+def populate_stock_balance(apps, schema_editor):
+    Stock = apps.get_model("essentials", "Stock")
+    StockBalance = apps.get_model("essentials", "StockBalance")
+    TransactionDetail = apps.get_model("transactions", "TransactionDetail")
+    StockTransferDetail = apps.get_model("transactions", "StockTransferDetail")
+
+    balances = defaultdict(float)
+    for s in Stock.objects.values(
+        "product", "warehouse", "yards_per_piece"
+    ).annotate(quantity=Sum("opening_stock")):
+        balances[(s["product"], s["warehouse"], s["yards_per_piece"])] += s["quantity"]
+
+    for t in (
+        TransactionDetail.objects.filter(warehouse__isnull=False)
+        .values("product", "warehouse", "yards_per_piece", "transaction__nature")
+        .annotate(quantity=Sum("quantity"))
+    ):
+        key = (t["product"], t["warehouse"], t["yards_per_piece"])
+        if t["transaction__nature"] == "C":
+            balances[key] += t["quantity"]
+        else:
+            balances[key] -= t["quantity"]
+
+    for t in StockTransferDetail.objects.values(
+        "product",
+        "yards_per_piece",
+        "to_warehouse",
+        from_warehouse=F("transfer__from_warehouse"),
+    ).annotate(quantity=Sum("quantity")):
+        balances[(t["product"], t["to_warehouse"], t["yards_per_piece"])] += t[
+            "quantity"
+        ]
+        balances[(t["product"], t["from_warehouse"], t["yards_per_piece"])] -= t[
+            "quantity"
+        ]
+
+    StockBalance.objects.bulk_create(
+        [
+            StockBalance(
+                product_id=product,
+                warehouse_id=warehouse,
+                yards_per_piece=yards_per_piece,
+                quantity=quantity,
+            )
+            for (product, warehouse, yards_per_piece), quantity in balances.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("essentials", "0030_stockbalance"),
+        ("transactions", "0029_transaction_is_cancelled"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_stock_balance, migrations.RunPython.noop),
+    ]
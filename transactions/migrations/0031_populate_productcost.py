@@ -0,0 +1,50 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import F, Sum
+
+
+def populate_product_cost(apps, schema_editor):
+    Stock = apps.get_model("essentials", "Stock")
+    ProductCost = apps.get_model("essentials", "ProductCost")
+    TransactionDetail = apps.get_model("transactions", "TransactionDetail")
+
+    costs = defaultdict(lambda: [0.0, 0.0])
+    for s in Stock.objects.values("product").annotate(
+        gazaana=Sum(F("yards_per_piece") * F("opening_stock")),
+        value=Sum(F("yards_per_piece") * F("opening_stock") * F("opening_stock_rate")),
+    ):
+        costs[s["product"]][0] += s["value"]
+        costs[s["product"]][1] += s["gazaana"]
+
+    for t in (
+        TransactionDetail.objects.filter(transaction__serial_type__in=["SUP", "MWS", "MWC"])
+        .values("product", serial_type=F("transaction__serial_type"))
+        .annotate(
+            gazaana=Sum(F("yards_per_piece") * F("quantity")),
+            value=Sum(F("rate") * F("yards_per_piece") * F("quantity")),
+        )
+    ):
+        direction = -1 if t["serial_type"] == "MWS" else 1
+        costs[t["product"]][0] += direction * t["value"]
+        costs[t["product"]][1] += direction * t["gazaana"]
+
+    ProductCost.objects.bulk_create(
+        [
+            ProductCost(product_id=product, value=value, purchases=purchases)
+            for product, (value, purchases) in costs.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("essentials", "0031_productcost"),
+        ("transactions", "0030_populate_stockbalance"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_product_cost, migrations.RunPython.noop),
+    ]
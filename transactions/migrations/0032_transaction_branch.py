@@ -0,0 +1,37 @@
+# Generated by Django 3.2.13 on 2026-10-18 18:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_alter_userbranchrelation_permissions'),
+        ('transactions', '0031_populate_productcost'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='branch',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='transaction', to='authentication.branch'),
+        ),
+        migrations.AddField(
+            model_name='transactiondetail',
+            name='branch',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='transactiondetail', to='authentication.branch'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['branch', 'date'], name='transaction_branch__d4206a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['branch', 'serial_type', 'serial'], name='transaction_branch__070b3c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transactiondetail',
+            index=models.Index(fields=['branch', 'product'], name='transaction_branch__7fa4e5_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate_branch(apps, schema_editor):
+    Transaction = apps.get_model("transactions", "Transaction")
+    TransactionDetail = apps.get_model("transactions", "TransactionDetail")
+    Person = apps.get_model("essentials", "Person")
+
+    Transaction.objects.update(
+        branch=Subquery(
+            Person.objects.filter(id=OuterRef("person")).values("branch")[:1]
+        )
+    )
+    TransactionDetail.objects.update(
+        branch=Subquery(
+            Transaction.objects.filter(id=OuterRef("transaction")).values("branch")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0032_transaction_branch"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_branch, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.13 on 2026-10-18 18:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_alter_userbranchrelation_permissions'),
+        ('transactions', '0033_populate_transaction_branch'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='branch',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction', to='authentication.branch'),
+        ),
+        migrations.AlterField(
+            model_name='transactiondetail',
+            name='branch',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactiondetail', to='authentication.branch'),
+        ),
+    ]
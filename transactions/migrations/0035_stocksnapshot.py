@@ -0,0 +1,32 @@
+# Generated by Django 3.2.13 on 2026-10-18 18:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0011_populate_serialsequence'),
+        ('essentials', '0033_populate_accountbalance'),
+        ('transactions', '0034_alter_transaction_branch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('yards_per_piece', models.FloatField()),
+                ('quantity', models.FloatField()),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stocksnapshot', to='authentication.branch')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='essentials.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='essentials.warehouse')),
+            ],
+            options={
+                'unique_together': {('branch', 'date', 'product', 'warehouse', 'yards_per_piece')},
+            },
+        ),
+    ]
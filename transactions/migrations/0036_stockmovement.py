@@ -0,0 +1,41 @@
+# Generated by Django 3.2.13 on 2026-10-18 18:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0011_populate_serialsequence'),
+        ('essentials', '0033_populate_accountbalance'),
+        ('transactions', '0035_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateTimeField()),
+                ('movement_type', models.CharField(choices=[('O', 'Opening Stock'), ('INV', 'Sale Invoice'), ('SUP', 'Purchase'), ('MWS', 'Maal Wapsi Supplier'), ('MWC', 'Maal Wapsi Customer'), ('TI', 'Transfer In'), ('TO', 'Transfer Out')], max_length=3)),
+                ('yards_per_piece', models.FloatField()),
+                ('quantity', models.FloatField()),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stockmovement', to='authentication.branch')),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='essentials.product')),
+                ('stock', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='essentials.stock')),
+                ('transaction_detail', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='transactions.transactiondetail')),
+                ('transfer_detail', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='transactions.stocktransferdetail')),
+                ('warehouse', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='essentials.warehouse')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['product', 'warehouse', 'date'], name='transaction_product_fab795_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['branch', 'date'], name='transaction_branch__04dba9_idx'),
+        ),
+    ]
@@ -0,0 +1,94 @@
+from datetime import datetime
+
+from django.db import migrations
+from django.db.models import F
+
+
+def populate_stock_movements(apps, schema_editor):
+    StockMovement = apps.get_model("transactions", "StockMovement")
+    Stock = apps.get_model("essentials", "Stock")
+    TransactionDetail = apps.get_model("transactions", "TransactionDetail")
+    StockTransferDetail = apps.get_model("transactions", "StockTransferDetail")
+
+    movements = []
+    for s in Stock.objects.values(
+        "id",
+        "product",
+        "warehouse",
+        "yards_per_piece",
+        "opening_stock",
+        branch=F("warehouse__branch"),
+    ):
+        movements.append(
+            StockMovement(
+                branch_id=s["branch"],
+                date=datetime(1, 1, 1),
+                movement_type="O",
+                product_id=s["product"],
+                warehouse_id=s["warehouse"],
+                yards_per_piece=s["yards_per_piece"],
+                quantity=s["opening_stock"],
+                stock_id=s["id"],
+            )
+        )
+    for d in TransactionDetail.objects.values(
+        "id",
+        "branch",
+        "product",
+        "warehouse",
+        "yards_per_piece",
+        "quantity",
+        date=F("transaction__date"),
+        nature=F("transaction__nature"),
+        serial_type=F("transaction__serial_type"),
+    ).iterator():
+        movements.append(
+            StockMovement(
+                branch_id=d["branch"],
+                date=d["date"],
+                movement_type=d["serial_type"],
+                product_id=d["product"],
+                warehouse_id=d["warehouse"],
+                yards_per_piece=d["yards_per_piece"],
+                quantity=d["quantity"] if d["nature"] == "C" else -d["quantity"],
+                transaction_detail_id=d["id"],
+            )
+        )
+    for d in StockTransferDetail.objects.values(
+        "id",
+        "product",
+        "to_warehouse",
+        "yards_per_piece",
+        "quantity",
+        date=F("transfer__date"),
+        from_warehouse=F("transfer__from_warehouse"),
+        branch=F("transfer__from_warehouse__branch"),
+    ).iterator():
+        for movement_type, warehouse, quantity in [
+            ("TO", d["from_warehouse"], -d["quantity"]),
+            ("TI", d["to_warehouse"], d["quantity"]),
+        ]:
+            movements.append(
+                StockMovement(
+                    branch_id=d["branch"],
+                    date=d["date"],
+                    movement_type=movement_type,
+                    product_id=d["product"],
+                    warehouse_id=warehouse,
+                    yards_per_piece=d["yards_per_piece"],
+                    quantity=quantity,
+                    transfer_detail_id=d["id"],
+                )
+            )
+    StockMovement.objects.bulk_create(movements, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0036_stockmovement"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_stock_movements, migrations.RunPython.noop),
+    ]
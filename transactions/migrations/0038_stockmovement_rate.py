@@ -0,0 +1,25 @@
+# Generated by Django 3.2.13 on 2026-10-18 18:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('essentials', '0033_populate_accountbalance'),
+        ('transactions', '0037_populate_stockmovement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockmovement',
+            name='rate',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='warehouse',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='essentials.warehouse'),
+        ),
+    ]
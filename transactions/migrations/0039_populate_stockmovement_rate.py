@@ -0,0 +1,32 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate_stock_movement_rates(apps, schema_editor):
+    StockMovement = apps.get_model("transactions", "StockMovement")
+    Stock = apps.get_model("essentials", "Stock")
+    TransactionDetail = apps.get_model("transactions", "TransactionDetail")
+
+    StockMovement.objects.filter(transaction_detail__isnull=False).update(
+        rate=Subquery(
+            TransactionDetail.objects.filter(id=OuterRef("transaction_detail")).values(
+                "rate"
+            )[:1]
+        )
+    )
+    StockMovement.objects.filter(stock__isnull=False).update(
+        rate=Subquery(
+            Stock.objects.filter(id=OuterRef("stock")).values("opening_stock_rate")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0038_stockmovement_rate"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_stock_movement_rates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.13 on 2026-10-18 19:11
+
+from datetime import datetime
+
+from django.db import migrations, models
+
+
+def clear_opening_stock_dates(apps, schema_editor):
+    StockMovement = apps.get_model("transactions", "StockMovement")
+    StockMovement.objects.filter(movement_type="O").update(date=None)
+
+
+def restore_opening_stock_dates(apps, schema_editor):
+    StockMovement = apps.get_model("transactions", "StockMovement")
+    StockMovement.objects.filter(movement_type="O").update(date=datetime(1, 1, 1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0039_populate_stockmovement_rate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='date',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(clear_opening_stock_dates, restore_opening_stock_dates),
+    ]
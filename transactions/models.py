@@ -1,24 +1,66 @@
-from collections import defaultdict
-from datetime import datetime
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
 from math import inf
+from uuid import UUID
 
 # from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import F, Q, Sum
+from django.db import connection, models
+from django.db.models import Case, F, FloatField, Max, Q, Sum, When, Window
 from rest_framework.serializers import ValidationError
 
-from authentication.models import UserAwareModel
+from authentication.models import BranchAwareModel, BranchScopedModel, UserAwareModel
 from core.constants import MIN_POSITIVE_VAL_SMALL
-from core.models import ID, DateTimeAwareModel, NextSerial
-from essentials.models import AccountType, Person, Product, Stock, Warehouse
-from ledgers.models import Ledger
+from core.models import ID, DateTimeAwareModel, NextSerial, UnitOfWork
+from core.signals import bulk_create, bulk_delete
+from core.utils import get_cheque_account
+from essentials.choices import PersonChoices
+from essentials.models import (
+    AccountType,
+    Person,
+    Product,
+    ProductCost,
+    Stock,
+    StockBalance,
+    Warehouse,
+)
+from ledgers.models import Ledger, LedgerAndPayment, LedgerAndTransaction
 from payments.models import Payment
 
-from .choices import TransactionChoices, TransactionSerialTypes, TransactionTypes
-
-
-class Transaction(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
+from .choices import (
+    StockMovementTypes,
+    TransactionChoices,
+    TransactionSerialTypes,
+    TransactionTypes,
+)
+from .utils import inventory_memo
+
+# serial types of the transactions made with suppliers
+SUPPLIER_SERIAL_TYPES = [TransactionSerialTypes.SUP, TransactionSerialTypes.MWS]
+
+# nature and type of the imported transactions of every serial type
+SERIAL_TYPE_NATURES = {
+    TransactionSerialTypes.INV: TransactionChoices.DEBIT,
+    TransactionSerialTypes.SUP: TransactionChoices.CREDIT,
+    TransactionSerialTypes.MWS: TransactionChoices.DEBIT,
+    TransactionSerialTypes.MWC: TransactionChoices.CREDIT,
+}
+SERIAL_TYPE_TYPES = {
+    TransactionSerialTypes.INV: TransactionTypes.CREDIT,
+    TransactionSerialTypes.SUP: TransactionTypes.PURCHASE,
+    TransactionSerialTypes.MWS: TransactionTypes.MAAL_WAPSI,
+    TransactionSerialTypes.MWC: TransactionTypes.MAAL_WAPSI,
+}
+
+# serial types that change the average cost of a product
+COST_SERIAL_TYPES = [
+    TransactionSerialTypes.SUP,
+    TransactionSerialTypes.MWS,
+    TransactionSerialTypes.MWC,
+]
+
+
+class Transaction(ID, BranchScopedModel, UserAwareModel, DateTimeAwareModel, NextSerial):
     nature = models.CharField(max_length=1, choices=TransactionChoices.choices)
     discount = models.FloatField(validators=[MinValueValidator(0.0)], default=0.0)
     person = models.ForeignKey(Person, on_delete=models.CASCADE)
@@ -36,8 +78,14 @@ class Transaction(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
     builty = models.CharField(max_length=100, null=True, default=None, blank=True)
     is_cancelled = models.BooleanField(default=False)
 
+    serial_key = "serial_type"
+
     class Meta:
         ordering = ["serial"]
+        indexes = [
+            models.Index(fields=["branch", "date"]),
+            models.Index(fields=["branch", "serial_type", "serial"]),
+        ]
 
     def get_computer_serial(self):
         return f"{self.serial_type}-{self.serial}"
@@ -48,20 +96,72 @@ class Transaction(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
     @classmethod
     def check_average_selling_rates(cls, date, t_detail, branch):
         """check if selling rate is more than buying"""
-        date = date if date else datetime.now()
-        inventory = TransactionDetail.calculate_previous_inventory(
-            branch, date, True, return_list=True
+        cls.check_selling_rates([(date, t_detail, "")])
+
+    @classmethod
+    def check_selling_rates(cls, sales, purchases=()):
+        """
+        check the selling rates of sales of (date, details, error prefix) in two
+        queries, purchases are unsaved details with their serial type and date that
+        count towards the cost of the sales on or after their day
+        """
+        sales = [
+            (
+                (date if date else datetime.now()).replace(
+                    hour=23, minute=59, second=59, microsecond=99999
+                ),
+                details,
+                prefix,
+            )
+            for date, details, prefix in sales
+        ]
+        products = {d["product"].id for _, details, _ in sales for d in details}
+        if not products:
+            return
+        costs = {
+            str(cost.product_id): (cost.value, cost.purchases)
+            for cost in ProductCost.objects.filter(product__in=products)
+        }
+
+        # purchases and returns after the day of the sale do not count towards its cost
+        later = list(
+            TransactionDetail.objects.filter(
+                product__in=products,
+                transaction__serial_type__in=COST_SERIAL_TYPES,
+                transaction__date__gt=min(end for end, _, _ in sales),
+            ).values(
+                "product",
+                "rate",
+                "yards_per_piece",
+                "quantity",
+                serial_type=F("transaction__serial_type"),
+                date=F("transaction__date"),
+            )
         )
-        for d in t_detail:
-            curr = inventory[str(d["product"].id)]
-            if curr["purchases"] == 0:
-                raise ValidationError(f"Low stock for {d['product']}", 400)
-            rate = curr["value"] / curr["purchases"] if curr["purchases"] else inf
-            if d["rate"] < rate:
-                raise ValidationError(f"Rate too low for {d['product']}", 400)
+        for end, details, prefix in sales:
+            inventory = defaultdict(lambda: {"value": 0.0, "purchases": 0.0})
+            for product, (value, purchased) in costs.items():
+                inventory[product] = {"value": value, "purchases": purchased}
+            deltas = Transaction.get_cost_deltas(
+                None, [d for d in later if d["date"] > end], -1
+            )
+            Transaction.get_cost_deltas(
+                None, [d for d in purchases if d["date"] <= end], deltas=deltas
+            )
+            for product, (value, purchased) in deltas.items():
+                inventory[str(product)]["value"] += value
+                inventory[str(product)]["purchases"] += purchased
+
+            for d in details:
+                curr = inventory[str(d["product"].id)]
+                if abs(curr["purchases"]) < MIN_POSITIVE_VAL_SMALL:
+                    raise ValidationError(f"{prefix}Low stock for {d['product']}", 400)
+                rate = curr["value"] / curr["purchases"] if curr["purchases"] else inf
+                if d["rate"] < rate:
+                    raise ValidationError(f"{prefix}Rate too low for {d['product']}", 400)
 
     @classmethod
-    def get_all_stock(cls, branch, date, t_new=None, t_old=None, **kwargs):
+    def get_all_stock(cls, branch, date, **kwargs):
         """complete current stock, accepts kwrags for filtering transaction detail"""
         date = date if date else datetime.now()
         opening = Stock.objects.values(
@@ -119,40 +219,18 @@ class Transaction(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
                     **product,
                 }
             )
-        if t_old and t_new:
-            stock_raw = (
-                TransactionDetail.objects.values(
-                    "product", "warehouse", "yards_per_piece", "transaction__nature"
-                )
-                .filter(transaction__branch=branch, transaction__date__lte=date, **kwargs)
-                .exclude(transaction=t_old)
-                .annotate(quantity=Sum("quantity"))
+        stock_raw = (
+            TransactionDetail.objects.values(
+                "product", "warehouse", "yards_per_piece", "transaction__nature"
             )
-            new_detail_array = []
-            for new_det in t_new["transaction_detail"]:
-                new_detail_array.append(
-                    {
-                        "quantity": new_det["quantity"],
-                        "product": new_det["product"].id,
-                        "warehouse": new_det["warehouse"].id,
-                        "yards_per_piece": new_det["yards_per_piece"],
-                        "transaction__nature": t_new["nature"],
-                    }
-                )
-            stock_raw = [*stock_raw, *new_detail_array, *opening]
-        else:
-            stock_raw = (
-                TransactionDetail.objects.values(
-                    "product", "warehouse", "yards_per_piece", "transaction__nature"
-                )
-                .filter(
-                    transaction__person__branch=branch,
-                    transaction__date__lte=date,
-                    **kwargs,
-                )
-                .annotate(quantity=Sum("quantity"))
+            .filter(
+                branch=branch,
+                transaction__date__lte=date,
+                **kwargs,
             )
-            stock_raw = [*stock_raw, *opening]
+            .annotate(quantity=Sum("quantity"))
+        )
+        stock_raw = [*stock_raw, *opening]
 
         stock = defaultdict(int)
         for s in stock_raw:
@@ -177,9 +255,133 @@ class Transaction(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
         return final
 
     @classmethod
-    def check_stock(cls, branch, date=None, t_new=None, t_old=None):
-        """checks if the stock is valid"""
-        stock = Transaction.get_all_stock(branch, date, t_new, t_old)
+    def get_stock_of_keys(cls, branch, keys, date=None):
+        """
+        stock of only the given (product, warehouse, yards_per_piece) keys,
+        aggregated from the history of those keys alone
+        """
+        stock = defaultdict(float)
+        if not keys:
+            return stock
+        date_filter = {"transaction__date__lte": date} if date else {}
+        transfer_date_filter = {"transfer__date__lte": date} if date else {}
+
+        opening = (
+            Stock.objects.values("product", "warehouse", "yards_per_piece")
+            .filter(StockBalance.get_key_filter(keys), warehouse__branch=branch)
+            .annotate(quantity=Sum("opening_stock"))
+        )
+        for o in opening:
+            stock[(o["product"], o["warehouse"], o["yards_per_piece"])] += o["quantity"]
+
+        details = (
+            TransactionDetail.objects.values(
+                "product", "warehouse", "yards_per_piece", "transaction__nature"
+            )
+            .filter(
+                StockBalance.get_key_filter(keys),
+                branch=branch,
+                **date_filter,
+            )
+            .annotate(quantity=Sum("quantity"))
+        )
+        for d in details:
+            key = (d["product"], d["warehouse"], d["yards_per_piece"])
+            if d["transaction__nature"] == TransactionChoices.CREDIT:
+                stock[key] += d["quantity"]
+            else:
+                stock[key] -= d["quantity"]
+
+        transfers_in = (
+            StockTransferDetail.objects.values(
+                "product", "yards_per_piece", warehouse=F("to_warehouse")
+            )
+            .filter(
+                StockBalance.get_key_filter(keys, warehouse="to_warehouse"),
+                transfer__from_warehouse__branch=branch,
+                **transfer_date_filter,
+            )
+            .annotate(quantity=Sum("quantity"))
+        )
+        transfers_out = (
+            StockTransferDetail.objects.values(
+                "product", "yards_per_piece", warehouse=F("transfer__from_warehouse")
+            )
+            .filter(
+                StockBalance.get_key_filter(keys, warehouse="transfer__from_warehouse"),
+                transfer__from_warehouse__branch=branch,
+                **transfer_date_filter,
+            )
+            .annotate(quantity=Sum("quantity"))
+        )
+        for t in transfers_in:
+            stock[(t["product"], t["warehouse"], t["yards_per_piece"])] += t["quantity"]
+        for t in transfers_out:
+            stock[(t["product"], t["warehouse"], t["yards_per_piece"])] -= t["quantity"]
+
+        return stock
+
+    @classmethod
+    def get_negative_stock(cls, branch, t_new=None, t_old=None, date=None):
+        """
+        validates only the keys touched by the new and the old transaction
+        (t_new replaces t_old), returns the keys that would go negative
+        """
+        deltas = defaultdict(float)
+        if t_new is not None:
+            Transaction.get_stock_deltas(
+                t_new["nature"], t_new["transaction_detail"], deltas=deltas
+            )
+        if t_old is not None and (date is None or t_old.date <= date):
+            t_old.get_reverse_stock_deltas(deltas)
+        # lines an edit leaves as they were do not change the stock
+        deltas = {
+            key: delta
+            for key, delta in deltas.items()
+            if abs(delta) > MIN_POSITIVE_VAL_SMALL
+        }
+        if not deltas:
+            return []
+
+        stock = Transaction.get_stock_of_keys(branch, deltas.keys(), date)
+        negative = []
+        for key, delta in deltas.items():
+            quantity = stock[key] + delta
+            if quantity < -MIN_POSITIVE_VAL_SMALL:
+                negative.append(
+                    {
+                        "product": key[0],
+                        "warehouse": key[1],
+                        "yards_per_piece": key[2],
+                        "quantity": quantity,
+                    }
+                )
+        return negative
+
+    @classmethod
+    def check_stock(cls, branch, date=None, t_new=None, t_old=None, keys=None):
+        """
+        checks if the stock is valid, when t_new / t_old are passed only the keys
+        touched by them are validated, when keys are passed only the stock balances
+        of those (product, warehouse, yards_per_piece) are read
+        """
+        if t_new is not None or t_old is not None:
+            negative = Transaction.get_negative_stock(branch, t_new, t_old, date)
+            if negative:
+                product = Product.objects.get(id=negative[0]["product"])
+                raise ValidationError(
+                    f"{product.name} {negative[0]['yards_per_piece']} gaz low in stock",
+                    400,
+                )
+            return
+        if keys is not None:
+            low = StockBalance.get_negative_balances(list(keys)).first()
+            if low is not None:
+                raise ValidationError(
+                    f"{low.product.name} {low.yards_per_piece} gaz low in stock", 400
+                )
+            return
+        stock = Transaction.get_all_stock(branch, date)
         for s in stock:
             if s["quantity"] < 0:
                 product = Product.objects.get(id=s["product"])
@@ -187,6 +389,214 @@ class Transaction(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
                     f"{product.name} {s['yards_per_piece']} gaz low in stock", 400
                 )
 
+    @classmethod
+    def get_stock_deltas(cls, nature, details, sign=1, deltas=None):
+        """
+        quantity change of every (product, warehouse, yards_per_piece) for details,
+        sign=-1 reverses the details (used when a transaction is removed)
+        """
+        deltas = defaultdict(float) if deltas is None else deltas
+        direction = sign if nature == TransactionChoices.CREDIT else -sign
+        for d in details:
+            warehouse = getattr(d["warehouse"], "id", d["warehouse"])
+            if warehouse is None:
+                continue
+            key = (
+                getattr(d["product"], "id", d["product"]),
+                warehouse,
+                float(d["yards_per_piece"]),
+            )
+            deltas[key] += direction * d["quantity"]
+        return deltas
+
+    def get_reverse_stock_deltas(self, deltas=None):
+        """deltas that remove this transaction's details from the stock"""
+        return Transaction.get_stock_deltas(
+            self.nature,
+            self.transaction_detail.values(
+                "product", "warehouse", "yards_per_piece", "quantity"
+            ),
+            -1,
+            deltas,
+        )
+
+    @classmethod
+    def get_cost_deltas(cls, serial_type, details, sign=1, deltas=None):
+        """
+        [value, purchased gazaana] change of every product for details, details may
+        carry their own serial_type. sign=-1 reverses the details
+        """
+        deltas = ProductCost.get_empty_deltas() if deltas is None else deltas
+        for d in details:
+            curr_serial_type = d.get("serial_type", serial_type)
+            if curr_serial_type not in COST_SERIAL_TYPES:
+                continue
+            direction = -sign if curr_serial_type == TransactionSerialTypes.MWS else sign
+            gazaana = float(d["yards_per_piece"]) * d["quantity"]
+            product = deltas[getattr(d["product"], "id", d["product"])]
+            product[0] += direction * gazaana * d["rate"]
+            product[1] += direction * gazaana
+        return deltas
+
+    def get_rows(self, details, payment_serial=None):
+        """
+        unsaved rows of this unsaved transaction in the order they are written: its
+        details with their stock movements, its ledger entry with the link to it and,
+        when a payment serial is
+        given, the payment of the paid amount with its ledger entry and link
+        """
+        rows = [
+            TransactionDetail(transaction=self, branch_id=self.branch_id, **detail)
+            for detail in details
+        ]
+        rows += [StockMovement.for_transaction_detail(detail) for detail in rows]
+        ledger = Ledger(
+            branch_id=self.branch_id,
+            user=self.user,
+            amount=sum(d["yards_per_piece"] * d["quantity"] * d["rate"] for d in details)
+            - self.discount,
+            nature=self.nature,
+            person=self.person,
+            date=self.date,
+        )
+        rows += [ledger, LedgerAndTransaction(ledger_entry=ledger, transaction=self)]
+        if payment_serial is not None:
+            payment = Payment(
+                branch_id=self.branch_id,
+                user=self.user,
+                serial=payment_serial,
+                date=self.date,
+                nature=TransactionChoices.CREDIT,
+                amount=self.paid_amount,
+                account_type=self.account_type,
+                person=self.person,
+                detail=f"{self.detail or ''}{' ' if self.detail else ''}Bill # {self.manual_serial} {self.get_computer_serial()}",
+            )
+            ledger = Ledger(
+                branch_id=self.branch_id,
+                amount=payment.amount,
+                nature=payment.nature,
+                person=payment.person,
+                account_type=payment.account_type,
+                date=payment.date,
+            )
+            rows += [
+                payment,
+                ledger,
+                LedgerAndPayment(ledger_entry=ledger, payment=payment),
+            ]
+        return rows
+
+    def edit(self, data, details, branch):
+        """
+        applies edited data to this transaction in place, detail lines are matched to
+        the existing ones by id or by (product, warehouse, yards_per_piece) so only the
+        changed lines and the ledger entry are written and the ids stay the same
+        """
+        if data["serial_type"] != self.serial_type:
+            self.serial = Transaction.get_next_serial(branch, data["serial_type"])
+        # saving invalidates the snapshots from the new date, the old one is done here
+        if data.get("date", self.date) != self.date:
+            StockSnapshot.invalidate(self.branch_id, self.date)
+        # every stock movement is rewritten when the fields they copy change
+        moved = any(
+            data.get(field, getattr(self, field)) != getattr(self, field)
+            for field in ["date", "nature", "serial_type"]
+        )
+        for key, value in data.items():
+            setattr(self, key, value)
+        self.save()
+
+        unmatched = list(self.transaction_detail.all())
+        current = []
+        changed = []
+        created = []
+        for detail in details:
+            detail = {**detail}
+            id = detail.pop("id", None)
+            key = (
+                getattr(detail["product"], "id", detail["product"]),
+                getattr(detail["warehouse"], "id", detail["warehouse"]),
+                float(detail["yards_per_piece"]),
+            )
+            match = next((d for d in unmatched if id is not None and d.id == id), None)
+            if match is None:
+                match = next(
+                    (
+                        d
+                        for d in unmatched
+                        if (d.product_id, d.warehouse_id, d.yards_per_piece) == key
+                    ),
+                    None,
+                )
+            if match is None:
+                created.append(
+                    TransactionDetail(
+                        transaction=self, branch_id=self.branch_id, **detail
+                    )
+                )
+                continue
+            unmatched.remove(match)
+            current.append(match)
+            values = {
+                "product_id": key[0],
+                "warehouse_id": key[1],
+                "yards_per_piece": detail["yards_per_piece"],
+                "rate": detail["rate"],
+                "quantity": detail["quantity"],
+            }
+            if any(getattr(match, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(match, field, value)
+                changed.append(match)
+
+        remade = current if moved else changed
+        if unmatched or remade:
+            bulk_delete(
+                StockMovement.objects.filter(transaction_detail__in=unmatched + remade)
+            )
+        if unmatched:
+            TransactionDetail.objects.filter(id__in=[d.id for d in unmatched]).delete()
+        if changed:
+            TransactionDetail.objects.bulk_update(
+                changed, ["product", "warehouse", "yards_per_piece", "rate", "quantity"]
+            )
+
+        link = (
+            LedgerAndTransaction.objects.select_related("ledger_entry")
+            .filter(transaction=self)
+            .first()
+        )
+        rows = [
+            *created,
+            *[StockMovement.for_transaction_detail(d) for d in remade + created],
+        ]
+        if not details:
+            if link is not None:
+                Ledger.delete_entries([link.ledger_entry])
+        elif link is None:
+            rows += self.get_rows(details)[2 * len(details) :]
+        else:
+            ledger = link.ledger_entry
+            amount = (
+                sum(d["yards_per_piece"] * d["quantity"] * d["rate"] for d in details)
+                - self.discount
+            )
+            if (ledger.amount, ledger.nature, ledger.person_id, ledger.date) != (
+                amount,
+                self.nature,
+                self.person_id,
+                self.date,
+            ):
+                ledger.amount = amount
+                ledger.nature = self.nature
+                ledger.person = self.person
+                ledger.date = self.date
+                ledger.save()
+        UnitOfWork().add(*rows).flush()
+        LedgerAndTransaction.render_entries(transaction=self)
+        return self, current + created
+
     @classmethod
     def make_transaction(cls, data, request, old=None):
         """make a transaction"""
@@ -209,63 +619,278 @@ class Transaction(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
                     data["date"], transaction_details, branch
                 )
 
+            # validate only the stock keys touched by this transaction before writing
+            Transaction.check_stock(
+                branch,
+                t_new={
+                    "nature": data["nature"],
+                    "transaction_detail": []
+                    if data.get("is_cancelled")
+                    else transaction_details,
+                },
+                t_old=old,
+            )
+
+            if data.get("is_cancelled"):
+                transaction_details = []
             if old:
-                old_serial = old.serial
-                old_serial_type = old.serial_type
-                old.delete()
+                transaction, transactions = old.edit(data, transaction_details, branch)
+            else:
+                transaction = Transaction(
+                    user=user,
+                    branch_id=data["person"].branch_id,
+                    **data,
+                    serial=Transaction.get_next_serial(branch, data["serial_type"]),
+                )
+                # ledger entry for the transaction and, if it is paid, its payment
+                rows = (
+                    []
+                    if transaction.is_cancelled
+                    else transaction.get_rows(
+                        transaction_details,
+                        Payment.get_next_serial(branch) if paid else None,
+                    )
+                )
+                UnitOfWork().add(transaction, *rows).flush()
+                transactions = [row for row in rows if isinstance(row, TransactionDetail)]
 
-            transaction = Transaction.objects.create(
-                user=user,
-                **data,
-                serial=old_serial
-                if old is not None and old_serial_type == data["serial_type"]
-                else Transaction.get_next_serial(
-                    "serial",
-                    serial_type=data["serial_type"],
-                    person__branch=branch,
-                ),
-            )
+            return {"transaction": transaction, "detail": transactions}
+        raise ValidationError(
+            "No user / branch found",
+            400,
+        )
 
-            if transaction.is_cancelled:
-                Transaction.check_stock(branch)
-                return {"transaction": transaction, "detail": []}
+    @classmethod
+    def get_import_objects(cls, queryset, names, label):
+        """objects of queryset keyed by their name, every name must match exactly one"""
+        objects = defaultdict(list)
+        for obj in queryset.filter(name__in=names):
+            objects[obj.name].append(obj)
+        for name in names:
+            if not objects[name]:
+                raise ValidationError(f"{label} {name} does not exist", 400)
+        return objects
 
-            details = []
-            for detail in transaction_details:
-                details.append(
-                    TransactionDetail(
-                        transaction_id=transaction.id,
-                        **detail,
-                    )
+    @classmethod
+    def import_transactions(cls, branch, user, rows):
+        """
+        creates a batch of imported transactions with a fixed number of queries,
+        rows name their person, account type, products and warehouses. the batch is
+        validated as a whole (names, totals, serials and stock) before it is written
+        """
+
+        def get_one(objects, name, row, label):
+            if len(objects[name]) > 1:
+                raise ValidationError(
+                    f"Row {row['row']}: more than one {label} named {name}", 400
                 )
-            transactions = TransactionDetail.objects.bulk_create(details)
+            return objects[name][0]
 
-            # check if the stock is okay
-            Transaction.check_stock(branch)
+        for row in rows:
+            if row["serial_type"] not in TransactionSerialTypes.values:
+                raise ValidationError(
+                    f"Row {row['row']}: invalid serial type {row['serial_type']}", 400
+                )
+            if row["type"] is not None and row["type"] not in TransactionTypes.values:
+                raise ValidationError(
+                    f"Row {row['row']}: invalid type {row['type']}", 400
+                )
+            if row["date"] is None or row["person"] is None:
+                raise ValidationError(
+                    f"Row {row['row']}: date and person are required", 400
+                )
+            if not row["transaction_detail"] or any(
+                d[key] is None for d in row["transaction_detail"] for key in d
+            ):
+                raise ValidationError(f"Row {row['row']}: incomplete details", 400)
+
+        details = [d for row in rows for d in row["transaction_detail"]]
+        persons = cls.get_import_objects(
+            Person.objects.filter(branch=branch),
+            {row["person"] for row in rows},
+            "Person",
+        )
+        products = cls.get_import_objects(
+            Product.objects.filter(category__branch=branch),
+            {d["product"] for d in details},
+            "Product",
+        )
+        warehouses = cls.get_import_objects(
+            Warehouse.objects.filter(branch=branch),
+            {d["warehouse"] for d in details},
+            "Warehouse",
+        )
+        account_types = cls.get_import_objects(
+            AccountType.objects.filter(branch=branch),
+            {row["account_type"] for row in rows if row["account_type"]},
+            "Account type",
+        )
+        cheque_account = (
+            get_cheque_account(branch).account_id
+            if any(row["account_type"] for row in rows)
+            else None
+        )
+
+        stock_deltas = defaultdict(float)
+        manual_serials = set()
+        wasooli_numbers = set()
+        for row in rows:
+            is_supplier = row["serial_type"] in SUPPLIER_SERIAL_TYPES
+            person_type = (
+                PersonChoices.SUPPLIER if is_supplier else PersonChoices.CUSTOMER
+            )
+            matching = [p for p in persons[row["person"]] if p.person_type == person_type]
+            row["person"] = (
+                matching[0]
+                if len(matching) == 1
+                else get_one(persons, row["person"], row, "person")
+            )
+            row["account_type"] = (
+                get_one(account_types, row["account_type"], row, "account type")
+                if row["account_type"]
+                else None
+            )
+            row["nature"] = SERIAL_TYPE_NATURES[row["serial_type"]]
+            row["type"] = row["type"] or SERIAL_TYPE_TYPES[row["serial_type"]]
+            for d in row["transaction_detail"]:
+                d["product"] = get_one(products, d["product"], row, "product")
+                d["warehouse"] = get_one(warehouses, d["warehouse"], row, "warehouse")
+
+            total = (
+                sum(
+                    d["yards_per_piece"] * d["quantity"] * d["rate"]
+                    for d in row["transaction_detail"]
+                )
+                - row["discount"]
+            )
+            if total <= 0:
+                raise ValidationError(f"Row {row['row']}: total is too low", 400)
+            if row["paid_amount"] > total:
+                raise ValidationError(
+                    f"Row {row['row']}: paid amount can not be greater than total", 400
+                )
+            if row["paid_amount"] < 0.0 or (
+                row["account_type"] is not None and not row["paid_amount"]
+            ):
+                raise ValidationError(
+                    f"Row {row['row']}: please remove account type / paid amount", 400
+                )
+            if (
+                row["account_type"] is not None
+                and row["account_type"].id == cheque_account
+            ):
+                raise ValidationError(
+                    f"Row {row['row']}: please use another account type", 400
+                )
+            row["amount"] = total
 
-            # create ledger entry for the current transaction
-            Ledger.create_ledger_entry_for_transasction(
-                {"transaction": transaction, "detail": transaction_details}
+            # manual serials are unique per serial type, and per person for suppliers
+            scope = (row["serial_type"], row["person"].id if is_supplier else None)
+            for value, seen, label in [
+                (row["manual_serial"], manual_serials, "serial"),
+                (row["wasooli_number"], wasooli_numbers, "wasooli number"),
+            ]:
+                if value is not None:
+                    if (*scope, value) in seen:
+                        raise ValidationError(
+                            f"Row {row['row']}: {label} {value} is repeated", 400
+                        )
+                    seen.add((*scope, value))
+
+            Transaction.get_stock_deltas(
+                row["nature"], row["transaction_detail"], deltas=stock_deltas
             )
 
-            # if the transaction is new and paid then create a payment entry
-            if old is None and paid:
-                Payment.make_payment(
-                    request,
-                    {
-                        "date": transaction.date,
-                        "nature": TransactionChoices.CREDIT,
-                        "amount": transaction.paid_amount,
-                        "account_type": transaction.account_type,
-                        "person": transaction.person,
-                        "detail": f"{transaction.detail or ''}{' ' if transaction.detail else ''}Bill # {transaction.manual_serial} {transaction.get_computer_serial()}",
-                    },
+        existing = Transaction.objects.filter(branch=branch).filter(
+            Q(manual_serial__in={serial for *_, serial in manual_serials})
+            | Q(wasooli_number__in={number for *_, number in wasooli_numbers})
+        )
+        for t in existing.values(
+            "serial_type", "person", "manual_serial", "wasooli_number"
+        ):
+            scope = (
+                t["serial_type"],
+                t["person"] if t["serial_type"] in SUPPLIER_SERIAL_TYPES else None,
+            )
+            if (*scope, t["manual_serial"]) in manual_serials:
+                raise ValidationError(
+                    f"{t['serial_type']} serial {t['manual_serial']} already exists", 400
+                )
+            if (*scope, t["wasooli_number"]) in wasooli_numbers:
+                raise ValidationError(
+                    f"{t['serial_type']} wasooli number {t['wasooli_number']} already exists",
+                    400,
                 )
 
-            return {"transaction": transaction, "detail": transactions}
-        raise ValidationError(
-            "No user / branch found",
-            400,
+        stock = Transaction.get_stock_of_keys(branch, stock_deltas.keys())
+        for key, delta in stock_deltas.items():
+            if stock[key] + delta < -MIN_POSITIVE_VAL_SMALL:
+                product = next(d["product"] for d in details if d["product"].id == key[0])
+                raise ValidationError(f"{product.name} {key[2]} gaz low in stock", 400)
+
+        # sales are checked against the cost including the purchases of the batch
+        Transaction.check_selling_rates(
+            [
+                (row["date"], row["transaction_detail"], f"Row {row['row']}: ")
+                for row in rows
+                if row["serial_type"] == TransactionSerialTypes.INV
+            ],
+            [
+                {**d, "serial_type": row["serial_type"], "date": row["date"]}
+                for row in rows
+                for d in row["transaction_detail"]
+                if row["serial_type"] in COST_SERIAL_TYPES
+            ],
+        )
+
+        serials = {
+            serial_type: iter(Transaction.get_next_serials(branch, serial_type, count))
+            for serial_type, count in Counter(row["serial_type"] for row in rows).items()
+        }
+        paid = sum(1 for row in rows if row["paid_amount"])
+        payment_serials = iter(
+            Payment.get_next_serials(branch, None, paid) if paid else []
+        )
+        transactions = []
+        work = UnitOfWork()
+        for row in rows:
+            transaction = Transaction(
+                branch=branch,
+                user=user,
+                serial=next(serials[row["serial_type"]]),
+                **{
+                    key: row[key]
+                    for key in [
+                        "date",
+                        "person",
+                        "nature",
+                        "type",
+                        "serial_type",
+                        "manual_serial",
+                        "wasooli_number",
+                        "builty",
+                        "discount",
+                        "paid_amount",
+                        "account_type",
+                        "detail",
+                    ]
+                },
+            )
+            transactions.append(transaction)
+            work.add(
+                transaction,
+                *transaction.get_rows(
+                    row["transaction_detail"],
+                    next(payment_serials) if transaction.paid_amount else None,
+                ),
+            )
+        work.flush()
+        return transactions
+
+    def get_ledger_columns(self, nature):
+        return (
+            self.get_transaction_string(nature),
+            f"{self.get_computer_and_bill_serial()} ",
         )
 
     def get_transaction_string(self, nature):
@@ -319,7 +944,7 @@ class Transaction(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
             date_filter.update({"date__lte": end_date})
         inv = (
             Transaction.objects.filter(
-                person__branch=branch,
+                branch=branch,
                 serial_type=TransactionSerialTypes.INV,
                 **date_filter,
             ).aggregate(total=Sum("discount"))["total"]
@@ -327,7 +952,7 @@ class Transaction(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
         )
         mwc = (
             Transaction.objects.filter(
-                person__branch=branch,
+                branch=branch,
                 serial_type=TransactionSerialTypes.MWC,
                 **date_filter,
             ).aggregate(total=Sum("discount"))["total"]
@@ -337,7 +962,7 @@ class Transaction(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
         return inv - mwc
 
 
-class TransactionDetail(ID):
+class TransactionDetail(ID, BranchScopedModel):
     transaction = models.ForeignKey(
         Transaction, on_delete=models.CASCADE, related_name="transaction_detail"
     )
@@ -351,6 +976,11 @@ class TransactionDetail(ID):
     quantity = models.FloatField(validators=[MinValueValidator(MIN_POSITIVE_VAL_SMALL)])
     warehouse = models.ForeignKey(Warehouse, on_delete=models.SET_NULL, null=True)
 
+    branch_source = "transaction"
+
+    class Meta:
+        indexes = [models.Index(fields=["branch", "product"])]
+
     @classmethod
     def calculate_total_revenue(cls, branch, start_date=None, end_date=None):
         """total sale revenue with date filters"""
@@ -361,7 +991,7 @@ class TransactionDetail(ID):
             date_filter.update({"transaction__date__lte": end_date})
         data = (
             TransactionDetail.objects.values(serial=F("transaction__serial_type"))
-            .filter(transaction__person__branch=branch, **date_filter)
+            .filter(branch=branch, **date_filter)
             .annotate(total=Sum(F("rate") * F("quantity") * F("yards_per_piece")))
         )
 
@@ -390,7 +1020,7 @@ class TransactionDetail(ID):
         return (
             TransactionDetail.objects.values(nature=F("transaction__nature"))
             .filter(
-                transaction__person__branch=branch,
+                branch=branch,
                 transaction__serial_type=TransactionSerialTypes.SUP,
                 **date_filter,
             )
@@ -401,115 +1031,137 @@ class TransactionDetail(ID):
         )
 
     @classmethod
-    def calculate_previous_inventory(
-        cls, branch, end_date=None, include_ending=False, **kwargs
-    ):
-        """calculates total inventory value less than end_date"""
-        date_filter = {}
-        if end_date:
-            date_filter.update(
-                {
-                    f"transaction__date__lt{'e' if include_ending else ''}": end_date.replace(
-                        hour=23, minute=59, second=59, microsecond=99999
-                    )
-                }
-            )
-        # dictionary that holds all the cogs
-        cogs = defaultdict(lambda: {"value": 0.0, "gazaana": 0.0, "purchases": 0.0})
-
-        # opening stock grouped by product and branch
-        opening = (
-            Stock.objects.values("product", branch=F("warehouse__branch"))
-            .filter(warehouse__branch=branch)
-            .annotate(
-                opening_gazaana=Sum(F("yards_per_piece") * F("opening_stock")),
-                opening_value=Sum(
-                    F("yards_per_piece") * F("opening_stock") * F("opening_stock_rate")
-                ),
-            )
-        )
-
-        # loop over opening stock and add to cogs
-        for o in opening:
-            cogs[str(o["product"])]["value"] = (
-                cogs[str(o["product"])]["value"] + o["opening_value"]
-            )
-            cogs[str(o["product"])]["gazaana"] = (
-                cogs[str(o["product"])]["gazaana"] + o["opening_gazaana"]
-            )
-            cogs[str(o["product"])]["purchases"] = (
-                cogs[str(o["product"])]["purchases"] + o["opening_gazaana"]
+    def get_inventory_valuation(cls, branch, cutoffs):
+        """
+        value, gazaana and purchases per product at every (end_date, include_ending) cut-off
+        transactions are valued for all cut-offs in one grouped query, an end_date of None
+        values the opening stock alone. valuations are memoized for the current request
+        """
+        memo = inventory_memo.get()
+        memo = memo if memo is not None else {}
+        keys = {
+            cutoff: (str(branch.id), cutoff[0], bool(cutoff[1]) if cutoff[0] else False)
+            for cutoff in cutoffs
+        }
+        missing = list({key for key in keys.values() if key not in memo})
+
+        if missing:
+            # opening stock grouped by product
+            opening = (
+                Stock.objects.values("product")
+                .filter(warehouse__branch=branch)
+                .order_by()
+                .annotate(
+                    opening_gazaana=Sum(F("yards_per_piece") * F("opening_stock")),
+                    opening_value=Sum(
+                        F("yards_per_piece")
+                        * F("opening_stock")
+                        * F("opening_stock_rate")
+                    ),
+                )
             )
+            valuations = {
+                key: defaultdict(lambda: {"value": 0.0, "gazaana": 0.0, "purchases": 0.0})
+                for key in missing
+            }
+            for o in opening:
+                for valuation in valuations.values():
+                    valuation[str(o["product"])] = {
+                        "value": o["opening_value"],
+                        "gazaana": o["opening_gazaana"],
+                        "purchases": o["opening_gazaana"],
+                    }
 
-        # if an end date is provided then assume that there is no purchase/sale
-        if end_date:
-            inventory = (
-                TransactionDetail.objects.values(
-                    "product", serial_type=F("transaction__serial_type")
+            value = F("rate") * F("yards_per_piece") * F("quantity")
+            gazaana = F("yards_per_piece") * F("quantity")
+            incoming = [TransactionSerialTypes.SUP, TransactionSerialTypes.MWC]
+            dated = [key for key in missing if key[1]]
+            aggregates = {}
+            for i, (_, end_date, include_ending) in enumerate(dated):
+                date_filter = Q(
+                    **{
+                        f"transaction__date__lt{'e' if include_ending else ''}": end_date.replace(
+                            hour=23, minute=59, second=59, microsecond=99999
+                        )
+                    }
                 )
-                .filter(
-                    transaction__person__branch=branch,
-                    **date_filter,
+                aggregates[f"value_{i}"] = Sum(
+                    Case(
+                        When(transaction__serial_type__in=incoming, then=value),
+                        When(
+                            transaction__serial_type=TransactionSerialTypes.MWS,
+                            then=-value,
+                        ),
+                        default=0.0,
+                        output_field=models.FloatField(),
+                    ),
+                    filter=date_filter,
                 )
-                .annotate(
-                    value=Sum(F("rate") * F("yards_per_piece") * F("quantity")),
-                    gazaana=Sum(F("yards_per_piece") * F("quantity")),
+                aggregates[f"gazaana_{i}"] = Sum(
+                    Case(
+                        When(transaction__serial_type__in=incoming, then=gazaana),
+                        default=-gazaana,
+                        output_field=models.FloatField(),
+                    ),
+                    filter=date_filter,
+                )
+                aggregates[f"purchases_{i}"] = Sum(
+                    Case(
+                        When(transaction__serial_type__in=incoming, then=gazaana),
+                        When(
+                            transaction__serial_type=TransactionSerialTypes.MWS,
+                            then=-gazaana,
+                        ),
+                        default=0.0,
+                        output_field=models.FloatField(),
+                    ),
+                    filter=date_filter,
                 )
-            )
 
-            for i in inventory:
-                val = i["value"]
-                gaz = i["gazaana"]
-                if i["serial_type"] == TransactionSerialTypes.SUP:
-                    cogs[str(i["product"])]["value"] = (
-                        cogs[str(i["product"])]["value"] + val
-                    )
-                    cogs[str(i["product"])]["gazaana"] = (
-                        cogs[str(i["product"])]["gazaana"] + gaz
-                    )
-                    cogs[str(i["product"])]["purchases"] = (
-                        cogs[str(i["product"])]["purchases"] + gaz
-                    )
-                elif i["serial_type"] == TransactionSerialTypes.MWS:
-                    cogs[str(i["product"])]["value"] = (
-                        cogs[str(i["product"])]["value"] - val
-                    )
-                    cogs[str(i["product"])]["gazaana"] = (
-                        cogs[str(i["product"])]["gazaana"] - gaz
-                    )
-                    cogs[str(i["product"])]["purchases"] = (
-                        cogs[str(i["product"])]["purchases"] - gaz
-                    )
-                elif i["serial_type"] == TransactionSerialTypes.INV:
-                    cogs[str(i["product"])]["gazaana"] = (
-                        cogs[str(i["product"])]["gazaana"] - gaz
-                    )
-                elif i["serial_type"] == TransactionSerialTypes.MWC:
-                    cogs[str(i["product"])]["value"] = (
-                        cogs[str(i["product"])]["value"] + val
-                    )
-                    cogs[str(i["product"])]["gazaana"] = (
-                        cogs[str(i["product"])]["gazaana"] + gaz
-                    )
-                    cogs[str(i["product"])]["purchases"] = (
-                        cogs[str(i["product"])]["purchases"] + gaz
-                    )
+            if dated:
+                inventory = (
+                    TransactionDetail.objects.values("product")
+                    .filter(branch=branch)
+                    .order_by()
+                    .annotate(**aggregates)
+                )
+                for i in inventory:
+                    for index, key in enumerate(dated):
+                        product = valuations[key][str(i["product"])]
+                        product["value"] += i[f"value_{index}"] or 0
+                        product["gazaana"] += i[f"gazaana_{index}"] or 0
+                        product["purchases"] += i[f"purchases_{index}"] or 0
 
-        if kwargs.get("return_list"):
-            return cogs
+            memo.update(valuations)
+
+        return {cutoff: memo[key] for cutoff, key in keys.items()}
 
-        # calculate final inventory in hand till end date
+    @staticmethod
+    def get_inventory_value(valuation):
+        """final inventory in hand at weighted average cost"""
         total_inventory = 0.0
-        for key, obj in cogs.items():
+        for obj in valuation.values():
             curr_inventory = (
                 obj["value"] / obj["purchases"] * obj["gazaana"]
                 if obj["purchases"]
                 else 0
             )
             total_inventory += curr_inventory
-
         return total_inventory
 
+    @classmethod
+    def calculate_previous_inventory(
+        cls, branch, end_date=None, include_ending=False, **kwargs
+    ):
+        """calculates total inventory value less than end_date"""
+        cutoff = (end_date, include_ending)
+        valuation = TransactionDetail.get_inventory_valuation(branch, [cutoff])[cutoff]
+
+        if kwargs.get("return_list"):
+            return valuation
+
+        return TransactionDetail.get_inventory_value(valuation)
+
     @classmethod
     def calculate_total_purchases_of_period(cls, branch, start_date=None, end_date=None):
         date_filter = {}
@@ -521,7 +1173,7 @@ class TransactionDetail(ID):
         purchases = (
             TransactionDetail.objects.values(serial_type=F("transaction__serial_type"))
             .filter(
-                transaction__person__branch=branch,
+                branch=branch,
                 **date_filter,
             )
             .annotate(
@@ -540,18 +1192,17 @@ class TransactionDetail(ID):
 
     @classmethod
     def calculate_cogs(cls, branch, start_date=None, end_date=None):
-        beginning_inventory = TransactionDetail.calculate_previous_inventory(
-            branch,
-            start_date,
+        beginning, ending = (start_date, False), (end_date, True)
+        valuations = TransactionDetail.get_inventory_valuation(
+            branch, [beginning, ending]
         )
+        beginning_inventory = TransactionDetail.get_inventory_value(valuations[beginning])
 
         purchases_period = TransactionDetail.calculate_total_purchases_of_period(
             branch, start_date, end_date
         )
 
-        ending_inventory = TransactionDetail.calculate_previous_inventory(
-            branch, end_date, True
-        )
+        ending_inventory = TransactionDetail.get_inventory_value(valuations[ending])
 
         return (beginning_inventory + purchases_period) - ending_inventory
 
@@ -580,7 +1231,7 @@ class TransactionDetail(ID):
         serial_type = kwargs.get("serial_type", TransactionSerialTypes.INV)
         revenue = (
             TransactionDetail.objects.filter(
-                transaction__person__branch=branch,
+                branch=branch,
                 transaction__serial_type=serial_type,
                 **get_date_filter("transaction__date"),
             )
@@ -593,7 +1244,7 @@ class TransactionDetail(ID):
         )
         discounts = (
             Transaction.objects.filter(
-                person__branch=branch,
+                branch=branch,
                 serial_type=TransactionSerialTypes.INV,
                 **get_date_filter("date"),
             )
@@ -617,6 +1268,9 @@ class StockTransfer(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
     )
     manual_serial = models.PositiveBigIntegerField()
 
+    serial_branch = "from_warehouse__branch"
+    serial_key = "from_warehouse"
+
     class Meta:
         unique_together = ["serial", "from_warehouse"]
 
@@ -629,9 +1283,12 @@ class StockTransfer(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
         user = request.user
         transfer_detail = data.pop("transfer_detail")
 
+        stock_deltas = defaultdict(float)
         if old is not None:
             old_serial = old.serial
             old_warehouse = old.from_warehouse
+            old.get_reverse_stock_deltas(stock_deltas)
+            bulk_delete(StockMovement.objects.filter(transfer_detail__transfer=old))
             old.delete()
 
         transfer_instance = StockTransfer.objects.create(
@@ -639,11 +1296,7 @@ class StockTransfer(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
             user=user,
             serial=old_serial
             if old is not None and old_warehouse == data["from_warehouse"]
-            else StockTransfer.get_next_serial(
-                "serial",
-                from_warehouse=data["from_warehouse"],
-                from_warehouse__branch=branch,
-            ),
+            else StockTransfer.get_next_serial(branch, data["from_warehouse"]),
         )
         detail_entries = []
         total = 0
@@ -656,7 +1309,18 @@ class StockTransfer(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
                 )
             )
         detail_entries = StockTransferDetail.objects.bulk_create(detail_entries)
-        Transaction.check_stock(branch, None)
+        bulk_create(
+            StockMovement,
+            [
+                movement
+                for detail in detail_entries
+                for movement in StockMovement.for_transfer_detail(detail)
+            ],
+        )
+        StockTransfer.get_stock_deltas(
+            transfer_instance.from_warehouse, transfer_detail, deltas=stock_deltas
+        )
+        Transaction.check_stock(branch, keys=stock_deltas.keys())
 
         data["transfer_detail"] = transfer_detail
         return {
@@ -665,6 +1329,33 @@ class StockTransfer(ID, UserAwareModel, DateTimeAwareModel, NextSerial):
             "total": total,
         }
 
+    @classmethod
+    def get_stock_deltas(cls, from_warehouse, details, sign=1, deltas=None):
+        """
+        quantity change of every (product, warehouse, yards_per_piece) for transfer
+        details, sign=-1 reverses the details (used when a transfer is removed)
+        """
+        deltas = defaultdict(float) if deltas is None else deltas
+        from_warehouse = getattr(from_warehouse, "id", from_warehouse)
+        for d in details:
+            product = getattr(d["product"], "id", d["product"])
+            yards_per_piece = float(d["yards_per_piece"])
+            to_warehouse = getattr(d["to_warehouse"], "id", d["to_warehouse"])
+            deltas[(product, from_warehouse, yards_per_piece)] -= sign * d["quantity"]
+            deltas[(product, to_warehouse, yards_per_piece)] += sign * d["quantity"]
+        return deltas
+
+    def get_reverse_stock_deltas(self, deltas=None):
+        """deltas that remove this transfer's details from the stock"""
+        return StockTransfer.get_stock_deltas(
+            self.from_warehouse_id,
+            self.transfer_detail.values(
+                "product", "to_warehouse", "yards_per_piece", "quantity"
+            ),
+            -1,
+            deltas,
+        )
+
 
 class StockTransferDetail(ID):
     transfer = models.ForeignKey(
@@ -716,3 +1407,383 @@ class StockTransferDetail(ID):
             quantity -= t["quantity"]
 
         return quantity
+
+
+# columns of every part of the stock union, in order
+STOCK_COLUMNS = ["row_product", "row_warehouse", "row_yards_per_piece", "row_quantity"]
+
+
+def get_stock_rows(queryset, quantity, warehouse="warehouse"):
+    """rows of a queryset in the shape of the stock union"""
+    columns = {
+        "row_product": F("product"),
+        "row_warehouse": F(warehouse),
+        "row_yards_per_piece": F("yards_per_piece"),
+        "row_quantity": quantity,
+    }
+    return queryset.order_by().annotate(**columns).values(*STOCK_COLUMNS)
+
+
+class StockSnapshot(BranchAwareModel):
+    """
+    closing stock of a (product, warehouse, yards_per_piece) at the end of a day,
+    stock as of a later date is the nearest snapshot plus the movements after it
+    """
+
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE)
+    yards_per_piece = models.FloatField()
+    quantity = models.FloatField()
+
+    class Meta:
+        unique_together = ("branch", "date", "product", "warehouse", "yards_per_piece")
+
+    @staticmethod
+    def get_lookups(lookups, warehouse):
+        """lookups on warehouse renamed to the warehouse field of a part"""
+        return {
+            (
+                warehouse + key[len("warehouse") :]
+                if key.startswith("warehouse")
+                else key
+            ): value
+            for key, value in lookups.items()
+        }
+
+    @classmethod
+    def get_stock_sql(cls, branch, date, having=None, exclude=None, **filters):
+        """
+        sql of the stock of the branch as of date grouped by (product, warehouse,
+        yards_per_piece), filters and exclude take lookups on those fields and having
+        (operator, value) comparisons of the quantity
+        """
+        exclude = exclude or {}
+        snapshot = cls.objects.filter(branch=branch, date__lt=date.date()).aggregate(
+            date=Max("date")
+        )["date"]
+        start = {}
+        if snapshot is not None:
+            opening = cls.objects.filter(branch=branch, date=snapshot, **filters).exclude(
+                **exclude
+            )
+            opening_quantity = F("quantity")
+            start = datetime.combine(snapshot + timedelta(days=1), time.min)
+        else:
+            opening = Stock.objects.filter(warehouse__branch=branch, **filters).exclude(
+                **exclude
+            )
+            opening_quantity = F("opening_stock")
+
+        def period(key):
+            return (
+                {f"{key}__gte": start, f"{key}__lte": date}
+                if start
+                else {f"{key}__lte": date}
+            )
+
+        transfers = StockTransferDetail.objects.filter(
+            transfer__from_warehouse__branch=branch, **period("transfer__date")
+        )
+        parts = [
+            get_stock_rows(opening, opening_quantity),
+            get_stock_rows(
+                TransactionDetail.objects.filter(
+                    branch=branch, **period("transaction__date"), **filters
+                ).exclude(**exclude),
+                Case(
+                    When(
+                        transaction__nature=TransactionChoices.CREDIT, then=F("quantity")
+                    ),
+                    default=-F("quantity"),
+                    output_field=FloatField(),
+                ),
+            ),
+            get_stock_rows(
+                transfers.filter(**cls.get_lookups(filters, "to_warehouse")).exclude(
+                    **cls.get_lookups(exclude, "to_warehouse")
+                ),
+                F("quantity"),
+                "to_warehouse",
+            ),
+            get_stock_rows(
+                transfers.filter(
+                    **cls.get_lookups(filters, "transfer__from_warehouse")
+                ).exclude(**cls.get_lookups(exclude, "transfer__from_warehouse")),
+                -F("quantity"),
+                "transfer__from_warehouse",
+            ),
+        ]
+        queries = [part.query.sql_with_params() for part in parts]
+        union = " UNION ALL ".join(
+            f"SELECT * FROM ({sql}) part_{i}" for i, (sql, params) in enumerate(queries)
+        )
+        having = having or []
+        conditions = " AND ".join(f"row_quantity {operator} %s" for operator, _ in having)
+        return (
+            "SELECT * FROM ("
+            "SELECT row_product, row_warehouse, row_yards_per_piece, "
+            f"SUM(row_quantity) AS row_quantity FROM ({union}) stock "
+            "GROUP BY row_product, row_warehouse, row_yards_per_piece"
+            f") grouped {f'WHERE {conditions} ' if having else ''}"
+            "ORDER BY row_product, row_warehouse, row_yards_per_piece",
+            [
+                *[param for sql, params in queries for param in params],
+                *[value for _, value in having],
+            ],
+        )
+
+    @classmethod
+    def take(cls, branch, day):
+        """stores the closing stock of the branch at the end of day"""
+        sql, params = cls.get_stock_sql(
+            branch, datetime.combine(day, time.max), having=[("<>", 0)]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        cls.objects.filter(branch=branch, date=day).delete()
+        return cls.objects.bulk_create(
+            [
+                cls(
+                    branch=branch,
+                    date=day,
+                    product_id=product,
+                    warehouse_id=warehouse,
+                    yards_per_piece=yards_per_piece,
+                    quantity=quantity,
+                )
+                for product, warehouse, yards_per_piece, quantity in rows
+            ],
+            batch_size=1000,
+        )
+
+    @classmethod
+    def invalidate(cls, branch_id, date=None):
+        """movements dated into a snapshotted day drop every snapshot from that day on"""
+        snapshots = cls.objects.filter(branch_id=branch_id)
+        if date is not None:
+            snapshots = snapshots.filter(
+                date__gte=date.date() if isinstance(date, datetime) else date
+            )
+        snapshots.delete()
+
+
+# movement types that change the average cost of a product, with the direction
+COST_MOVEMENT_DIRECTIONS = {
+    StockMovementTypes.OPENING: 1,
+    StockMovementTypes.SUP: 1,
+    StockMovementTypes.MWC: 1,
+    StockMovementTypes.MWS: -1,
+}
+
+
+class StockMovement(BranchAwareModel):
+    """
+    journal of every stock movement with the quantity it adds (or removes when
+    negative), written along with the opening stock, transactions and transfers.
+    the stock balances and product costs follow the movements as they are created
+    and deleted, movements are never updated in place
+    """
+
+    # opening stock has no date of its own and comes before every movement
+    date = models.DateTimeField(null=True)
+    movement_type = models.CharField(max_length=3, choices=StockMovementTypes.choices)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True)
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.SET_NULL, null=True)
+    yards_per_piece = models.FloatField()
+    quantity = models.FloatField()
+    rate = models.FloatField(default=0.0)
+    stock = models.ForeignKey(
+        Stock, on_delete=models.CASCADE, null=True, related_name="movements"
+    )
+    transaction_detail = models.ForeignKey(
+        TransactionDetail, on_delete=models.CASCADE, null=True, related_name="movements"
+    )
+    transfer_detail = models.ForeignKey(
+        StockTransferDetail, on_delete=models.CASCADE, null=True, related_name="movements"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "warehouse", "date"]),
+            models.Index(fields=["branch", "date"]),
+        ]
+
+    @classmethod
+    def for_transaction_detail(cls, detail):
+        """unsaved movement of a detail line of a transaction"""
+        transaction = detail.transaction
+        return cls(
+            branch_id=transaction.branch_id,
+            date=transaction.date,
+            movement_type=transaction.serial_type,
+            product_id=detail.product_id,
+            warehouse_id=detail.warehouse_id,
+            yards_per_piece=detail.yards_per_piece,
+            quantity=detail.quantity
+            if transaction.nature == TransactionChoices.CREDIT
+            else -detail.quantity,
+            rate=detail.rate,
+            transaction_detail=detail,
+        )
+
+    @classmethod
+    def for_transfer_detail(cls, detail):
+        """unsaved movements out of and into the warehouses of a transfer line"""
+        transfer = detail.transfer
+        values = {
+            "branch_id": transfer.from_warehouse.branch_id,
+            "date": transfer.date,
+            "product_id": detail.product_id,
+            "yards_per_piece": detail.yards_per_piece,
+            "transfer_detail": detail,
+        }
+        return [
+            cls(
+                movement_type=StockMovementTypes.TRANSFER_OUT,
+                warehouse_id=transfer.from_warehouse_id,
+                quantity=-detail.quantity,
+                **values,
+            ),
+            cls(
+                movement_type=StockMovementTypes.TRANSFER_IN,
+                warehouse_id=detail.to_warehouse_id,
+                quantity=detail.quantity,
+                **values,
+            ),
+        ]
+
+    @classmethod
+    def record_opening_stock(cls, stock):
+        # movements are replaced rather than updated so the balances follow them
+        cls.objects.filter(stock=stock).delete()
+        cls.objects.create(
+            branch_id=stock.warehouse.branch_id,
+            date=None,
+            movement_type=StockMovementTypes.OPENING,
+            product_id=stock.product_id,
+            warehouse_id=stock.warehouse_id,
+            yards_per_piece=stock.yards_per_piece,
+            quantity=stock.opening_stock,
+            rate=stock.opening_stock_rate,
+            stock=stock,
+        )
+
+    @classmethod
+    def apply_to_balances(cls, movements, sign=1):
+        """
+        adds movements to the stock balances and the product costs, sign=-1 takes
+        removed movements out of the balances that still exist
+        """
+        stock_deltas = defaultdict(float)
+        cost_deltas = ProductCost.get_empty_deltas()
+        for m in movements:
+            if m.product_id is None:
+                continue
+            yards_per_piece = float(m.yards_per_piece)
+            if m.warehouse_id is not None:
+                key = (m.product_id, m.warehouse_id, yards_per_piece)
+                stock_deltas[key] += sign * m.quantity
+            direction = COST_MOVEMENT_DIRECTIONS.get(m.movement_type)
+            if direction is not None:
+                quantity = (
+                    m.quantity
+                    if m.movement_type == StockMovementTypes.OPENING
+                    else abs(m.quantity)
+                )
+                gazaana = sign * direction * yards_per_piece * quantity
+                cost_deltas[m.product_id][0] += gazaana * m.rate
+                cost_deltas[m.product_id][1] += gazaana
+        StockBalance.apply_deltas(stock_deltas, create=sign > 0)
+        ProductCost.apply_deltas(cost_deltas, create=sign > 0)
+
+    @classmethod
+    def get_stock_card(
+        cls,
+        branch,
+        page_size,
+        start=None,
+        end=None,
+        after=None,
+        remove_transfers=False,
+        **filters,
+    ):
+        """
+        movements of the filtered stock in date order with the running quantity after
+        every row, the opening stock is everything before start or before after (the
+        id of the last row of the previous page) including the opening stock rows,
+        removed transfers are left out of the quantities as well
+        """
+        movements = cls.objects.filter(branch=branch, **filters)
+        if remove_transfers:
+            movements = movements.filter(transfer_detail__isnull=True)
+        page_filter = Q()
+        opening_filter = Q(movement_type=StockMovementTypes.OPENING)
+        if after:
+            try:
+                last = (
+                    movements.exclude(movement_type=StockMovementTypes.OPENING)
+                    .filter(id=UUID(str(after)))
+                    .first()
+                )
+            except ValueError:
+                last = None
+            if last is None:
+                raise ValidationError(
+                    "after should be the next id of a previous page of this stock", 400
+                )
+            page_filter = Q(date__gt=last.date) | Q(date=last.date, id__gt=last.id)
+            opening_filter |= ~page_filter
+        elif start:
+            page_filter = Q(date__gte=start)
+            opening_filter |= Q(date__lt=start)
+
+        opening_stock = (
+            movements.filter(opening_filter).aggregate(total=Sum("quantity"))["total"]
+            or 0
+        )
+
+        rows = movements.filter(page_filter).exclude(
+            movement_type=StockMovementTypes.OPENING
+        )
+        if end:
+            rows = rows.filter(date__lte=end)
+        ordering = [F("date").asc(nulls_first=True), F("id").asc()]
+        rows = list(
+            rows.annotate(
+                running_quantity=Window(expression=Sum("quantity"), order_by=ordering)
+            )
+            .values(
+                "id",
+                "date",
+                "movement_type",
+                "product",
+                "warehouse",
+                "yards_per_piece",
+                "quantity",
+                "running_quantity",
+                transaction=F("transaction_detail__transaction"),
+                transaction_serial=F("transaction_detail__transaction__serial"),
+                transaction_manual_serial=F(
+                    "transaction_detail__transaction__manual_serial"
+                ),
+                transaction_person=F("transaction_detail__transaction__person"),
+                transaction_type=F("transaction_detail__transaction__type"),
+                transfer=F("transfer_detail__transfer"),
+                transfer_serial=F("transfer_detail__transfer__serial"),
+                transfer_manual_serial=F("transfer_detail__transfer__manual_serial"),
+            )
+            .order_by(*ordering)[: page_size + 1]
+        )
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        for row in rows:
+            row["balance"] = opening_stock + row.pop("running_quantity")
+
+        return {
+            "data": rows,
+            "opening_stock": opening_stock,
+            "closing_stock": rows[-1]["balance"] if rows else opening_stock,
+            "next": rows[-1]["id"] if has_next else None,
+        }
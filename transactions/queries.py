@@ -15,7 +15,7 @@ class TransactionQuery:
         if not check_permission(self.request, PERMISSIONS.CAN_VIEW_SUPPLIER_TRANSACTIONS):
             transaction_type_filter.append(TransactionSerialTypes.SUP)
             transaction_type_filter.append(TransactionSerialTypes.MWS)
-        return Transaction.objects.filter(person__branch=self.request.branch).exclude(
+        return Transaction.objects.filter(branch=self.request.branch).exclude(
             serial_type__in=transaction_type_filter
         )
 
@@ -1,3 +1,5 @@
+import io
+import os
 from functools import reduce
 
 from rest_framework import serializers, status
@@ -9,7 +11,17 @@ from logs.choices import ActivityCategory, ActivityTypes
 from logs.models import Log
 
 from .choices import TransactionSerialTypes
-from .models import StockTransfer, StockTransferDetail, Transaction, TransactionDetail
+from .models import (
+    SUPPLIER_SERIAL_TYPES,
+    StockTransfer,
+    StockTransferDetail,
+    Transaction,
+    TransactionDetail,
+)
+from .utils import get_batches, read_transaction_rows
+
+# transactions of an import validated and written together
+IMPORT_BATCH_SIZE = 500
 
 
 class ValidateSerial:
@@ -229,10 +241,59 @@ class TransactionSerializer(
         return validated_data
 
 
+class ImportTransactionsSerializer(serializers.Serializer):
+    """Imports the transactions of a csv or json file in batches"""
+
+    file = serializers.FileField(write_only=True)
+    imported = serializers.IntegerField(read_only=True)
+
+    def validate_file(self, file):
+        if os.path.splitext(file.name)[1].lower() not in [".csv", ".json"]:
+            raise serializers.ValidationError(
+                "Only csv and json files can be imported", status.HTTP_400_BAD_REQUEST
+            )
+        return file
+
+    def create(self, validated_data):
+        request = self.context["request"]
+        file = validated_data["file"]
+        can_create_supplier_transactions = check_permission(
+            request, PERMISSIONS.CAN_CREATE_SUPPLIER_TRANSACTION
+        )
+        imported = 0
+        rows = read_transaction_rows(
+            io.TextIOWrapper(file.file, encoding="utf-8-sig"),
+            os.path.splitext(file.name)[1][1:].lower(),
+        )
+        for batch in get_batches(rows, IMPORT_BATCH_SIZE):
+            if not can_create_supplier_transactions and any(
+                row["serial_type"] in SUPPLIER_SERIAL_TYPES for row in batch
+            ):
+                raise serializers.ValidationError(
+                    "You are not authorized to create supplier transactions",
+                    status.HTTP_403_FORBIDDEN,
+                )
+            imported += len(
+                Transaction.import_transactions(request.branch, request.user, batch)
+            )
+
+        Log.create_log(
+            ActivityTypes.CREATED,
+            ActivityCategory.TRANSACTION,
+            f"{imported} transactions imported from {file.name}",
+            request,
+        )
+        return {"imported": imported}
+
+
 class UpdateTransactionDetailSerializer(serializers.ModelSerializer):
+    # lines sent back with their id keep it, the rest are matched by their stock key
+    id = serializers.UUIDField(required=False)
+
     class Meta:
         model = TransactionDetail
         fields = [
+            "id",
             "transaction",
             "product",
             "rate",
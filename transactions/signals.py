@@ -0,0 +1,79 @@
+from core.signals import post_bulk_create, post_bulk_delete
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from essentials.models import Stock
+
+from .models import (
+    StockMovement,
+    StockSnapshot,
+    StockTransfer,
+    Transaction,
+    TransactionDetail,
+)
+from .utils import clear_inventory_memo
+
+
+@receiver(post_bulk_create, sender=Transaction)
+@receiver(post_bulk_create, sender=TransactionDetail)
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_save, sender=TransactionDetail)
+@receiver(post_delete, sender=TransactionDetail)
+@receiver(post_save, sender=Stock)
+@receiver(post_delete, sender=Stock)
+def clear_inventory_memo_upon_change(sender, **kwargs):
+    clear_inventory_memo()
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def invalidate_stock_snapshots(sender, instance, **kwargs):
+    StockSnapshot.invalidate(instance.branch_id, instance.date)
+
+
+@receiver(post_bulk_create, sender=Transaction)
+def invalidate_stock_snapshots_in_bulk(sender, instances, **kwargs):
+    dates = {}
+    for instance in instances:
+        if instance.branch_id not in dates or instance.date < dates[instance.branch_id]:
+            dates[instance.branch_id] = instance.date
+    for branch_id, date in dates.items():
+        StockSnapshot.invalidate(branch_id, date)
+
+
+@receiver(post_save, sender=StockTransfer)
+@receiver(post_delete, sender=StockTransfer)
+def invalidate_stock_snapshots_upon_transfer(sender, instance, **kwargs):
+    StockSnapshot.invalidate(instance.from_warehouse.branch_id, instance.date)
+
+
+@receiver(post_save, sender=Stock)
+@receiver(post_delete, sender=Stock)
+def invalidate_stock_snapshots_upon_opening_stock(sender, instance, **kwargs):
+    StockSnapshot.invalidate(instance.warehouse.branch_id)
+
+
+@receiver(post_save, sender=Stock)
+def record_opening_stock_movement(sender, instance, **kwargs):
+    StockMovement.record_opening_stock(instance)
+
+
+@receiver(post_save, sender=StockMovement)
+def add_stock_movement_to_balances(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        StockMovement.apply_to_balances([instance])
+
+
+@receiver(post_bulk_create, sender=StockMovement)
+def add_stock_movements_to_balances(sender, instances, **kwargs):
+    StockMovement.apply_to_balances(instances)
+
+
+@receiver(post_delete, sender=StockMovement)
+def remove_stock_movement_from_balances(sender, instance, **kwargs):
+    StockMovement.apply_to_balances([instance], -1)
+
+
+@receiver(post_bulk_delete, sender=StockMovement)
+def remove_stock_movements_from_balances(sender, instances, **kwargs):
+    StockMovement.apply_to_balances(instances, -1)
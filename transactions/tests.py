@@ -1,3 +1,354 @@
-from django.test import TestCase
+import json
+from datetime import date, datetime
+from types import SimpleNamespace
+from unittest import mock
+from uuid import uuid4
 
-# Create your tests here.
+from core.tests import BranchTestMixin
+from django.contrib import admin
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from essentials.models import Person, ProductCost, Stock, StockBalance, Warehouse
+
+from .choices import StockMovementTypes
+from .middlewares.inventory import InventoryMemoMiddleware
+from .models import StockMovement, StockSnapshot, StockTransfer, Transaction
+from .utils import inventory_memo
+from .views import DetailedStockView
+
+
+class StockBalanceTest(BranchTestMixin, TestCase):
+    """stock balances and product costs follow every path that writes stock"""
+
+    def setUp(self):
+        super().setUp()
+        self.purchase = self.create_transaction(
+            self.supplier,
+            "SUP",
+            "C",
+            [(self.products[0], 20, 6), (self.products[1], 10, 8)],
+        )
+        self.sale = self.create_transaction(
+            self.customer, "INV", "D", [(self.products[0], 5, 10)]
+        )
+
+    def test_create(self):
+        balance = StockBalance.objects.get(
+            product=self.products[0], warehouse=self.warehouse
+        )
+        self.assertEqual(balance.quantity, 1015)
+        cost = ProductCost.objects.get(product=self.products[0])
+        self.assertEqual(cost.purchases, 10200)
+        self.assertEqual(cost.value, 10000 * 5 + 200 * 6)
+        self.assertBalancesRebuilt()
+
+    def test_edit(self):
+        data = self.get_transaction_data(
+            self.supplier,
+            "SUP",
+            "C",
+            [(self.products[0], 30, 7), (self.products[2], 4, 9)],
+        )
+        response = self.client.put(
+            f"/transaction/edit/{self.purchase['id']}/", data, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            StockBalance.objects.get(
+                product=self.products[1], warehouse=self.warehouse
+            ).quantity,
+            1000,
+        )
+        self.assertBalancesRebuilt()
+
+        # moving the date rewrites every movement of the transaction
+        data["date"] = "2022-02-01T00:00:00"
+        response = self.client.put(
+            f"/transaction/edit/{self.purchase['id']}/", data, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertBalancesRebuilt()
+
+    def test_delete(self):
+        response = self.client.delete(f"/transaction/delete/{self.sale['id']}/")
+        self.assertEqual(response.status_code, 204)
+        self.assertBalancesRebuilt()
+        self.assertFalse(
+            StockMovement.objects.filter(
+                transaction_detail__transaction=self.sale["id"]
+            ).exists()
+        )
+
+    def test_admin_delete(self):
+        model_admin = admin.site._registry[Transaction]
+        request = RequestFactory().post("/")
+        model_admin.delete_queryset(
+            request, Transaction.objects.filter(id=self.purchase["id"])
+        )
+        self.assertBalancesRebuilt()
+
+    def test_person_and_warehouse_cascades(self):
+        Person.objects.get(id=self.supplier.id).delete()
+        self.assertBalancesRebuilt()
+        Warehouse.objects.get(id=self.warehouse.id).delete()
+        self.assertBalancesRebuilt()
+
+    def test_opening_stock(self):
+        stock = Stock.objects.get(product=self.products[2], warehouse=self.warehouse)
+        stock.opening_stock = 500
+        stock.opening_stock_rate = 4
+        stock.save()
+        self.assertBalancesRebuilt()
+        stock.delete()
+        self.assertBalancesRebuilt()
+
+    def test_transfer(self):
+        response = self.client.post(
+            "/transaction/transfer-stock/",
+            {
+                "date": "2022-01-02T00:00:00",
+                "from_warehouse": str(self.warehouse.id),
+                "manual_serial": 1,
+                "transfer_detail": [
+                    {
+                        "product": str(self.products[0].id),
+                        "to_warehouse": str(self.other_warehouse.id),
+                        "yards_per_piece": 10,
+                        "quantity": 15,
+                    }
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(
+            StockBalance.objects.get(
+                product=self.products[0], warehouse=self.other_warehouse
+            ).quantity,
+            15,
+        )
+        self.assertBalancesRebuilt()
+        transfer = StockTransfer.objects.get()
+        response = self.client.delete(
+            f"/transaction/transfer-stock/delete/{transfer.id}/"
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertBalancesRebuilt()
+
+
+class TransactionQueriesTest(BranchTestMixin, TestCase):
+    def make_transaction(self, count):
+        data = {
+            "date": datetime(2022, 1, 1),
+            "person": self.supplier,
+            "nature": "C",
+            "type": "credit",
+            "serial_type": "SUP",
+            "paid": False,
+            "transaction_detail": [
+                {
+                    "product": self.products[i % 3],
+                    "warehouse": self.warehouse,
+                    "yards_per_piece": float(i + 1),
+                    "quantity": 5.0,
+                    "rate": 6.0,
+                }
+                for i in range(count)
+            ],
+        }
+        request = SimpleNamespace(user=self.user, branch=self.branch)
+        with CaptureQueriesContext(connection) as context:
+            Transaction.make_transaction(data, request)
+        return len(context)
+
+    def test_queries_do_not_depend_on_lines(self):
+        """writing a transaction and its balances costs the same for 1 and 10 lines"""
+        # the first transaction of a person creates the serial and the balance rows
+        self.make_transaction(1)
+        self.assertEqual(self.make_transaction(1), self.make_transaction(10))
+        self.assertBalancesRebuilt()
+
+
+class ImportTransactionsTest(BranchTestMixin, TestCase):
+    """imported sales are checked against the average cost like created ones"""
+
+    def get_row(self, person, serial_type, date, lines):
+        return {
+            "date": date,
+            "person": person.name,
+            "serial_type": serial_type,
+            "transaction_detail": [
+                {
+                    "product": product.name,
+                    "warehouse": self.warehouse.name,
+                    "yards_per_piece": 10,
+                    "quantity": quantity,
+                    "rate": rate,
+                }
+                for product, quantity, rate in lines
+            ],
+        }
+
+    def import_rows(self, rows):
+        return self.client.post(
+            "/transaction/import/",
+            {"file": SimpleUploadedFile("transactions.json", json.dumps(rows).encode())},
+            format="multipart",
+        )
+
+    def test_valid_file(self):
+        response = self.import_rows(
+            [
+                self.get_row(
+                    self.supplier, "SUP", "2022-01-01", [(self.products[0], 100, 8)]
+                ),
+                self.get_row(
+                    self.customer,
+                    "INV",
+                    "2022-01-02",
+                    [(self.products[0], 10, 9), (self.products[1], 10, 6)],
+                ),
+                # a purchase after the day of the sale does not raise its cost
+                self.get_row(
+                    self.customer, "INV", "2022-01-01", [(self.products[2], 10, 6)]
+                ),
+                self.get_row(
+                    self.supplier, "SUP", "2022-01-02", [(self.products[2], 100, 50)]
+                ),
+            ]
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data["imported"], 4)
+        self.assertBalancesRebuilt()
+
+    def test_bad_rows(self):
+        for lines, purchase, error in [
+            ([(self.products[1], 10, 4)], [], "Row 1: Rate too low for product 1"),
+            # the purchases of the file count towards the cost of its sales
+            (
+                [(self.products[0], 10, 9)],
+                [(self.products[0], 100, 50)],
+                "Row 2: Rate too low for product 0",
+            ),
+            ([(self.products[1], 1001, 6)], [], "product 1 10.0 gaz low in stock"),
+        ]:
+            rows = [self.get_row(self.customer, "INV", "2022-01-02", lines)]
+            if purchase:
+                rows.insert(0, self.get_row(self.supplier, "SUP", "2022-01-01", purchase))
+            response = self.import_rows(rows)
+            self.assertEqual(response.status_code, 400, response.data)
+            self.assertIn(error, str(response.data[0]))
+            self.assertFalse(Transaction.objects.exists())
+
+
+class StockSnapshotTest(BranchTestMixin, TestCase):
+    def get_stock(self, as_of, **filters):
+        sql, params = StockSnapshot.get_stock_sql(self.branch, as_of, **filters)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def test_back_dated_edit(self):
+        """stock from the snapshots left after a back-dated edit equals the history"""
+        purchase = self.create_transaction(
+            self.supplier,
+            "SUP",
+            "C",
+            [(self.products[0], 20, 6)],
+            date="2022-01-03T00:00:00",
+        )
+        self.create_transaction(
+            self.customer,
+            "INV",
+            "D",
+            [(self.products[0], 5, 10)],
+            date="2022-01-03T00:00:00",
+        )
+        for day in range(1, 5):
+            StockSnapshot.take(self.branch, date(2022, 1, day))
+
+        data = self.get_transaction_data(
+            self.supplier,
+            "SUP",
+            "C",
+            [(self.products[0], 30, 6), (self.products[1], 4, 6)],
+            date="2022-01-02T00:00:00",
+        )
+        response = self.client.put(
+            f"/transaction/edit/{purchase['id']}/", data, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            list(StockSnapshot.objects.values_list("date", flat=True).distinct()),
+            [date(2022, 1, 1)],
+        )
+
+        as_of = datetime(2022, 1, 10)
+        filters = {"product": self.products[0].id}
+        with_snapshots = [self.get_stock(as_of), self.get_stock(as_of, **filters)]
+        StockSnapshot.objects.all().delete()
+        self.assertEqual(
+            with_snapshots, [self.get_stock(as_of), self.get_stock(as_of, **filters)]
+        )
+        self.assertIn(
+            (self.products[0].id, self.warehouse.id, 10.0, 1025.0), with_snapshots[0]
+        )
+
+    def test_invalid_date(self):
+        response = self.client.get("/transaction/all-stock/", {"date": "01/02/2022"})
+        self.assertEqual(response.status_code, 400)
+
+
+class StockCardTest(BranchTestMixin, TestCase):
+    def get_card(self, **params):
+        return self.client.get(
+            "/transaction/detailed-stock/",
+            {"product": str(self.products[0].id), **params},
+        )
+
+    def test_pages(self):
+        """pages follow each other after the opening stock, which has no date"""
+        for day, quantity in [(3, 20), (1, 5), (2, 7)]:
+            self.create_transaction(
+                self.supplier,
+                "SUP",
+                "C",
+                [(self.products[0], quantity, 6)],
+                date=f"2022-01-0{day}T00:00:00",
+            )
+        self.assertIsNone(
+            StockMovement.objects.get(
+                product=self.products[0], movement_type=StockMovementTypes.OPENING
+            ).date
+        )
+
+        with mock.patch.object(DetailedStockView, "page_size", 2):
+            first = self.get_card()
+            self.assertEqual(first.status_code, 200, first.data)
+            second = self.get_card(after=first.data["next"])
+        self.assertEqual(first.data["opening_stock"], 1000)
+        self.assertEqual([row["balance"] for row in first.data["data"]], [1005, 1012])
+        self.assertEqual(second.data["opening_stock"], 1012)
+        self.assertEqual([row["balance"] for row in second.data["data"]], [1032])
+        self.assertIsNone(second.data["next"])
+
+    def test_invalid_after(self):
+        opening = StockMovement.objects.get(
+            product=self.products[0], movement_type=StockMovementTypes.OPENING
+        )
+        for after in [uuid4(), "last", opening.id]:
+            with self.subTest(after=after):
+                self.assertEqual(self.get_card(after=str(after)).status_code, 400)
+
+
+class InventoryMemoMiddlewareTest(TestCase):
+    def test_memo_lives_for_the_request(self):
+        memos = []
+        middleware = InventoryMemoMiddleware(
+            lambda request: memos.append(inventory_memo.get())
+        )
+        middleware(RequestFactory().get("/"))
+        self.assertEqual(memos, [{}])
+        self.assertIsNone(inventory_memo.get())
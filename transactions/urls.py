@@ -10,6 +10,7 @@ from .views import (
     EditTransferStock,
     FilterTransactions,
     GetTransaction,
+    ImportTransactions,
     TransferStock,
     ViewAllStock,
     ViewTransfers,
@@ -18,6 +19,7 @@ from .views import (
 urlpatterns = [
     path("create/", CreateTransaction.as_view()),
     path("list/", GetTransaction.as_view()),
+    path("import/", ImportTransactions.as_view()),
     path("delete/<uuid:pk>/", DeleteTransaction.as_view()),
     path("edit/<uuid:pk>/", EditRetrieveTransaction.as_view()),
     path("search/", FilterTransactions.as_view()),
@@ -0,0 +1,133 @@
+import csv
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from itertools import islice
+
+from rest_framework.serializers import ValidationError
+
+# inventory valuations computed while serving the current request
+inventory_memo = ContextVar("inventory_memo", default=None)
+
+
+@contextmanager
+def inventory_memo_scope():
+    """memoize inventory valuations until the scope exits"""
+    token = inventory_memo.set({})
+    try:
+        yield
+    finally:
+        inventory_memo.reset(token)
+
+
+def clear_inventory_memo():
+    """forget memoized valuations, called whenever stock value changes"""
+    memo = inventory_memo.get()
+    if memo is not None:
+        memo.clear()
+
+
+# columns of a transaction import csv, every line is a detail of the transaction
+# numbered by its entry, the transaction columns are read from its first line
+IMPORT_COLUMNS = [
+    "entry",
+    "date",
+    "person",
+    "serial_type",
+    "type",
+    "manual_serial",
+    "wasooli_number",
+    "builty",
+    "discount",
+    "paid_amount",
+    "account_type",
+    "detail",
+    "product",
+    "warehouse",
+    "yards_per_piece",
+    "rate",
+    "quantity",
+]
+IMPORT_DETAIL_COLUMNS = ["product", "warehouse", "yards_per_piece", "rate", "quantity"]
+
+
+def parse_import_value(row, key, convert, default=None):
+    """converts a value of an imported row, empty values give the default"""
+    value = row.get(key)
+    if value is None or value == "":
+        return default
+    try:
+        if convert is datetime:
+            value = str(value)
+            return datetime.strptime(
+                value, "%Y-%m-%d %H:%M:%S" if " " in value else "%Y-%m-%d"
+            )
+        return convert(value)
+    except ValueError:
+        raise ValidationError(f"Row {row['row']}: invalid {key} {value}", 400)
+
+
+def parse_import_row(row, details):
+    """transaction of an imported row with its details, values converted"""
+    transaction = {
+        "row": row["row"],
+        "date": parse_import_value(row, "date", datetime),
+        "person": parse_import_value(row, "person", str),
+        "serial_type": parse_import_value(row, "serial_type", str),
+        "type": parse_import_value(row, "type", str),
+        "manual_serial": parse_import_value(row, "manual_serial", int),
+        "wasooli_number": parse_import_value(row, "wasooli_number", int),
+        "builty": parse_import_value(row, "builty", str),
+        "discount": parse_import_value(row, "discount", float, 0.0),
+        "paid_amount": parse_import_value(row, "paid_amount", float, 0.0),
+        "account_type": parse_import_value(row, "account_type", str),
+        "detail": parse_import_value(row, "detail", str),
+        "transaction_detail": [],
+    }
+    for detail in details:
+        detail = {**detail, "row": row["row"]}
+        transaction["transaction_detail"].append(
+            {
+                "product": parse_import_value(detail, "product", str),
+                "warehouse": parse_import_value(detail, "warehouse", str),
+                "yards_per_piece": parse_import_value(detail, "yards_per_piece", float),
+                "rate": parse_import_value(detail, "rate", float),
+                "quantity": parse_import_value(detail, "quantity", float),
+            }
+        )
+    return transaction
+
+
+def read_transaction_rows(file, file_format):
+    """
+    streams the transactions of an import file, a csv with IMPORT_COLUMNS or a json
+    list of transactions shaped like the transaction serializer's data
+    """
+    if file_format == "json":
+        for index, row in enumerate(json.load(file), 1):
+            yield parse_import_row(
+                {**row, "row": index}, row.get("transaction_detail", [])
+            )
+        return
+
+    entry = None
+    details = []
+    for row in csv.DictReader(file):
+        if row["entry"] != entry:
+            if entry is not None:
+                yield parse_import_row(details[0], details)
+            entry = row["entry"]
+            details = []
+        details.append({**row, "row": entry})
+    if entry is not None:
+        yield parse_import_row(details[0], details)
+
+
+def get_batches(rows, size):
+    """splits rows into lists of at most size rows"""
+    rows = iter(rows)
+    batch = list(islice(rows, size))
+    while batch:
+        yield batch
+        batch = list(islice(rows, size))
@@ -1,5 +1,4 @@
-from datetime import date, datetime, timedelta
-from itertools import chain
+from datetime import date, datetime
 
 from django.core.exceptions import PermissionDenied
 from django.db.models import Avg, Count, F, Min, Q, Sum
@@ -13,10 +12,12 @@ from rest_framework.views import APIView
 
 import authentication.constants as PERMISSIONS
 from authentication.mixins import CheckPermissionsMixin
-from core.pagination import StandardPagination
+from core.pagination import LargePagination, RawQueryRows, StandardPagination
+from core.signals import bulk_delete
 from core.utils import check_permission, convert_qp_dict_to_qp
 from essentials.models import ProductCategory, Stock
 from expenses.models import ExpenseDetail
+from ledgers.models import Ledger
 from ledgers.views import GetAllBalances
 from logs.choices import ActivityCategory, ActivityTypes
 from logs.models import Log
@@ -26,6 +27,7 @@ from .models import *
 from .queries import TransactionQuery, TransferQuery
 from .serializers import (
     GetAllStockSerializer,
+    ImportTransactionsSerializer,
     TransactionSerializer,
     TransferStockSerializer,
     UpdateTransactionSerializer,
@@ -52,6 +54,20 @@ class CreateTransaction(CheckPermissionsMixin, generics.CreateAPIView):
         return Transaction.objects.filter(branch=self.request.branch)
 
 
+class ImportTransactions(CheckPermissionsMixin, generics.CreateAPIView):
+    """
+    import the transactions of a csv or json file
+    """
+
+    permissions = {
+        "or": [
+            PERMISSIONS.CAN_CREATE_CUSTOMER_TRANSACTION,
+            PERMISSIONS.CAN_CREATE_SUPPLIER_TRANSACTION,
+        ]
+    }
+    serializer_class = ImportTransactionsSerializer
+
+
 class GetTransaction(CheckPermissionsMixin, generics.ListAPIView):
     """
     get transactions with a time frame (optional), requires person to be passed
@@ -135,6 +151,9 @@ class DeleteTransaction(
     }
     serializer_class = UpdateTransactionSerializer
 
+    def perform_destroy(self, instance):
+        Ledger.delete_with_entries(Transaction.objects.filter(id=instance.id))
+
     def delete(self, *args, **kwargs):
         instance = self.get_object()
 
@@ -150,8 +169,13 @@ class DeleteTransaction(
                     HTTP_403_FORBIDDEN,
                 )
 
+        stock_deltas = instance.get_reverse_stock_deltas()
+        # the movements leave the balances in one go before the transaction cascades
+        bulk_delete(
+            StockMovement.objects.filter(transaction_detail__transaction=instance)
+        )
         self.perform_destroy(instance)
-        Transaction.check_stock(self.request.branch, None)
+        Transaction.check_stock(self.request.branch, keys=stock_deltas.keys())
         Log.create_log(
             ActivityTypes.DELETED,
             ActivityCategory.TRANSACTION,
@@ -203,7 +227,7 @@ class BusinessPerformanceHistory(CheckPermissionsMixin, APIView):
 
         stats = (
             TransactionDetail.objects.values("transaction__nature")
-            .filter(**filters, transaction__person__branch=branch)
+            .filter(**filters, branch=branch)
             .annotate(
                 quantity=Sum("quantity"),
                 number_of_transactions=Count("transaction__id"),
@@ -309,8 +333,10 @@ class DeleteTransferStock(TransferQuery, CheckPermissionsMixin, generics.Destroy
     permissions = [PERMISSIONS.CAN_DELETE_TRANSFER_STOCK]
 
     def perform_destroy(self, instance):
+        stock_deltas = instance.get_reverse_stock_deltas()
+        bulk_delete(StockMovement.objects.filter(transfer_detail__transfer=instance))
         super().perform_destroy(instance)
-        Transaction.check_stock(self.request.branch)
+        Transaction.check_stock(self.request.branch, keys=stock_deltas.keys())
         Log.create_log(
             ActivityTypes.DELETED,
             ActivityCategory.STOCK_TRANSFER,
@@ -355,7 +381,13 @@ class ViewTransfers(
 
 
 class DetailedStockView(CheckPermissionsMixin, APIView):
+    """
+    stock card of a product or a category from the stock movement journal, a page
+    of movements with the running quantity, pass the next id as after for the next
+    """
+
     permissions = [PERMISSIONS.CAN_VIEW_DETAILED_STOCK]
+    page_size = StandardPagination.page_size
 
     def get(self, request):
         qp = request.query_params
@@ -368,160 +400,47 @@ class DetailedStockView(CheckPermissionsMixin, APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        product_and_category_filter = {}
-        product_and_category_filter_objects = {}
+        filters = {}
         if qp.get("product"):
-            product = get_object_or_404(Product, id=qp.get("product"))
-            product_and_category_filter.update({"product": qp.get("product")})
-            product_and_category_filter_objects.update({"product": product})
+            filters["product"] = get_object_or_404(Product, id=qp.get("product"))
         if qp.get("product_category"):
-            product_category = get_object_or_404(
+            filters["product__category"] = get_object_or_404(
                 ProductCategory, id=qp.get("product_category")
             )
-            product_and_category_filter.update(
-                {"product__category": qp.get("product_category")}
-            )
-            product_and_category_filter_objects.update(
-                {"product__category": product_category}
-            )
-
-        opening_stock = 0.0
-        branch = request.branch
-        initial_stock_filters = {**product_and_category_filter}
-        if qp.get("warehouse"):
-            initial_stock_filters.update({"warehouse": qp.get("warehouse")})
-        if qp.get("yards_per_piece"):
-            initial_stock_filters.update({"yards_per_piece": qp.get("yards_per_piece")})
-
-        initial_stock = (
-            Stock.objects.filter(**initial_stock_filters).aggregate(
-                total=Sum("opening_stock")
-            )["total"]
-            or 0
+        for key in ["warehouse", "yards_per_piece"]:
+            if qp.get(key):
+                filters[key] = qp.get(key)
+
+        start = qp.get("start")
+        if start:
+            start = datetime.strptime(start, "%Y-%m-%d %H:%M:%S")
+
+        card = StockMovement.get_stock_card(
+            request.branch,
+            self.page_size,
+            start=start,
+            end=qp.get("end"),
+            after=qp.get("after"),
+            remove_transfers=bool(qp.get("remove_transfers")),
+            **filters,
         )
+        return Response(card, status=status.HTTP_200_OK)
 
-        opening_stock += initial_stock
-        filters = {"transaction__person__branch": branch}
 
-        filters_transfers = {
-            **product_and_category_filter_objects,
-            "transfer__from_warehouse__branch": branch,
-        }
-        if qp.get("start"):
-            start = datetime.strptime(qp.get("start"), "%Y-%m-%d %H:%M:%S")
-            filters.update({"transaction__date__gte": start})
-            filters_transfers.update({"transfer__date__gte": start})
-            startDateMinusOne = start - timedelta(days=1)
-
-            old_stock = (
-                TransactionDetail.objects.values("transaction__nature")
-                .annotate(quantity=Sum("quantity"))
-                .filter(
-                    transaction__date__lte=startDateMinusOne,
-                    # product=product,
-                    transaction__person__branch=branch,
-                    **product_and_category_filter_objects,
-                )
-            )
-            for old in old_stock:
-                if old["transaction__nature"] == "C":
-                    opening_stock += old["quantity"]
-                else:
-                    opening_stock -= old["quantity"]
-
-        if qp.get("end"):
-            filters.update({"transaction__date__lte": qp.get("end")})
-            filters_transfers.update({"transfer__date__lte": qp.get("end")})
-
-        if qp.get("yards_per_piece"):
-            filters.update({"yards_per_piece": qp.get("yards_per_piece")})
-            filters_transfers.update({"yards_per_piece": qp.get("yards_per_piece")})
-
-        if qp.get("warehouse"):
-            filters.update({"warehouse": qp.get("warehouse")})
-
-        if qp.get("warehouse") and qp.get("start"):
-            old_transfer_quantity = StockTransferDetail.calculateTransferredAmount(
-                qp.get("warehouse"),
-                {
-                    **product_and_category_filter_objects,
-                    "transfer__date__lte": startDateMinusOne,
-                    "transfer__from_warehouse__branch": branch,
-                },
-            )
-            opening_stock += old_transfer_quantity
-
-        stock = (
-            TransactionDetail.objects.values(
-                "transaction__nature",
-                "transaction_id",
-                "transaction__serial",
-                "transaction__manual_serial",
-                "transaction__serial_type",
-                "transaction__person",
-                "warehouse",
-                "yards_per_piece",
-                "transaction__type",
-                date=F("transaction__date"),
-            )
-            .filter(
-                **{
-                    **filters,
-                    **product_and_category_filter_objects,
-                }
-            )
-            .annotate(quantity=Sum("quantity"))
-            .order_by("date")
-        )
-
-        transfer_values = [
-            "to_warehouse",
-            "quantity",
-            "id",
-            "yards_per_piece",
-            "transfer__from_warehouse",
-            "transfer__serial",
-            "transfer__manual_serial",
-        ]
-        if not qp.get("remove_transfers"):
-            if qp.get("warehouse"):
-                transfers = (
-                    StockTransferDetail.objects.filter(
-                        Q(transfer__from_warehouse=qp.get("warehouse"))
-                        | Q(to_warehouse=qp.get("warehouse")),
-                        **filters_transfers,
-                    )
-                    .values(*transfer_values, date=F("transfer__date"))
-                    .order_by("transfer__date")
-                )
-            else:
-                transfers = (
-                    StockTransferDetail.objects.filter(**filters_transfers)
-                    .values(*transfer_values, date=F("transfer__date"))
-                    .order_by("transfer__date")
-                )
-
-            chained_data = sorted(
-                chain(stock, transfers),
-                key=lambda obj: obj["date"],
-            )
-        else:
-            chained_data = sorted(
-                chain(stock, []),
-                key=lambda obj: obj["date"],
-            )
-        return Response(
-            {
-                "data": chained_data,
-                "opening_stock": opening_stock,
-            },
-            status=status.HTTP_200_OK,
-        )
+STOCK_YARDS_LOOKUPS = ["yards_per_piece", "yards_per_piece__gte", "yards_per_piece__lte"]
 
 
 class ViewAllStock(TransactionQuery, CheckPermissionsMixin, generics.ListAPIView):
+    """
+    stock as of a date from the nearest closing stock snapshot. the response is
+    paginated like the other lists, {count, next, previous, results} with the rows
+    that used to be returned as a plain list in results, clients follow next for
+    the rows after the first page
+    """
+
     permissions = [PERMISSIONS.CAN_VIEW_STOCK]
     serializer_class = GetAllStockSerializer
+    pagination_class = LargePagination
     filter_backends = [DjangoFilterBackend]
     filter_fields = {
         "quantity": ["gte", "lte", "exact"],
@@ -531,29 +450,47 @@ class ViewAllStock(TransactionQuery, CheckPermissionsMixin, generics.ListAPIView
     }
 
     def list(self, request, *args, **kwargs):
-        qpDict = dict(request.GET.lists())
-        qps = convert_qp_dict_to_qp(qpDict)
-        outcut = qps.pop("outcut", None)
-        date = qps.pop("date", None)
-        quantity = qps.pop("quantity", None)
-        quantity__gte = qps.pop("quantity__gte", None)
-        quantity__lte = qps.pop("quantity__lte", None)
-        stock = Transaction.get_all_stock(request.branch, date, None, None, **qps)
-        if outcut:
-            stock = filter(
-                lambda x: x["yards_per_piece"] != 44 and x["yards_per_piece"] != 66, stock
+        qps = convert_qp_dict_to_qp(dict(request.GET.lists()))
+        try:
+            as_of = (
+                datetime.fromisoformat(str(qps["date"]))
+                if qps.get("date")
+                else datetime.now()
+            )
+        except ValueError:
+            raise ValidationError(
+                "Date should be in the format YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS",
+                status.HTTP_400_BAD_REQUEST,
+            )
+        having = [(">", 0)]
+        for lookup, operator in [
+            ("quantity", "="),
+            ("quantity__gte", ">="),
+            ("quantity__lte", "<="),
+        ]:
+            if qps.get(lookup) is not None:
+                try:
+                    having.append((operator, float(qps[lookup])))
+                except (TypeError, ValueError):
+                    raise ValidationError(
+                        f"{lookup} should be a number", status.HTTP_400_BAD_REQUEST
+                    )
+        filters = {
+            key: value
+            for key, value in qps.items()
+            if key in ["product", "warehouse", *STOCK_YARDS_LOOKUPS]
+        }
+        sql, params = StockSnapshot.get_stock_sql(
+            request.branch,
+            as_of,
+            having=having,
+            exclude={"yards_per_piece__in": [44, 66]} if qps.get("outcut") else None,
+            **filters,
+        )
+        page = self.paginate_queryset(
+            RawQueryRows(
+                sql, params, ["product", "warehouse", "yards_per_piece", "quantity"]
             )
-        if quantity:
-            stock = filter(lambda x: x["quantity"] == quantity, stock)
-            stock = filter(lambda x: x["quantity"] == qps.get("warehouse"), stock)
-        if quantity__gte:
-            stock = filter(lambda x: x["quantity"] >= quantity__gte, stock)
-        if quantity__lte:
-            stock = filter(lambda x: x["quantity"] <= quantity__lte, stock)
-        if qps.get("warehouse"):
-            stock = filter(lambda x: x["warehouse"] == qps.get("warehouse"), stock)
-
-        stock = filter(lambda x: x["quantity"] > 0, stock)
-
-        serializer = self.get_serializer(stock, many=True)
-        return Response(serializer.data)
+        )
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)